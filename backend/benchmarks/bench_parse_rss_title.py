@@ -0,0 +1,35 @@
+"""Micro-benchmark for torll.services.rsstitle.parse_rss_title.
+
+Run from the backend directory:  python benchmarks/bench_parse_rss_title.py
+"""
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+from torll.services.rsstitle import parse_rss_title  # noqa: E402
+
+# NexusPHP RSS 标题样例
+CORPUS = [
+    "[电影/Movies] Oppenheimer.2023.2160p.UHD.BluRay.x265.10bit.HDR.DDP5.1-WiKi [奥本海默/原子弹之父 | 类型: 剧情 / 传记 / 历史] [25.43 GB] [官方|中字|DIY]",
+    "[剧集/TV Series] The.Last.of.Us.S01E05.1080p.WEB-DL.DDP5.1.H.264-NTb [最后生还者 第一季 第5集 [中字]] [2.31 GB]",
+    "[纪录片/Documentary] Planet.Earth.III.S01.2160p.iP.WEB-DL.AAC2.0.HLG.H.265-FLUX [地球脉动 第三季 全8集] [41.2 GB] [中字|DIY]",
+    "[动漫/Animations] Frieren.S01E12.1080p.CR.WEB-DL.AAC2.0.H.264-VARYG [葬送的芙莉莲 第12集] [1.38 GB] [中字]",
+    "[综艺/TV Shows] Running.Man.E690.1080p.WEB-DL.AAC2.0.H.264-Lilith [Running Man 第690期] [3.0 GB]",
+    "[音乐/Music] Taylor.Swift-1989.Taylors.Version-WEB-FLAC-2023 [霉霉 1989 重录版] [420 MB] [无损|官方]",
+    "Dune.Part.Two.2024.2160p.WEB-DL.DDP5.1.Atmos.DV.HDR.H.265-FLUX [沙丘2] [18.9 GB] [国语|中字|官方]",
+    "[电影/Movies] Blade.Runner.2049.2017.1080p.BluRay.x264-SPARKS [银翼杀手2049] [12.5 GB]",
+]
+
+
+def main():
+    n = 20000
+    for title in CORPUS[:3]:
+        print(parse_rss_title(title))
+    elapsed = timeit.timeit(lambda: [parse_rss_title(t) for t in CORPUS], number=n)
+    total = n * len(CORPUS)
+    print(f"{total} titles in {elapsed:.3f}s, {elapsed / total * 1e6:.2f} us/title")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,33 @@
+import os
+import sys
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+# 测试不碰 BASE_DIR/torll.db: 模块级的 engine 也指向内存库
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+from torll.db.database import Base  # noqa: E402
+from torll.models import models  # noqa: E402,F401
+
+
+@pytest.fixture
+def session_factory():
+    """Sessionmaker over a fresh in-memory SQLite database with all tables."""
+    engine = create_engine(
+        "sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool
+    )
+    Base.metadata.create_all(engine)
+    yield sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    engine.dispose()
+
+
+@pytest.fixture
+def db(session_factory):
+    session = session_factory()
+    try:
+        yield session
+    finally:
+        session.close()
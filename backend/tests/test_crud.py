@@ -0,0 +1,57 @@
+from torll.models import models
+from torll.services import crud
+
+
+def add_download(db, torname):
+    download = models.TorDownload(torname=torname, qbitname="qb", qbid=torname)
+    db.add(download)
+    db.commit()
+    return download
+
+
+def test_delete_download_removes_best_download(db):
+    kept = add_download(db, "Show.S01.1080p.WEB-DL-GRPA")
+    best = add_download(db, "Show.S01.1080p.BluRay-GRPB")
+    db.add_all([
+        models.BestDownload(media_title="Show", season="S01", resolution="1080p",
+                            group="GRPB", group_score=90, tor_download_id=best.id),
+        models.BestDownload(media_title="Other", season="", resolution="2160p",
+                            group="GRPA", group_score=50, tor_download_id=kept.id),
+    ])
+    db.commit()
+
+    crud.delete_download(db, best.id)
+
+    remaining = db.query(models.BestDownload).all()
+    assert [(x.media_title, x.tor_download_id) for x in remaining] == [("Other", kept.id)]
+    assert db.query(models.TorDownload).count() == 1
+
+
+def test_delete_missing_download_keeps_best_download(db):
+    download = add_download(db, "Movie.2024.2160p-GRP")
+    db.add(models.BestDownload(media_title="Movie", season="", resolution="2160p",
+                               group="GRP", group_score=10, tor_download_id=download.id))
+    db.commit()
+
+    assert crud.delete_download(db, download.id + 1) is None
+    assert db.query(models.BestDownload).count() == 1
+
+
+def test_delete_torrent_removes_best_download(db, monkeypatch):
+    from torll.services import download_service
+
+    class FakeClient:
+        def delete_permanently(self, qbid):
+            self.deleted = qbid
+
+    db.add(models.QbitConfig(qbitname="qb", host="localhost", port=8080))
+    download = add_download(db, "Show.S02.2160p-GRP")
+    db.add(models.BestDownload(media_title="Show", season="S02", resolution="2160p",
+                               group="GRP", group_score=80, tor_download_id=download.id))
+    db.commit()
+    monkeypatch.setattr(download_service, "get_qb_client", lambda config: FakeClient())
+
+    download_service.delete_torrent(db, download.id)
+
+    assert db.query(models.BestDownload).count() == 0
+    assert db.query(models.TorDownload).count() == 0
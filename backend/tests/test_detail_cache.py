@@ -0,0 +1,42 @@
+from datetime import datetime, timedelta
+
+from torll.core.config import settings
+from torll.models import models
+from torll.services import detail_cache, rssfilter
+
+LINK = "https://pt.example.org/details.php?id=1201"
+STATIC_FIELDS = ("imdbstr", "doubanid")
+
+
+def cached_page(monkeypatch, session_factory, tmp_path, age):
+    monkeypatch.setattr(detail_cache, "SessionLocal", session_factory)
+    cache = detail_cache.DetailPageCache(str(tmp_path))
+    cache.store(LINK, "ptexample", "<html>1201</html>")
+    cache.save_parsed(LINK, {"imdbstr": "tt15239678", "imdbval": 8.5, "seednum": 120}, "v1")
+    db = session_factory()
+    db.query(models.DetailPageCache).update({"fetched_at": datetime.now() - age})
+    db.commit()
+    db.close()
+    return cache.lookup(LINK)
+
+
+def test_page_past_volatile_ttl_serves_filters_without_seed_rules(monkeypatch, session_factory, tmp_path):
+    age = timedelta(seconds=settings.DETAIL_CACHE_TTL_VOLATILE + 60)
+    assert age.total_seconds() < settings.DETAIL_CACHE_TTL_RATING
+    page = cached_page(monkeypatch, session_factory, tmp_path, age)
+
+    assert page.parsed["imdbval"] == 8.5
+    rated = rssfilter.RssFilter([{"rate_min": 7}]).detailFields()
+    assert rated == ("imdbval", "doubanval")
+    assert detail_cache.DetailPageCache.is_fresh(page, STATIC_FIELDS + rated)
+    assert detail_cache.DetailPageCache.is_fresh(page, STATIC_FIELDS + rssfilter.RssFilter([{}]).detailFields())
+    # 要求做种数的调用方会重新抓取
+    assert not detail_cache.DetailPageCache.is_fresh(page, STATIC_FIELDS + rated + ("seednum",))
+
+
+def test_rating_fields_expire_after_rating_ttl(monkeypatch, session_factory, tmp_path):
+    age = timedelta(seconds=settings.DETAIL_CACHE_TTL_RATING + 60)
+    page = cached_page(monkeypatch, session_factory, tmp_path, age)
+
+    assert detail_cache.DetailPageCache.is_fresh(page, STATIC_FIELDS)
+    assert not detail_cache.DetailPageCache.is_fresh(page, STATIC_FIELDS + ("imdbval",))
@@ -0,0 +1,107 @@
+from datetime import datetime
+from types import SimpleNamespace
+
+from torll.services import highwater
+from torll.services.highwater import HighWaterMark
+
+
+def row(tid, pinned=False):
+    return SimpleNamespace(
+        infolink=f"https://pt.example/details.php?id={tid}&hit=1",
+        tordate=datetime(2026, 10, 1),
+        pinned=pinned,
+    )
+
+
+def listing(*pages):
+    """Pages as shown on the site (newest first), handed to the walk oldest first."""
+    calls = []
+
+    def load_page(page):
+        calls.append(page)
+        if page >= len(pages):
+            return None
+        return list(reversed(pages[page]))
+
+    return load_page, calls
+
+
+def ids(items):
+    return [highwater.torrent_id_of_link(x.infolink) for x in items]
+
+
+def test_sticky_old_row_on_first_page_does_not_stop_walk():
+    mark = HighWaterMark(100, None)
+    load_page, calls = listing(
+        [row(50, pinned=True), row(110), row(109), row(108)],
+        [row(107), row(106), row(100), row(99)],
+    )
+
+    items, walked, reached = highwater.walk_listing(load_page, mark, maxpages=5)
+
+    assert calls == [0, 1]
+    assert (walked, reached) == (2, True)
+    assert ids(items) == [106, 107, 108, 109, 110]
+
+
+def test_walk_stops_on_page_whose_bottom_row_is_known():
+    mark = HighWaterMark(100, None)
+    load_page, calls = listing([row(102), row(101), row(100)], [row(99)])
+
+    items, walked, reached = highwater.walk_listing(load_page, mark, maxpages=5)
+
+    assert calls == [0]
+    assert (walked, reached) == (1, True)
+    assert ids(items) == [101, 102]
+
+
+def test_walk_not_reaching_mark_reports_pages_walked():
+    mark = HighWaterMark(10, None)
+    load_page, _ = listing([row(30), row(29)], [row(28), row(27)], [row(26)])
+
+    items, walked, reached = highwater.walk_listing(load_page, mark, maxpages=2)
+
+    assert (walked, reached) == (2, False)
+    assert ids(items) == [27, 28, 29, 30]
+
+
+def test_date_mark_used_without_torrent_id():
+    mark = HighWaterMark(None, datetime(2026, 10, 5))
+    old = SimpleNamespace(infolink="https://pt.example/t/abc", tordate=datetime(2026, 10, 4))
+    new = SimpleNamespace(infolink="https://pt.example/t/def", tordate=datetime(2026, 10, 6))
+
+    assert highwater.is_below(old, mark)
+    assert not highwater.is_below(new, mark)
+
+
+def test_raised_keeps_the_newest_id_and_date():
+    mark = HighWaterMark(100, datetime(2026, 10, 1))
+    newer = SimpleNamespace(infolink="https://pt.example/details.php?id=120",
+                            tordate=datetime(2026, 10, 3))
+    older = SimpleNamespace(infolink="https://pt.example/details.php?id=90",
+                            tordate=datetime(2026, 10, 2))
+
+    assert highwater.raised(mark, [newer, older]) == HighWaterMark(120, datetime(2026, 10, 3))
+    assert highwater.raised(mark, []) == mark
+
+
+def test_backfill_bound_keeps_older_pending_gap():
+    mark = HighWaterMark(200, None)
+
+    assert highwater.backfill_bound(mark) == mark
+    assert highwater.backfill_bound(mark, HighWaterMark(100, None)) == HighWaterMark(100, None)
+
+
+def test_backfill_rows_stop_at_the_gap_bound():
+    bound = HighWaterMark(100, None)
+
+    items, closed = highwater.backfill_rows(list(reversed([row(103), row(102), row(101)])), bound)
+    assert (ids(items), closed) == ([101, 102, 103], False)
+
+    items, closed = highwater.backfill_rows(list(reversed([row(101), row(100), row(99)])), bound)
+    assert (ids(items), closed) == ([101], True)
+
+    assert highwater.backfill_rows([], bound) == ([], True)
+    # 首次抓取没有下界, 补到空页为止
+    items, closed = highwater.backfill_rows([row(5)], HighWaterMark(None, None))
+    assert (ids(items), closed) == ([5], False)
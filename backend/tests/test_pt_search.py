@@ -0,0 +1,156 @@
+import json
+import os
+
+import pytest
+
+from fastapi.testclient import TestClient
+
+from torll.core.config import settings, BASE_DIR
+from torll.db.database import get_db
+from torll.main import app
+from torll.models import models
+from torll.services import pt_search_service, tmdb_service
+from torll.services.site_config import SiteConfigStore
+
+FIXTURE = os.path.join(os.path.dirname(__file__), "fixtures", "nexusphp_search.html")
+SAMPLE_CONFIG = os.path.join(BASE_DIR, "siteconfig.json.sample")
+
+SITE_CONFIGS = {
+    "nexusphp": {
+        "torlist": "//table[@class='torrents']/tr[position()>1]",
+        "infolink": "string(.//table[@class='torrentname']//a[contains(@href, 'details.php')]/@href)",
+        "tortitle": "string(.//table[@class='torrentname']//a[contains(@href, 'details.php')]/@title)",
+        "subtitle": "normalize-space(.//table[@class='torrentname']//td[@class='embedded'][1]/br/following-sibling::text()[1])",
+        "downlink": "string(.//a[contains(@href, 'download.php')]/@href)",
+        "tagfree": "string(.//img[@class='pro_free']/@alt)",
+        "imdbstr": {"path": "string(.//a[contains(@href, 'imdb.com/title')]/@href)", "method": "re_imdb"},
+        "tordate": "string(./td[3]/span/@title)",
+        "torsize": "normalize-space(./td[4])",
+        "seednum": "string(./td[5])",
+        "downnum": "string(./td[6])",
+    },
+    "ptexample": {
+        "baseurl": "https://pt.example.org/",
+        "searchurl": "torrents.php?search=",
+        "searchIMDburl": "torrents.php?search_area=4&search=",
+    },
+}
+
+
+class FakeResponse:
+    def __init__(self, content):
+        self.content = content
+
+    def raise_for_status(self):
+        pass
+
+
+@pytest.fixture
+def search_env(tmp_path, monkeypatch, session_factory):
+    config_file = tmp_path / "siteconfig.json"
+    config_file.write_text(json.dumps(SITE_CONFIGS), encoding="utf-8")
+    monkeypatch.setattr(pt_search_service, "site_configs", SiteConfigStore(str(config_file)))
+    monkeypatch.setattr(pt_search_service, "SessionLocal", session_factory)
+
+    requested = []
+
+    def fake_site_get(url, cookie, site=None, **kwargs):
+        requested.append((url, cookie, site))
+        with open(FIXTURE, "rb") as f:
+            return FakeResponse(f.read())
+
+    monkeypatch.setattr(pt_search_service, "site_get", fake_site_get)
+    monkeypatch.setattr(tmdb_service, "search_tmdb", lambda query, media_type="multi": (
+        [{"id": 693134, "title": "Dune: Part Two", "media_type": "movie",
+          "release_date": "2024-02-27", "poster_path": "/dune2.jpg"}]
+        if query == "dune part two" else []
+    ))
+    return requested
+
+
+def test_search_site_parses_and_caches_fixture_page(search_env, session_factory):
+    rows = pt_search_service.search_site("ptexample", "uid=1; pass=x", "Dune")
+
+    assert search_env == [("https://pt.example.org/torrents.php?search=Dune", "uid=1; pass=x", "ptexample")]
+    assert [r["infolink"] for r in rows] == [
+        "https://pt.example.org/details.php?id=1201&hit=1",
+        "https://pt.example.org/details.php?id=1188&hit=1",
+    ]
+    movie, show = rows
+    assert movie["tortitle"] == "Dune.Part.Two.2024.2160p.UHD.BluRay.x265.10bit.HDR.DDP7.1-GRP"
+    assert movie["subtitle"] == "沙丘2 | 导演: 丹尼斯·维伦纽瓦"
+    assert movie["downlink"] == "https://pt.example.org/download.php?id=1201"
+    assert movie["tagfree"] is True and show["tagfree"] is False
+    assert movie["imdbstr"] == "tt15239678"
+    assert movie["torsizeint"] == int(25.43 * 1024 ** 3)
+    assert show["torsizeint"] == 700 * 1024 ** 2
+    assert (movie["seednum"], movie["downnum"]) == (87, 3)
+    assert movie["tordate"].isoformat() == "2026-10-16T20:15:00"
+    assert movie["mediasource"] == "encode"
+    assert (movie["tmdbid"], movie["tmdbyear"], movie["tmdbcat"]) == (693134, 2024, "movie")
+    assert "tmdbid" not in show
+
+    db = session_factory()
+    try:
+        cached = db.query(models.TorrentCache).order_by(models.TorrentCache.id).all()
+        assert [(x.site, x.searchword, x.tmdbid) for x in cached] == [
+            ("ptexample", "Dune", 693134),
+            ("ptexample", "Dune", None),
+        ]
+    finally:
+        db.close()
+
+
+def test_search_site_uses_imdb_search_url(search_env):
+    pt_search_service.search_site("ptexample", "c", "tt15239678")
+
+    assert search_env[0][0] == "https://pt.example.org/torrents.php?search_area=4&search=tt15239678"
+
+
+def test_search_site_unconfigured_site_raises(search_env):
+    with pytest.raises(pt_search_service.SiteNotConfigured):
+        pt_search_service.search_site("unknown", "c", "Dune")
+    assert search_env == []
+
+
+def test_sample_site_config_parses_search_page(search_env, monkeypatch):
+    monkeypatch.setattr(pt_search_service, "site_configs", SiteConfigStore(SAMPLE_CONFIG))
+    rows = pt_search_service.search_site("ptexample", "c", "Dune")
+
+    assert [r["imdbstr"] for r in rows] == ["tt15239678", ""]
+    assert rows[0]["tagfree"] is True
+
+
+@pytest.fixture
+def client(search_env, session_factory, monkeypatch):
+    monkeypatch.setattr(settings, "SCHEDULER_ENABLED", False)
+    db = session_factory()
+    db.add_all([
+        models.PtSite(site="ptexample", cookie="c"),
+        models.PtSite(site="unconfigured", cookie="c"),
+    ])
+    db.commit()
+    db.close()
+
+    def override_get_db():
+        session = session_factory()
+        try:
+            yield session
+        finally:
+            session.close()
+
+    app.dependency_overrides[get_db] = override_get_db
+    with TestClient(app) as c:
+        yield c
+    app.dependency_overrides.clear()
+
+
+def test_search_endpoint_status_codes(client):
+    def search(site):
+        return client.post("/search/pt", json={"search_term": "Dune", "site_name": site})
+
+    resp = search("ptexample")
+    assert resp.status_code == 200
+    assert len(resp.json()) == 2
+    assert search("missing").status_code == 404
+    assert search("unconfigured").status_code == 400
@@ -0,0 +1,77 @@
+import json
+import os
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+from torll.core.config import settings
+from torll.db.database import get_db
+from torll.main import app
+from torll.models import models
+from torll.services import rss_poller, seen_cache, tmdb_service
+
+FIXTURE = os.path.join(os.path.dirname(__file__), "fixtures", "nexusphp_rss.xml")
+
+
+@pytest.fixture
+def client(db, session_factory, monkeypatch):
+    monkeypatch.setattr(settings, "SCHEDULER_ENABLED", False)
+    monkeypatch.setattr(rss_poller, "SessionLocal", session_factory)
+    # poller 的信号量属于 TestClient 的事件循环
+    monkeypatch.setattr(rss_poller, "_poller", None)
+    monkeypatch.setattr(seen_cache, "_caches", {})
+    # 不连 TMDb
+    monkeypatch.setattr(tmdb_service, "search_tmdb", lambda query, media_type="multi": [])
+    db.add(models.RssFeedConfig(
+        name="ptexample", rssUrl=FIXTURE, site="ptexample",
+        filters=json.dumps([{"size_gb_min": 1}]),
+    ))
+    db.commit()
+
+    def override_get_db():
+        session = session_factory()
+        try:
+            yield session
+        finally:
+            session.close()
+
+    app.dependency_overrides[get_db] = override_get_db
+    with TestClient(app) as c:
+        yield c
+    app.dependency_overrides.clear()
+
+
+def wait_job(client, job_id, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while True:
+        job = client.get(f"/jobs/{job_id}").json()
+        if job["status"] in ("done", "failed") or time.monotonic() > deadline:
+            return job
+        time.sleep(0.02)
+
+
+def test_process_rss_feed(client, db):
+    resp = client.post("/rss/process/ptexample")
+    assert resp.status_code == 202
+    job = wait_job(client, resp.json()["job_id"])
+
+    assert job["status"] == "done", job
+    assert job["result"]["status"] == "ok"
+    assert job["result"]["total"] == 2
+    assert job["result"]["accepted"] == 2
+    assert db.query(models.RSSHistory).filter(models.RSSHistory.rssname == "ptexample").count() == 2
+
+
+def test_process_rss_all(client, db):
+    resp = client.post("/rss/process_all")
+    assert resp.status_code == 202
+    job = wait_job(client, resp.json()["job_id"])
+
+    assert job["status"] == "done", job
+    assert [(x["name"], x["status"]) for x in job["result"]] == [("ptexample", "ok")]
+    assert db.query(models.RSSHistory).count() == 2
+
+
+def test_process_rss_feed_not_found(client):
+    assert client.post("/rss/process/missing").status_code == 404
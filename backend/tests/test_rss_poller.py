@@ -0,0 +1,94 @@
+import asyncio
+import json
+import os
+
+import feedparser
+import pytest
+from sqlalchemy.exc import SQLAlchemyError
+
+from torll.models import models
+from torll.services import rss_poller, rss_service, seen_cache, tmdb_service
+
+FIXTURE = os.path.join(os.path.dirname(__file__), "fixtures", "nexusphp_rss.xml")
+
+
+@pytest.fixture
+def feed_db(db, session_factory, monkeypatch):
+    monkeypatch.setattr(rss_poller, "SessionLocal", session_factory)
+    # 已见条目缓存按订阅名保存在进程内, 每个测试从空库开始
+    monkeypatch.setattr(seen_cache, "_caches", {})
+    # 不连 TMDb
+    monkeypatch.setattr(tmdb_service, "search_tmdb", lambda query, media_type="multi": [])
+    db.add(models.RssFeedConfig(
+        name="ptexample", rssUrl=FIXTURE, site="PTExample",
+        filters=json.dumps([{"size_gb_min": 1}]),
+    ))
+    db.add(models.RssFeedConfig(name="disabled", rssUrl=FIXTURE, site="ptexample", enable=False))
+    db.commit()
+    return db
+
+
+def test_poll_db_backed_feed_end_to_end(feed_db):
+    feed = rss_poller.load_feed(feed_db, "ptexample")
+    assert feed.site == "ptexample"
+    assert feed.cookie is None
+
+    summary = asyncio.run(rss_poller.RssPoller(2, 1).poll_feed(feed))
+
+    assert summary == {"name": "ptexample", "site": "ptexample", "status": "ok", "total": 2, "accepted": 2}
+    rows = feed_db.query(models.RSSHistory).order_by(models.RSSHistory.id).all()
+    assert [(x.rssname, x.title) for x in rows] == [
+        ("ptexample", "Dune.Part.Two.2024.2160p.WEB-DL.DDP5.1.Atmos.DV.HDR.H.265-FLUX"),
+        ("ptexample", "Dune.Prophecy.S01E01.1080p.WEB-DL.DDP5.1.H.264-NTb"),
+    ]
+    assert feed_db.query(models.SiteTorrent).count() == 2
+
+    # 再次抓取, 条目都已入库
+    again = asyncio.run(rss_poller.RssPoller(2, 1).poll_feed(rss_poller.load_feed(feed_db, "ptexample")))
+    assert (again["status"], again["accepted"]) == ("ok", 0)
+    assert feed_db.query(models.RSSHistory).count() == 2
+
+
+def test_load_enabled_feeds_skips_disabled(feed_db):
+    assert [x.name for x in rss_poller.load_enabled_feeds(feed_db)] == ["ptexample"]
+
+
+def ingest_with_etag(feed_db, session_factory, etag):
+    parsed = feedparser.parse(FIXTURE)
+    parsed["etag"] = etag
+    db = session_factory()
+    try:
+        return rss_poller.load_feed(feed_db, "ptexample").ingest_feed(db, parsed)
+    finally:
+        db.close()
+
+
+def stored_etag(feed_db):
+    feed_db.expire_all()
+    return feed_db.query(models.RssFeedConfig).filter(models.RssFeedConfig.name == "ptexample").one().etag
+
+
+def test_validators_survive_batch_rollback(feed_db, session_factory, monkeypatch):
+    write_items = rss_service.RssFeed.write_items
+
+    def batch_fails(self, db, items):
+        if len(items) > 1:
+            raise SQLAlchemyError("batch failed")
+        return write_items(self, db, items)
+
+    monkeypatch.setattr(rss_service.RssFeed, "write_items", batch_fails)
+    summary = ingest_with_etag(feed_db, session_factory, '"v1"')
+
+    # 整批回滚后逐条保存成功, ETag 仍记下
+    assert summary["accepted"] == 2
+    assert stored_etag(feed_db) == '"v1"'
+
+
+def test_validators_not_saved_when_entries_are_not(feed_db, session_factory, monkeypatch):
+    def broken(self, db, items):
+        raise RuntimeError("write failed")
+
+    monkeypatch.setattr(rss_service.RssFeed, "write_items", broken)
+    with pytest.raises(RuntimeError):
+        ingest_with_etag(feed_db, session_factory, '"v1"')
+    assert stored_etag(feed_db) is None
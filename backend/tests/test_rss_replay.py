@@ -0,0 +1,83 @@
+import random
+from collections import Counter
+from types import SimpleNamespace
+
+from torll.models import models
+from torll.services import rss_replay, rssfilter
+
+GB = 10**9
+
+
+def history(db, *rows):
+    for title, subtitle, size, tags in rows:
+        db.add(models.RSSHistory(
+            site="ptexample", rssname="ptexample", title=title, subtitle=subtitle,
+            size=size * GB, rsstags=tags,
+        ))
+    db.commit()
+
+
+def test_replay_reports_reasons_per_filter(db):
+    history(
+        db,
+        ("Dune.Part.Two.2024.2160p", "沙丘2 中字", 40, "中字"),
+        ("Dune.Prophecy.S01E01.1080p", "沙丘：预言", 3, ""),
+        ("Alien.Romulus.2024.1080p", "异形", 12, "禁转"),
+        ("Some.Show.S02E03.720p", "", 1, "官方"),
+    )
+    filters = [
+        {"size_gb_max": 30, "rsstags_regex": "中字|禁转", "rsstags_not_regex": "禁转"},
+        {"size_gb_min": 2, "title_regex": "dune"},
+    ]
+
+    result = rss_replay.replay_filters(db, filters, days=1)
+
+    assert (result["total"], result["accepted"], result["rejected"]) == (4, 2, 2)
+    assert result["accepted_by_filter"] == {"1": 2}
+    # 整体的 reason 是最后一个 filter 的, 每个 filter 自己的拒绝原因单独列出
+    assert result["reasons"] == {"DL": 2, "TITLE_REGEX": 1, "SIZE_MIN": 1}
+    assert result["rejected_by_filter"] == {
+        "0": {"SIZE_MAX": 1, "RSS_TAG_REGEX": 2, "RSS_TAG_NOT_REGEX": 1},
+        "1": {"TITLE_REGEX": 1, "SIZE_MIN": 1},
+    }
+    assert [x["title"] for x in result["samples"]] == ["Dune.Part.Two.2024.2160p", "Dune.Prophecy.S01E01.1080p"]
+
+
+def test_replay_batches_agree_with_per_item_apply():
+    random.seed(5)
+    words = ["Dune", "Alien", "Heat", "Show", "Matrix"]
+    rows = [
+        SimpleNamespace(
+            title=f"{random.choice(words)}.S0{random.randint(1, 3)}.{random.choice(['720p', '1080p', '2160p'])}",
+            subtitle=random.choice(["", "中字", "国语 h3", "第1集"]),
+            size=random.randint(1, 60) * GB,
+            rsstags=random.choice(["", "中字", "禁转"]),
+            rsscatstr=random.choice(["Movies", "TV Series", "Anime"]),
+        )
+        for _ in range(3000)
+    ]
+    filters = [
+        {"title_regex": "dune|alien", "size_gb_max": 40, "no_hr": True},
+        {"title_regex": r"S0[12]", "subtitle_regex": "中字|集", "rsscat_regex": "TV"},
+        {"title_regex": "matrix", "rsstags_not_regex": "禁转"},
+        {"size_gb_min": 10, "title_regex": "2160p", "rsscat_not_regex": "Anime"},
+    ]
+    program = rssfilter.compile_filters(filters)
+    expected = Counter()
+    per_filter = Counter()
+    for row in rows:
+        reason, cf = program.apply(row)
+        expected[reason] += 1
+        if cf is not None:
+            per_filter[program.filters.index(cf)] += 1
+
+    result = rss_replay.replay_batches(program, [rows[i:i + 700] for i in range(0, len(rows), 700)])
+
+    assert result["total"] == 3000
+    assert result["reasons"] == expected
+    assert result["accepted_by_filter"] == per_filter
+    # 每个 filter 拒绝的条目数 = 到达它的条目数 - 它接受的
+    reached = 3000
+    for fi in range(len(filters)):
+        assert sum(result["rejected_by_filter"][fi].values()) == reached - per_filter[fi]
+        reached -= per_filter[fi]
@@ -0,0 +1,72 @@
+from types import SimpleNamespace
+
+from torll.services import rssfilter, watchlist
+
+
+def item(title, subtitle="", size=5 * 10**9):
+    return SimpleNamespace(title=title, subtitle=subtitle, size=size, rsstags="", rsscatstr="")
+
+
+def program(*rules):
+    return rssfilter.FilterProgram(tuple(rssfilter.compile_filter(rule) for rule in rules))
+
+
+def test_gate_names_the_filter_that_hit():
+    prog = program(
+        {"title_regex": "dune"},
+        {"title_regex": r"2160p|1080p"},
+        {"title_regex": r"^the\b"},
+        {"title_regex": r"(\d+)\1"},  # 反向引用不参与合并
+    )
+    (gate,) = prog.gates
+    assert gate.members == {0, 1, 2}
+
+    assert gate.hits("Dune.Part.Two.2024.1080p") == {0: True}
+    assert gate.hits("The.Brutalist.2024.2160p") == {2: True}
+    assert gate.hits("Arrival.2016.1080p") == {1: True}
+    # 没有任何命中时全部排除
+    assert gate.hits("Arrival.2016.720p") == {0: False, 1: False, 2: False}
+
+
+def test_apply_uses_gate_results_for_every_filter():
+    prog = program(
+        {"size_gb_min": 10, "title_regex": "dune"},
+        {"title_regex": "2160p", "subtitle_regex": "中字"},
+        {"title_regex": "x265", "subtitle_regex": "国语"},
+    )
+    assert len(prog.gates) == 2
+
+    assert prog.apply(item("Dune.2021.2160p", "中字")) == ("DL", prog.filters[1])
+    # 最后一个 filter 的 reason 按检查顺序给出, 正则结果来自合并扫描
+    assert prog.apply(item("Dune.2021.1080p.x265", "中字")) == ("SUBTITLE_REGEX", None)
+    assert prog.apply(item("Other.1080p", "国语")) == ("TITLE_REGEX", None)
+
+    # 合并扫描不执行单条正则
+    def boom(dbrssitem):
+        raise AssertionError("per-filter regex ran")
+
+    last = prog.filters[2]
+    last.checks = tuple((reason, boom if key else check, key) for reason, check, key in last.checks)
+    assert prog.apply(item("Other.x265", "国语")) == ("DL", last)
+    assert prog.apply(item("Other.1080p", "国语")) == ("TITLE_REGEX", None)
+
+
+def test_compiled_programs_are_keyed_on_watchlist_version():
+    match = watchlist.WatchlistMatch(1, "Dune", 438631, "movie", "tt1160419")
+    filters = [{"watchlist": True}]
+    old = watchlist.WatchlistIndex([(match, "dune")], version=(1, "v1"))
+    rebuilt = watchlist.WatchlistIndex([(match, "dune")], version=(1, "v1"))
+    prog = rssfilter.compile_filters(filters, old)
+    assert rssfilter.compile_filters(filters, rebuilt) is prog
+    assert prog.apply(item("Dune.Part.Two.2024.1080p"))[0] == "DL"
+
+    # 关注列表变化后重新编译, 旧版本的结果被丢弃
+    changed = watchlist.WatchlistIndex([], version=(0, "v2"))
+    assert rssfilter.compile_filters(filters, changed).apply(item("Dune.Part.Two.2024.1080p"))[0] != "DL"
+    assert all(key[1] != ("version", (1, "v1")) for key in rssfilter._programs)
+
+
+def test_match_filter_uses_the_compiled_cache(monkeypatch):
+    rf = rssfilter.RssFilter([{"title_regex": "dune"}])
+    monkeypatch.setattr(rssfilter, "compile_filter", None)
+    assert rf.matchFilter({"title_regex": "dune"}, item("Dune.Part.Two")) == "DL"
@@ -0,0 +1,118 @@
+import asyncio
+import json
+import os
+
+import pytest
+
+from torll.models import models
+from torll.services import scheduler as scheduler_module, site_update, tmdb_service
+from torll.services.scheduler import FeedScheduler
+from torll.services.site_config import SiteConfigStore
+
+from test_pt_search import FakeResponse, SITE_CONFIGS
+
+LISTING = os.path.join(os.path.dirname(__file__), "fixtures", "nexusphp_search.html")
+
+
+@pytest.fixture
+def site_env(tmp_path, monkeypatch, db, session_factory):
+    configs = dict(SITE_CONFIGS, ptexample=dict(SITE_CONFIGS["ptexample"], newtorrent="torrents.php"))
+    config_file = tmp_path / "siteconfig.json"
+    config_file.write_text(json.dumps(configs), encoding="utf-8")
+    monkeypatch.setattr(site_update, "site_configs", SiteConfigStore(str(config_file)))
+    monkeypatch.setattr(site_update, "SessionLocal", session_factory)
+    monkeypatch.setattr(scheduler_module, "SessionLocal", session_factory)
+    monkeypatch.setattr(tmdb_service, "search_tmdb", lambda query, media_type="multi": [])
+
+    requested = []
+
+    def fake_site_get(url, cookie, site=None, **kwargs):
+        requested.append((url, cookie, site))
+        if "page=" in url:
+            # 第一页之后没有更早的种子
+            return FakeResponse(b"<html><body><table class='torrents'></table></body></html>")
+        with open(LISTING, "rb") as f:
+            return FakeResponse(f.read())
+
+    monkeypatch.setattr(site_update, "site_get", fake_site_get)
+    db.add(models.PtSite(site="ptexample", cookie="uid=1; pass=x", auto_update=True, update_interval=900))
+    db.add(models.PtSite(site="manual", cookie="uid=1", auto_update=False))
+    db.commit()
+    return requested
+
+
+def run_site_job(sched):
+    async def run():
+        await sched.reload()
+        job = sched._jobs[("site", "ptexample")]
+        assert job.interval == 900
+        return await sched._execute(job)
+
+    return asyncio.run(run())
+
+
+def test_site_job_scrapes_listing_and_raises_mark(site_env, db):
+    sched = FeedScheduler(jitter=0.1, max_backoff=3600, reload_interval=60)
+
+    assert run_site_job(sched) is True
+    assert set(sched._jobs) == {("site", "ptexample")}
+
+    assert site_env == [("https://pt.example.org/torrents.php", "uid=1; pass=x", "ptexample")]
+    rows = db.query(models.SiteTorrent).order_by(models.SiteTorrent.id).all()
+    # 旧的在前入库
+    assert [x.infolink for x in rows] == [
+        "https://pt.example.org/details.php?id=1188&hit=1",
+        "https://pt.example.org/details.php?id=1201&hit=1",
+    ]
+    assert rows[1].downlink == "https://pt.example.org/download.php?id=1201"
+    site = db.query(models.PtSite).filter(models.PtSite.site == "ptexample").one()
+    assert (site.last_torrent_id, site.updateing, site.newTorCount) == (1201, 0, 2)
+    # 首次站新只看第一页, 更早的留给补全
+    assert (site.backfill_page, site.backfill_torrent_id) == (1, None)
+
+    # 再跑一次: 第一页已到达高水位, 不再翻页也不重复入库
+    db.expire_all()
+    assert run_site_job(sched) is True
+    assert len(site_env) == 2
+    assert db.query(models.SiteTorrent).count() == 2
+
+
+def test_site_job_fails_for_unconfigured_site(site_env, db):
+    db.query(models.PtSite).filter(models.PtSite.site == "ptexample").update({"site": "unknown"})
+    db.commit()
+    sched = FeedScheduler(jitter=0.1, max_backoff=3600, reload_interval=60)
+
+    async def run():
+        await sched.reload()
+        return await sched._execute(sched._jobs[("site", "unknown")])
+
+    assert asyncio.run(run()) is False
+    assert site_env == []
+
+
+def test_backfill_job_covers_the_gap_then_is_dropped(site_env, db, monkeypatch):
+    monkeypatch.setattr(site_update.settings, "SITE_SCRAPE_MAX_PAGES", 1)
+    db.query(models.PtSite).filter(models.PtSite.site == "ptexample").update({"last_torrent_id": 1000})
+    db.commit()
+    sched = FeedScheduler(jitter=0.1, max_backoff=3600, reload_interval=60)
+
+    # 一页内没有走到 1000: 高水位照样提升, 1000 以上未抓的区间留给补全
+    assert run_site_job(sched) is True
+    site = db.query(models.PtSite).filter(models.PtSite.site == "ptexample").one()
+    assert (site.last_torrent_id, site.backfill_page, site.backfill_torrent_id) == (1201, 1, 1000)
+
+    async def run_backfill():
+        await sched.reload()
+        assert set(sched._jobs) == {("site", "ptexample"), ("backfill", "ptexample")}
+        job = sched._jobs[("backfill", "ptexample")]
+        assert job.interval == site_update.settings.SITE_BACKFILL_INTERVAL
+        ok = await sched._execute(job)
+        await sched.reload()
+        return ok
+
+    assert asyncio.run(run_backfill()) is True
+    assert site_env[-1][0] == "https://pt.example.org/torrents.php?page=1"
+    db.expire_all()
+    site = db.query(models.PtSite).filter(models.PtSite.site == "ptexample").one()
+    assert (site.backfill_page, site.backfill_torrent_id) == (None, None)
+    assert set(sched._jobs) == {("site", "ptexample")}
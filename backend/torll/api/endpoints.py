@@ -1,10 +1,15 @@
 from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 from typing import List, Optional
+import json
 
 from torll.db.database import get_db
 from torll.schemas import schemas, rss_schemas
-from torll.services import crud, rss_service, download_service, pt_search_service
+from torll.services import crud, rss_service, rss_poller, rssfilter, rss_replay, download_service, pt_search_service, seen_cache, watchlist
+from torll.services.ratelimit import rate_limiter
+from torll.services.jobs import job_manager
 
 router = APIRouter()
 
@@ -12,26 +17,57 @@ router = APIRouter()
 async def get_rss_status():
     return {"status": "RSS module is active"}
 
-@router.post("/rss/process/{feed_name}")
+@router.get("/rss/seen_cache/stats")
+def get_rss_seen_cache_stats():
+    return seen_cache.get_seen_cache_stats()
+
+@router.post("/rss/process/{feed_name}", status_code=status.HTTP_202_ACCEPTED)
 async def process_rss_feed(feed_name: str, db: Session = Depends(get_db)):
     db_rss_feed_config = crud.get_rss_feed_config_by_name(db, name=feed_name)
     if db_rss_feed_config is None:
         raise HTTPException(status_code=404, detail="RSS Feed config not found")
 
-    # Convert db_rss_feed_config to RssFeedConfigBase for rss_service.RssFeed
-    # This might require some adjustments in rss_service.RssFeed if it expects a Pydantic model
-    # or a dictionary with specific keys.
-    rss_processor = rss_service.RssFeed(rss_schemas.RssFeedConfigBase.from_orm(db_rss_feed_config))
-    rss_processor.process_rss_feeds(db)
-    return {"message": f"RSS feed {feed_name} processed successfully."}
+    # 抓取和入库在后台执行, 立即返回 job id, 由 /jobs/{job_id} 查询进度
+    rss_processor = rss_service.RssFeed(rss_schemas.RssFeedConfig.model_validate(db_rss_feed_config))
+    job = job_manager.submit(
+        "rss", feed_name,
+        lambda job: rss_poller.get_poller().poll_feed(rss_processor, progress=job.set_progress)
+    )
+    return {"job_id": job.id, "message": f"RSS feed {feed_name} processing started."}
+
+@router.post("/rss/process_all", status_code=status.HTTP_202_ACCEPTED)
+async def process_all_rss_feeds():
+    job = job_manager.submit(
+        "rss_all", "*", lambda job: rss_poller.get_poller().poll_all(progress=job.set_progress)
+    )
+    return {"job_id": job.id, "message": "Processing all enabled RSS feeds."}
+
+@router.get("/jobs/")
+def read_jobs():
+    return [job.to_dict() for job in job_manager.list()]
+
+@router.get("/jobs/{job_id}")
+def read_job(job_id: str):
+    job = job_manager.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job.to_dict()
 
 @router.get("/rss/history/{rss_name}", response_model=List[rss_schemas.RSSHistory])
 def read_rss_history_by_name(rss_name: str, db: Session = Depends(get_db)):
     return crud.get_rss_history_by_name(db, rss_name=rss_name)
 
 # Endpoints for managing RssFeedConfig
+def check_rss_filters(filters: str, db: Session):
+    """Reject filter rules that do not compile, instead of failing at match time."""
+    try:
+        rssfilter.compile_filters(json.loads(filters or "[]"), watchlist.get_index(db))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid filters: {e}")
+
 @router.post("/rss/configs/", response_model=rss_schemas.RssFeedConfig, status_code=status.HTTP_201_CREATED)
 def create_rss_feed_config(rss_feed_config: rss_schemas.RssFeedConfigCreate, db: Session = Depends(get_db)):
+    check_rss_filters(rss_feed_config.filters, db)
     db_rss_feed_config = crud.get_rss_feed_config_by_name(db, name=rss_feed_config.name)
     if db_rss_feed_config:
         raise HTTPException(status_code=400, detail="RSS Feed config with this name already exists")
@@ -51,11 +87,27 @@ def read_rss_feed_config(config_id: int, db: Session = Depends(get_db)):
 
 @router.put("/rss/configs/{config_id}", response_model=rss_schemas.RssFeedConfig)
 def update_rss_feed_config(config_id: int, rss_feed_config: rss_schemas.RssFeedConfigCreate, db: Session = Depends(get_db)):
+    check_rss_filters(rss_feed_config.filters, db)
     db_rss_feed_config = crud.update_rss_feed_config(db, config_id=config_id, rss_feed_config=rss_feed_config)
     if db_rss_feed_config is None:
         raise HTTPException(status_code=404, detail="RSS Feed config not found")
     return db_rss_feed_config
 
+@router.post("/rss/configs/{config_id}/replay", response_model=rss_schemas.RssReplayResult)
+def replay_rss_feed_filters(config_id: int, replay: rss_schemas.RssReplayRequest, db: Session = Depends(get_db)):
+    """Dry-run filters against recent rss_history: what would have been accepted, and why not."""
+    db_rss_feed_config = crud.get_rss_feed_config(db, config_id=config_id)
+    if db_rss_feed_config is None:
+        raise HTTPException(status_code=404, detail="RSS Feed config not found")
+    filters = replay.filters if replay.filters is not None else db_rss_feed_config.filters
+    try:
+        return rss_replay.replay_filters(
+            db, json.loads(filters or "[]"), days=replay.days,
+            rssname=None if replay.all_feeds else db_rss_feed_config.name,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid filters: {e}")
+
 @router.delete("/rss/configs/{config_id}", status_code=status.HTTP_204_NO_CONTENT)
 def delete_rss_feed_config(config_id: int, db: Session = Depends(get_db)):
     db_rss_feed_config = crud.delete_rss_feed_config(db, config_id=config_id)
@@ -86,6 +138,8 @@ def update_pt_site(config_id: int, pt_site: schemas.PtSiteUpdate, db: Session =
     db_pt_site = crud.update_pt_site(db, pt_site_id=config_id, pt_site=pt_site)
     if db_pt_site is None:
         raise HTTPException(status_code=404, detail="PT Site not found")
+    # 限速配置立即生效
+    rate_limiter.load(db)
     return db_pt_site
 
 @router.delete("/pt_configs/{config_id}", status_code=status.HTTP_204_NO_CONTENT)
@@ -95,6 +149,10 @@ def delete_pt_site(config_id: int, db: Session = Depends(get_db)):
         raise HTTPException(status_code=404, detail="PT Site not found")
     return {"message": "PT Site deleted successfully"}
 
+@router.get("/sites/ratelimit/stats")
+def get_site_ratelimit_stats():
+    return rate_limiter.stats()
+
 @router.get("/site_torrents/", response_model=List[schemas.SiteTorrent])
 def read_site_torrents(
     skip: int = 0,
@@ -157,7 +215,25 @@ def read_search_cache(
 
 @router.post("/search/pt")
 def search_pt(search_request: schemas.PTSearchRequest, db: Session = Depends(get_db)):
-    return pt_search_service.search_pt_site(db, search_request.search_term, search_request.site_name)
+    try:
+        return pt_search_service.search_pt_site(db, search_request.search_term, search_request.site_name)
+    except pt_search_service.SiteNotFound as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except pt_search_service.SiteNotConfigured as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except pt_search_service.SiteSearchError as e:
+        raise HTTPException(status_code=502, detail=str(e))
+
+@router.post("/search/pt/stream")
+async def search_pt_stream(search_request: schemas.PTSearchAllRequest):
+    """Search all PT sites at once; one NDJSON line per site, in the order the sites answer."""
+    async def lines():
+        async for result in pt_search_service.search_all_sites(
+            search_request.search_term, search_request.sites
+        ):
+            yield json.dumps(jsonable_encoder(result), ensure_ascii=False) + "\n"
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
 
 @router.post("/tor_details/", response_model=schemas.TorDetail)
 def create_tor_detail(tor_detail: schemas.TorDetailCreate, db: Session = Depends(get_db)):
@@ -176,3 +252,25 @@ def read_tor_media_item(tor_media_item_id: int, db: Session = Depends(get_db)):
     if db_tor_media_item is None:
         raise HTTPException(status_code=404, detail="TorMediaItem not found")
     return db_tor_media_item
+
+@router.get("/watchlist/", response_model=List[schemas.WatchlistItem])
+def read_watchlist(skip: int = 0, limit: int = 100, title: Optional[str] = None, db: Session = Depends(get_db)):
+    return crud.get_watchlist_items(db, skip=skip, limit=limit, title=title)
+
+@router.post("/watchlist/", response_model=schemas.WatchlistItem, status_code=status.HTTP_201_CREATED)
+def create_watchlist_item(item: schemas.WatchlistItemCreate, db: Session = Depends(get_db)):
+    return crud.create_watchlist_item(db, item=item)
+
+@router.put("/watchlist/{item_id}", response_model=schemas.WatchlistItem)
+def update_watchlist_item(item_id: int, item: schemas.WatchlistItemCreate, db: Session = Depends(get_db)):
+    db_item = crud.update_watchlist_item(db, item_id=item_id, item=item)
+    if db_item is None:
+        raise HTTPException(status_code=404, detail="Watchlist item not found")
+    return db_item
+
+@router.delete("/watchlist/{item_id}", status_code=status.HTTP_204_NO_CONTENT)
+def delete_watchlist_item(item_id: int, db: Session = Depends(get_db)):
+    db_item = crud.delete_watchlist_item(db, item_id=item_id)
+    if db_item is None:
+        raise HTTPException(status_code=404, detail="Watchlist item not found")
+    return {"message": "Watchlist item deleted successfully"}
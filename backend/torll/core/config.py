@@ -21,6 +21,47 @@ def get_config_from_ini():
 class Settings(BaseSettings):
     DATABASE_URL: str = f"sqlite:///{os.path.join(BASE_DIR, 'torll.db')}"
     TMDB_API_KEY: str = "YOUR_TMDB_API_KEY"
+    # 每个 RSS 任务在内存中保留的已见条目数
+    RSS_SEEN_CACHE_SIZE: int = 5000
+    # 同时抓取的 RSS 数, 及同一站点同时抓取的 RSS 数
+    RSS_POLL_CONCURRENCY: int = 8
+    RSS_POLL_PER_SITE: int = 2
+    # TMDb 查询缓存: 命中结果 / 无结果 的有效期(秒), 内存中的条目数
+    TMDB_CACHE_TTL: int = 7 * 24 * 3600
+    TMDB_CACHE_MISS_TTL: int = 6 * 3600
+    TMDB_CACHE_MEMORY_SIZE: int = 2048
+    # 内置定时任务: 按 RssFeedConfig.interval 抓取 RSS, 按 PtSite.update_interval 站新并补全旧页
+    SCHEDULER_ENABLED: bool = True
+    SCHEDULER_JITTER: float = 0.1
+    SCHEDULER_MAX_BACKOFF: int = 3600
+    SCHEDULER_RELOAD_INTERVAL: int = 60
+    # 访问站点页面: 每站点连接池大小, 失败重试次数 / 退避系数, 超时(秒)
+    SITE_HTTP_POOL_SIZE: int = 4
+    SITE_HTTP_RETRIES: int = 2
+    SITE_HTTP_BACKOFF: float = 0.5
+    SITE_HTTP_TIMEOUT: int = 15
+    # 站点请求限速默认值 (PtSite 未配置时): 每秒请求数, 突发数; 限速配置重新读取间隔(秒)
+    SITE_RATE_DEFAULT: float = 1.0
+    SITE_BURST_DEFAULT: int = 2
+    SITE_RATE_RELOAD: int = 60
+    # 并发获取 / 解析详情页的线程数 (仍受站点限速约束)
+    SITE_DETAIL_WORKERS: int = 8
+    # 站新时并发做 TMDb 解析的线程数
+    SITE_TMDB_WORKERS: int = 4
+    # 种子名 -> TMDb 解析结果 在内存中缓存的条目数
+    NAME_PARSER_CACHE_SIZE: int = 4096
+    # 多站点搜索时每个站点的超时(秒)
+    PT_SEARCH_SITE_TIMEOUT: int = 30
+    # 站点 XPath 配置文件 (空则用 BASE_DIR/siteconfig.json)
+    SITE_CONFIG_FILE: str = ""
+    # 站新最多向后翻的页数; 补全旧页: 间隔(秒), 最多补到第几页
+    SITE_SCRAPE_MAX_PAGES: int = 5
+    SITE_BACKFILL_INTERVAL: int = 600
+    SITE_BACKFILL_MAX_PAGES: int = 50
+    # 详情页缓存: 目录 (空则用 BASE_DIR/detail_cache), 做种数 / 评分 的有效期(秒)
+    DETAIL_CACHE_DIR: str = ""
+    DETAIL_CACHE_TTL_VOLATILE: int = 1800
+    DETAIL_CACHE_TTL_RATING: int = 24 * 3600
 
 # Initialize settings by first getting values from the INI file
 settings = Settings(**get_config_from_ini())
\ No newline at end of file
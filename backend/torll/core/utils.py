@@ -0,0 +1,12 @@
+def tryint(value) -> int:
+    try:
+        return int(value)
+    except (ValueError, TypeError):
+        return 0
+
+
+def tryFloat(value) -> float:
+    try:
+        return float(value)
+    except (ValueError, TypeError):
+        return 0.0
@@ -1,3 +1,4 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, Depends
 from sqlalchemy.orm import Session
 from fastapi.middleware.cors import CORSMiddleware
@@ -5,8 +6,20 @@ from fastapi.middleware.cors import CORSMiddleware
 from torll.db.database import SessionLocal, engine, Base, get_db
 from torll.models import models
 from torll.api import endpoints
+from torll.services.scheduler import scheduler
+from torll.services.site_session import site_sessions
+from torll.core.config import settings
 
-app = FastAPI()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if settings.SCHEDULER_ENABLED:
+        scheduler.start()
+    yield
+    await scheduler.stop()
+    site_sessions.close()
+
+app = FastAPI(lifespan=lifespan)
 
 origins = [
     "http://localhost:5006",
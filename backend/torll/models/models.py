@@ -9,6 +9,7 @@ from sqlalchemy import (
     ForeignKey,
     Text,
     Enum,
+    Index,
 )
 from sqlalchemy.orm import relationship
 from datetime import datetime
@@ -141,6 +142,22 @@ class TorDownload(Base):
     torcped_at = Column(DateTime, default=datetime.now)
 
 
+class BestDownload(Base):
+    """每个 (media_title, season, resolution) 当前已下载的最优版本, 供择优判断直接按主键查找"""
+    __tablename__ = "best_download"
+
+    media_title = Column(String(255), primary_key=True)
+    season = Column(String(20), primary_key=True, default="")
+    resolution = Column(String(20), primary_key=True, default="")
+    tmdbid = Column(String(20), index=True)
+    group = Column(String(50))
+    group_score = Column(Integer)
+    tor_download_id = Column(
+        Integer, ForeignKey("tor_download.id", ondelete="SET NULL"), nullable=True
+    )
+    updated_at = Column(DateTime, default=datetime.now, onupdate=datetime.now)
+
+
 class SiteTorrent(Base):
     __tablename__ = "site_torrent"
 
@@ -197,6 +214,16 @@ class PtSite(Base):
     lastResultCount = Column(Integer, default=0)
     newTorCount = Column(Integer, default=0)
     lastNewStatus = Column(Integer, default=0)
+    # 站点请求限速: 每秒请求数, 突发数; 为空时用默认值
+    rate_limit = Column(Float)
+    rate_burst = Column(Integer)
+    # 高水位: 已抓取到的最新种子 id / 时间; 补全旧页时下一个要抓的页码, 为空表示不需要补全
+    last_torrent_id = Column(BigInteger)
+    last_torrent_date = Column(DateTime)
+    backfill_page = Column(Integer)
+    # 补全区间的下界: 未到达高水位时的旧高水位, 补全走到这里为止
+    backfill_torrent_id = Column(BigInteger)
+    backfill_torrent_date = Column(DateTime)
 
 
 class TorrentCache(Base):
@@ -256,6 +283,9 @@ class RssFeedConfig(Base):
     getDetail = Column(Boolean, default=False)
     optpick = Column(String(255))
     qbitname = Column(String(64))
+    # 条件请求: 上次取得的 ETag / Last-Modified
+    etag = Column(String(255))
+    modified = Column(String(64))
 
 
 class RSSHistory(Base):
@@ -280,6 +310,55 @@ class RSSHistory(Base):
     rsstags = Column(String(64))
     pubdate = Column(DateTime)
 
+    __table_args__ = (
+        # 查重: RssFeed.existing_in_rsshistory 按 (title, subtitle) 批量查询
+        Index("ix_rss_history_title_subtitle", "title", "subtitle"),
+    )
+
+
+class TmdbCache(Base):
+    __tablename__ = "tmdb_cache"
+
+    id = Column(Integer, primary_key=True)
+    query_key = Column(String(255), nullable=False)
+    media_type = Column(String(20), nullable=False)
+    result = Column(Text)  # JSON 结果列表, 空列表表示无结果
+    expires_at = Column(DateTime, nullable=False)
+    created_at = Column(DateTime, default=datetime.now)
+
+    __table_args__ = (
+        Index("ix_tmdb_cache_query_media_type", "query_key", "media_type", unique=True),
+    )
+
+
+class Watchlist(Base):
+    __tablename__ = "watchlist"
+
+    id = Column(Integer, primary_key=True)
+    title = Column(String(255), nullable=False)
+    norm_title = Column(String(255), index=True)
+    tmdbid = Column(String(20), index=True)
+    tmdbcat = Column(String(20))
+    imdbid = Column(String(20), index=True)
+    enable = Column(Boolean, default=True)
+    added_on = Column(DateTime, default=datetime.now)
+    updated_at = Column(DateTime, default=datetime.now, onupdate=datetime.now)
+
+
+class DetailPageCache(Base):
+    __tablename__ = "detail_page_cache"
+
+    id = Column(Integer, primary_key=True)
+    info_link = Column(String(256), nullable=False, unique=True, index=True)
+    site = Column(String(32), index=True)
+    content_hash = Column(String(64))  # 磁盘上 gzip 压缩页面的 sha256
+    etag = Column(String(255))
+    last_modified = Column(String(64))
+    fetched_at = Column(DateTime)
+    parsed = Column(Text)  # JSON: 从页面解析出的 TorDetail 字段
+    parser_version = Column(String(64))
+    parsed_at = Column(DateTime)
+
 
 class LogRecord(Base):
     __tablename__ = "logs"
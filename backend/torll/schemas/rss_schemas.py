@@ -1,5 +1,5 @@
-from pydantic import BaseModel, Field
-from typing import Optional, List
+from pydantic import BaseModel, ConfigDict, Field, field_validator
+from typing import Optional, List, Dict, Any
 from datetime import datetime
 import json
 
@@ -17,6 +17,12 @@ class RssFeedConfigBase(BaseModel):
     action: str = "download"
     interval: int = 600
 
+    @field_validator("filters", mode="before")
+    @classmethod
+    def empty_filters(cls, value):
+        # 库中 filters 列可为空
+        return "[]" if value is None else value
+
     # Custom validator to ensure filters is a valid JSON string
     def set_filters(self, value: List[str]):
         self.filters = json.dumps(value)
@@ -30,9 +36,28 @@ class RssFeedConfigCreate(RssFeedConfigBase):
 
 class RssFeedConfig(RssFeedConfigBase):
     id: int
+    etag: Optional[str] = None
+    modified: Optional[str] = None
+
+    model_config = ConfigDict(from_attributes=True)
+
+class RssReplayRequest(BaseModel):
+    filters: Optional[str] = Field(default=None, description="JSON string of filters, defaults to the saved ones")
+    days: int = Field(default=7, ge=1, description="How many days of rss_history to replay")
+    all_feeds: bool = False
+
+
+class RssReplayResult(BaseModel):
+    total: int
+    accepted: int
+    rejected: int
+    reasons: Dict[str, int]
+    accepted_by_filter: Dict[str, int]
+    # 每个 filter 拒绝到达它的条目 (之前的 filter 都未接受) 的原因计数
+    rejected_by_filter: Dict[str, Dict[str, int]]
+    samples: List[Dict[str, Any]]
+    elapsed_ms: float
 
-    class Config:
-        orm_mode = True
 
 class RSSHistoryBase(BaseModel):
     site: str
@@ -55,5 +80,4 @@ class RSSHistory(RSSHistoryBase):
     id: int
     added_on: datetime
 
-    class Config:
-        orm_mode = True
+    model_config = ConfigDict(from_attributes=True)
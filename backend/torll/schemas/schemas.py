@@ -1,6 +1,6 @@
 from pydantic import BaseModel
 from datetime import datetime
-from typing import Optional
+from typing import Optional, List
 
 class TorDetailBase(BaseModel):
     media_title: Optional[str] = None
@@ -207,6 +207,10 @@ class PTSearchRequest(BaseModel):
     search_term: str
     site_name: str
 
+class PTSearchAllRequest(BaseModel):
+    search_term: str
+    sites: Optional[List[str]] = None  # 为空时搜索全部站点
+
 class PtSiteBase(BaseModel):
     site: Optional[str] = None
     auto_update: Optional[bool] = None
@@ -219,6 +223,8 @@ class PtSiteBase(BaseModel):
     lastResultCount: Optional[int] = None
     newTorCount: Optional[int] = None
     lastNewStatus: Optional[int] = None
+    rate_limit: Optional[float] = None
+    rate_burst: Optional[int] = None
 
 class PtSiteCreate(PtSiteBase):
     site: str # Site name is required for creation
@@ -231,6 +237,29 @@ class PtSite(PtSiteBase):
     id: int
     addedon: datetime
     last_update: datetime
+    last_torrent_id: Optional[int] = None
+    last_torrent_date: Optional[datetime] = None
+    backfill_page: Optional[int] = None
+    backfill_torrent_id: Optional[int] = None
+    backfill_torrent_date: Optional[datetime] = None
 
     class Config:
-        orm_mode = True
\ No newline at end of file
+        orm_mode = True
+
+class WatchlistItemBase(BaseModel):
+    title: str
+    tmdbid: Optional[str] = None
+    tmdbcat: Optional[str] = None
+    imdbid: Optional[str] = None
+    enable: Optional[bool] = True
+
+class WatchlistItemCreate(WatchlistItemBase):
+    pass
+
+class WatchlistItem(WatchlistItemBase):
+    id: int
+    norm_title: Optional[str] = None
+    added_on: datetime
+
+    class Config:
+        orm_mode = True
@@ -2,6 +2,7 @@ from sqlalchemy.orm import Session
 from typing import List, Optional
 from torll.models import models
 from torll.schemas import schemas, rss_schemas
+from torll.services.watchlist import normalize_name
 
 def get_tor_detail(db: Session, tor_detail_id: int):
     return db.query(models.TorDetail).filter(models.TorDetail.id == tor_detail_id).first()
@@ -33,7 +34,7 @@ def get_rss_feed_config_by_name(db: Session, name: str):
 def get_rss_feed_configs(db: Session, skip: int = 0, limit: int = 100):
     return db.query(models.RssFeedConfig).offset(skip).limit(limit).all()
 
-def update__feed_config(db: Session, config_id: int, rss_feed_config: rss_schemas.RssFeedConfigCreate):
+def update_rss_feed_config(db: Session, config_id: int, rss_feed_config: rss_schemas.RssFeedConfigCreate):
     db_rss_feed_config = db.query(models.RssFeedConfig).filter(models.RssFeedConfig.id == config_id).first()
     if db_rss_feed_config:
         for key, value in rss_feed_config.dict().items():
@@ -91,6 +92,10 @@ def get_qbit_config_by_name(db: Session, name: str):
 def delete_download(db: Session, download_id: int):
     db_download = db.query(models.TorDownload).filter(models.TorDownload.id == download_id).first()
     if db_download:
+        # 指向此下载的择优记录一并删除, 否则择优时会拿已删除的版本做比较
+        db.query(models.BestDownload).filter(
+            models.BestDownload.tor_download_id == download_id
+        ).delete(synchronize_session=False)
         db.delete(db_download)
         db.commit()
     return db_download
@@ -146,4 +151,38 @@ def delete_pt_site(db: Session, pt_site_id: int):
     if db_pt_site:
         db.delete(db_pt_site)
         db.commit()
-    return db_pt_site
\ No newline at end of file
+    return db_pt_site
+
+# CRUD operations for Watchlist
+def create_watchlist_item(db: Session, item: schemas.WatchlistItemCreate):
+    db_item = models.Watchlist(**item.dict(), norm_title=normalize_name(item.title))
+    db.add(db_item)
+    db.commit()
+    db.refresh(db_item)
+    return db_item
+
+def get_watchlist_item(db: Session, item_id: int):
+    return db.query(models.Watchlist).filter(models.Watchlist.id == item_id).first()
+
+def get_watchlist_items(db: Session, skip: int = 0, limit: int = 100, title: Optional[str] = None):
+    query = db.query(models.Watchlist)
+    if title:
+        query = query.filter(models.Watchlist.norm_title.contains(normalize_name(title)))
+    return query.order_by(models.Watchlist.id.desc()).offset(skip).limit(limit).all()
+
+def update_watchlist_item(db: Session, item_id: int, item: schemas.WatchlistItemCreate):
+    db_item = db.query(models.Watchlist).filter(models.Watchlist.id == item_id).first()
+    if db_item:
+        for key, value in item.dict().items():
+            setattr(db_item, key, value)
+        db_item.norm_title = normalize_name(item.title)
+        db.commit()
+        db.refresh(db_item)
+    return db_item
+
+def delete_watchlist_item(db: Session, item_id: int):
+    db_item = db.query(models.Watchlist).filter(models.Watchlist.id == item_id).first()
+    if db_item:
+        db.delete(db_item)
+        db.commit()
+    return db_item
@@ -0,0 +1,157 @@
+import gzip
+import hashlib
+import json
+import os
+import threading
+from collections import namedtuple
+from datetime import datetime
+
+from sqlalchemy.exc import SQLAlchemyError
+from loguru import logger
+
+from torll.db.database import SessionLocal
+from torll.models import models
+from torll.core.config import settings, BASE_DIR
+
+# 详情页字段的时效分类: 做种/下载数很快过时, 评分偶尔变化, IMDb/豆瓣 id 等不会变
+FIELD_CLASSES = {
+    "seednum": "volatile",
+    "downnum": "volatile",
+    "imdbval": "rating",
+    "doubanval": "rating",
+}
+
+
+def field_ttl(field: str):
+    """Max age in seconds for a parsed field, None for fields that never go stale."""
+    cls = FIELD_CLASSES.get(field, "static")
+    if cls == "volatile":
+        return settings.DETAIL_CACHE_TTL_VOLATILE
+    if cls == "rating":
+        return settings.DETAIL_CACHE_TTL_RATING
+    return None
+
+
+CachedPage = namedtuple(
+    "CachedPage",
+    ["info_link", "site", "content_hash", "etag", "last_modified", "fetched_at", "parsed", "parser_version"],
+)
+
+
+class DetailPageCache:
+    """Detail pages keyed by info_link.
+
+    Raw HTML is stored gzip-compressed on disk, addressed by its sha256 so a
+    page shared by several links or unchanged across fetches is stored once.
+    The detail_page_cache table indexes link -> content hash, HTTP validators
+    and the fields parsed from the page, tagged with the parser version they
+    were produced by.
+    """
+
+    def __init__(self, root: str):
+        self.root = root
+        self._lock = threading.Lock()
+
+    def _path(self, content_hash: str) -> str:
+        return os.path.join(self.root, content_hash[:2], content_hash + ".html.gz")
+
+    def lookup(self, info_link: str):
+        db = SessionLocal()
+        try:
+            row = db.query(models.DetailPageCache).filter(
+                models.DetailPageCache.info_link == info_link
+            ).first()
+            if row is None:
+                return None
+            return CachedPage(
+                row.info_link, row.site, row.content_hash, row.etag, row.last_modified,
+                row.fetched_at, json.loads(row.parsed) if row.parsed else None, row.parser_version,
+            )
+        except SQLAlchemyError as e:
+            logger.warning(f"Detail cache lookup failed: {e}")
+            return None
+        finally:
+            db.close()
+
+    @staticmethod
+    def is_fresh(page: CachedPage, fields) -> bool:
+        """True when the fetched page is young enough for every requested field."""
+        age = (datetime.now() - page.fetched_at).total_seconds() if page.fetched_at else None
+        for field in fields:
+            ttl = field_ttl(field)
+            if ttl is not None and (age is None or age > ttl):
+                return False
+        return True
+
+    @staticmethod
+    def validators(page: CachedPage) -> dict:
+        headers = {}
+        if page and page.etag:
+            headers["If-None-Match"] = page.etag
+        if page and page.last_modified:
+            headers["If-Modified-Since"] = page.last_modified
+        return headers
+
+    def load_html(self, content_hash: str):
+        try:
+            with gzip.open(self._path(content_hash), "rt", encoding="utf-8") as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def _write_blob(self, html: str) -> str:
+        data = html.encode("utf-8")
+        content_hash = hashlib.sha256(data).hexdigest()
+        path = self._path(content_hash)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp = f"{path}.{threading.get_ident()}.tmp"
+            with gzip.open(tmp, "wb") as f:
+                f.write(data)
+            os.replace(tmp, path)
+        return content_hash
+
+    def _upsert(self, info_link: str, **values):
+        db = SessionLocal()
+        try:
+            with self._lock:
+                row = db.query(models.DetailPageCache).filter(
+                    models.DetailPageCache.info_link == info_link
+                ).first()
+                if row is None:
+                    row = models.DetailPageCache(info_link=info_link)
+                    db.add(row)
+                for key, value in values.items():
+                    setattr(row, key, value)
+                db.commit()
+        except SQLAlchemyError as e:
+            db.rollback()
+            logger.warning(f"Detail cache write failed: {e}")
+        finally:
+            db.close()
+
+    def store(self, info_link: str, site: str, html: str, etag: str = None, last_modified: str = None):
+        """Save a freshly fetched page; previously parsed fields no longer apply."""
+        try:
+            content_hash = self._write_blob(html)
+        except OSError as e:
+            logger.warning(f"Detail cache write failed: {e}")
+            return
+        self._upsert(
+            info_link, site=site, content_hash=content_hash, etag=etag,
+            last_modified=last_modified, fetched_at=datetime.now(),
+            parsed=None, parser_version=None,
+        )
+
+    def touch(self, info_link: str):
+        """The page was revalidated (304): it counts as freshly fetched."""
+        self._upsert(info_link, fetched_at=datetime.now())
+
+    def save_parsed(self, info_link: str, parsed: dict, parser_version: str):
+        self._upsert(
+            info_link, parsed=json.dumps(parsed, ensure_ascii=False),
+            parser_version=parser_version, parsed_at=datetime.now(),
+        )
+
+
+detail_cache = DetailPageCache(settings.DETAIL_CACHE_DIR or os.path.join(BASE_DIR, "detail_cache"))
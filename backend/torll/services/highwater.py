@@ -0,0 +1,85 @@
+import re
+from collections import namedtuple
+
+# 站点已抓取到的最新种子: 详情页 id, 发布时间 (站点链接里没有 id 时用)
+HighWaterMark = namedtuple("HighWaterMark", ["torrent_id", "date"])
+
+# 详情页链接中的种子 id
+RE_TORRENT_ID = re.compile(r"[?&]id=(\d+)")
+
+
+def torrent_id_of_link(infolink):
+    m = RE_TORRENT_ID.search(infolink or "")
+    return int(m[1]) if m else None
+
+
+def is_below(item, mark: HighWaterMark) -> bool:
+    """True when the row is not newer than the newest torrent already scraped."""
+    tid = torrent_id_of_link(item.infolink)
+    if tid is not None and mark.torrent_id is not None:
+        return tid <= mark.torrent_id
+    if mark.date is not None and item.tordate:
+        return item.tordate <= mark.date
+    return False
+
+
+def raised(mark: HighWaterMark, items) -> HighWaterMark:
+    """The mark moved up to the newest of `items`.
+
+    Call it on the parsed rows before they are committed: afterwards every
+    attribute read would be a refresh query.
+    """
+    torrent_id, date = mark
+    for item in items:
+        tid = torrent_id_of_link(item.infolink)
+        if tid is not None and (torrent_id is None or tid > torrent_id):
+            torrent_id = tid
+        if item.tordate and (date is None or item.tordate > date):
+            date = item.tordate
+    return HighWaterMark(torrent_id, date)
+
+
+def page_reaches(rows, mark: HighWaterMark) -> bool:
+    """Whether a listing page (rows oldest first) goes down to the mark.
+
+    Only the bottom row counts: sticky/pinned rows sit at the top of the
+    first pages however old they are, so an old row elsewhere on the page
+    does not mean the rest of the page, or the next one, is known.
+    """
+    return not rows or is_below(rows[0], mark)
+
+
+def walk_listing(load_page, mark: HighWaterMark, maxpages: int):
+    """Walk listing pages from the newest, collecting the rows above the mark.
+
+    load_page(page) returns the rows of a page oldest first, or None when the
+    page could not be fetched. Returns (rows oldest first, pages walked, reached).
+    """
+    pages = []
+    reached = False
+    for page in range(maxpages):
+        rows = load_page(page)
+        if rows is None:
+            break
+        pages.append([x for x in rows if not is_below(x, mark)])
+        if page_reaches(rows, mark):
+            reached = True
+            break
+    # 各页内已是旧在前, 整体从最后一页开始
+    items = [x for fresh in reversed(pages) for x in fresh]
+    return items, len(pages), reached
+
+
+def backfill_bound(mark: HighWaterMark, pending: HighWaterMark = None) -> HighWaterMark:
+    """Lower bound of the gap left by a walk that stopped short of `mark`.
+
+    A gap still waiting for backfill keeps its older bound, so one backfill
+    covers both the new gap and the old one.
+    """
+    return pending if pending is not None else mark
+
+
+def backfill_rows(rows, bound: HighWaterMark):
+    """Rows of an older listing page above the gap's lower bound, and
+    whether the page closes the gap (an empty page always does)."""
+    return [x for x in rows if not is_below(x, bound)], page_reaches(rows, bound)
@@ -0,0 +1,84 @@
+import asyncio
+import uuid
+from collections import OrderedDict
+from datetime import datetime
+
+from loguru import logger
+
+
+# 保留的已结束任务数
+MAX_FINISHED_JOBS = 200
+
+
+class Job:
+    def __init__(self, kind: str, name: str):
+        self.id = uuid.uuid4().hex
+        self.kind = kind
+        self.name = name
+        self.status = "pending"
+        self.done = 0
+        self.total = 0
+        self.result = None
+        self.error = None
+        self.created_at = datetime.now()
+        self.finished_at = None
+
+    def set_progress(self, done: int, total: int):
+        # 可在工作线程中调用
+        self.done, self.total = done, total
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "kind": self.kind,
+            "name": self.name,
+            "status": self.status,
+            "progress": {"done": self.done, "total": self.total},
+            "result": self.result,
+            "error": self.error,
+            "created_at": self.created_at,
+            "finished_at": self.finished_at,
+        }
+
+
+class JobManager:
+    """Runs background jobs on the event loop and keeps their status for polling."""
+
+    def __init__(self):
+        self._jobs = OrderedDict()
+        self._tasks = {}
+
+    def submit(self, kind: str, name: str, run) -> Job:
+        """`run(job)` returns the coroutine to execute."""
+        job = Job(kind, name)
+        self._jobs[job.id] = job
+        self._tasks[job.id] = asyncio.create_task(self._run(job, run))
+        self._prune()
+        return job
+
+    async def _run(self, job: Job, run):
+        job.status = "running"
+        try:
+            job.result = await run(job)
+            job.status = "done"
+        except Exception as e:
+            logger.error(f"Job {job.kind} {job.name} failed: {e}")
+            job.error = str(e)
+            job.status = "failed"
+        finally:
+            job.finished_at = datetime.now()
+            self._tasks.pop(job.id, None)
+
+    def _prune(self):
+        finished = [x for x in self._jobs.values() if x.finished_at]
+        for job in finished[:max(len(finished) - MAX_FINISHED_JOBS, 0)]:
+            del self._jobs[job.id]
+
+    def get(self, job_id: str):
+        return self._jobs.get(job_id)
+
+    def list(self):
+        return list(self._jobs.values())
+
+
+job_manager = JobManager()
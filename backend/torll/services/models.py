@@ -256,6 +256,22 @@ class TorDownload(db.Model):
         return result
 
 
+class BestDownload(db.Model):
+    """每个 (media_title, season, resolution) 当前已下载的最优版本, 供择优判断直接按主键查找"""
+    __tablename__ = "best_download"
+
+    media_title = Column(String(255), primary_key=True)
+    season = Column(String(20), primary_key=True, default="")
+    resolution = Column(String(20), primary_key=True, default="")
+    tmdbid = Column(String(20), index=True)
+    group = Column(String(50))
+    group_score = Column(Integer)
+    tor_download_id = Column(
+        Integer, ForeignKey("tor_download.id", ondelete="SET NULL"), nullable=True
+    )
+    updated_at = Column(DateTime, default=datetime.now, onupdate=datetime.now)
+
+
 class SiteTorrent(db.Model):
     __tablename__ = "site_torrent"
 
@@ -353,6 +369,16 @@ class PtSite(db.Model):
     lastResultCount = db.Column(db.Integer, default=0)
     newTorCount = db.Column(db.Integer, default=0)
     lastNewStatus = db.Column(db.Integer, default=0)
+    # 站点请求限速: 每秒请求数, 突发数; 为空时用默认值
+    rate_limit = db.Column(db.Float)
+    rate_burst = db.Column(db.Integer)
+    # 高水位: 已抓取到的最新种子 id / 时间; 补全旧页时下一个要抓的页码, 为空表示不需要补全
+    last_torrent_id = db.Column(db.BigInteger)
+    last_torrent_date = db.Column(db.DateTime)
+    backfill_page = db.Column(db.Integer)
+    # 补全区间的下界: 未到达高水位时的旧高水位, 补全走到这里为止
+    backfill_torrent_id = db.Column(db.BigInteger)
+    backfill_torrent_date = db.Column(db.DateTime)
 
     def to_dict(self):
         return {
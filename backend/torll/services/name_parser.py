@@ -0,0 +1,144 @@
+import os, sys
+import atexit
+import threading
+from collections import OrderedDict, namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+import myconfig
+from loguru import logger
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "torcp2"))
+from torcp.tmdbparser import TMDbNameParser
+
+from torll.core.config import settings
+
+NameParseResult = namedtuple(
+    "NameParseResult",
+    [
+        "title",
+        "tmdbcat",
+        "tmdbid",
+        "poster_path",
+        "year",
+        "genre_ids",
+        "mediaSource",
+        "videoCodec",
+        "audioCodec",
+        "imdbid",
+        "imdbval",
+    ],
+)
+
+
+class NameParserService:
+    """Long-lived, thread-safe front for torcp's TMDbNameParser.
+
+    A TMDbNameParser keeps state between parse() calls, so each thread
+    reuses its own instance (and with it the client to torcpdb) instead of
+    building one per row; batches run on one long-lived pool of `workers`
+    threads so those parsers survive between calls. Resolved results are
+    memoized by (torname, imdb id); misses (no tmdbid) are retried next time.
+    """
+
+    def __init__(self, maxsize: int, workers: int):
+        self.maxsize = maxsize
+        self.workers = workers
+        self.hits = 0
+        self.misses = 0
+        self._memo = OrderedDict()
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._pool = None
+
+    def _parser(self) -> TMDbNameParser:
+        p = getattr(self._local, "parser", None)
+        if p is None:
+            p = TMDbNameParser(myconfig.CONFIG.torcpdb_url, myconfig.CONFIG.torcpdb_apikey)
+            self._local.parser = p
+        return p
+
+    def _cached(self, key):
+        with self._lock:
+            result = self._memo.get(key)
+            if result is not None:
+                self._memo.move_to_end(key)
+                self.hits += 1
+            else:
+                self.misses += 1
+            return result
+
+    def _remember(self, key, result: NameParseResult):
+        with self._lock:
+            self._memo[key] = result
+            self._memo.move_to_end(key)
+            while len(self._memo) > self.maxsize:
+                self._memo.popitem(last=False)
+
+    def parse(self, torname: str, imdbstr: str = None, infolink: str = None) -> NameParseResult:
+        key = (torname, imdbstr or "")
+        result = self._cached(key)
+        if result is not None:
+            return result
+        p = self._parser()
+        p.parse(torname=torname, useTMDb=True, hasIMDbId=imdbstr, infolink=infolink)
+        result = NameParseResult(
+            p.title,
+            p.tmdbcat,
+            p.tmdbid,
+            p.poster_path,
+            p.year,
+            p.genre_ids,
+            p.mediaSource,
+            p.videoCodec,
+            p.audioCodec,
+            p.imdbid,
+            p.imdbval,
+        )
+        # 没解析出 tmdbid 的不缓存, 以后 TMDb/torcpdb 补上了数据还能查到
+        if result.tmdbid:
+            self._remember(key, result)
+        return result
+
+    def _parse_safe(self, request):
+        torname, imdbstr, infolink = request
+        try:
+            return self.parse(torname, imdbstr, infolink)
+        except Exception as e:
+            logger.warning(f"TMDb 解析出错：{torname}, {e}")
+            return None
+
+    def parse_many(self, requests: list) -> list:
+        """Resolve [(torname, imdbstr, infolink), ...]; results in the same order, None on failure.
+
+        Names repeated within the batch are looked up once, the distinct
+        ones concurrently.
+        """
+        unique = {}
+        for torname, imdbstr, infolink in requests:
+            unique.setdefault((torname, imdbstr or ""), (torname, imdbstr, infolink))
+        if not unique:
+            return []
+        resolved = dict(zip(unique, self._executor().map(self._parse_safe, unique.values())))
+        return [resolved[(torname, imdbstr or "")] for torname, imdbstr, _ in requests]
+
+    def _executor(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(
+                    max_workers=max(self.workers, 1), thread_name_prefix="name-parser"
+                )
+            return self._pool
+
+    def shutdown(self):
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"size": len(self._memo), "hits": self.hits, "misses": self.misses}
+
+
+name_parser = NameParserService(settings.NAME_PARSER_CACHE_SIZE, settings.SITE_TMDB_WORKERS)
+atexit.register(name_parser.shutdown)
@@ -1,47 +1,169 @@
+import asyncio
+import re
+import time
+from types import SimpleNamespace
+from urllib.parse import quote, urljoin
+
+import lxml.html
 from sqlalchemy.orm import Session
-from torll.models import models
-from torll.schemas import schemas
 from loguru import logger
-from datetime import datetime
+
+from torll.db.database import SessionLocal
+from torll.models import models
+from torll.core.config import settings
+from torll.core.utils import tryint
+from torll.services import site_xpath, tmdb_service
+from torll.services.site_config import site_configs
+from torll.services.site_session import site_get
+
+
+class SiteSearchError(RuntimeError):
+    """A PT site search that could not be run, or the site did not answer."""
+
+
+class SiteNotFound(SiteSearchError):
+    """The site is not in pt_site, or has no cookie."""
+
+
+class SiteNotConfigured(SiteSearchError):
+    """The site has no search entry (baseurl / searchurl) in the site config file."""
+
+
+def load_search_sites(db: Session, site_names: list = None) -> list:
+    """(site, cookie) of the PT sites to search: the given ones, or all with a cookie."""
+    query = db.query(models.PtSite.site, models.PtSite.cookie).filter(models.PtSite.cookie != None)
+    if site_names:
+        query = query.filter(models.PtSite.site.in_(site_names))
+    return [(site, cookie) for site, cookie in query if site and cookie]
+
+
+RE_IMDB_ID = re.compile(r"tt\d+", re.I)
+
+
+def search_url(cursite: dict, search_term: str) -> str:
+    key = "searchIMDburl" if RE_IMDB_ID.match(search_term.strip()) else "searchurl"
+    return cursite["baseurl"] + cursite[key] + quote(search_term)
+
+
+def parse_search_page(doc, site: str, cursite: dict, search_term: str) -> list:
+    """Search result page -> TorrentCache column dicts, in page order."""
+    plan = site_xpath.getXPathPlan(site, cursite, site_configs.get("nexusphp"))
+    htmltree = lxml.html.fromstring(doc, parser=lxml.html.HTMLParser(recover=True, encoding="utf-8"))
+    items = []
+    for row in plan.get(htmltree, "torlist"):
+        infolink = plan.get(row, "infolink")
+        if not infolink:
+            continue
+        item = SimpleNamespace(site=site, infolink=urljoin(cursite["baseurl"], infolink), searchword=search_term)
+        site_xpath.fillDbitemWithXPathValues(item, plan.extract(row))
+        item.downlink = urljoin(cursite["baseurl"], item.downlink)
+        items.append(vars(item))
+    return items
+
+
+def fill_tmdb_info(rows: list):
+    """Best TMDb match per distinct title, through the shared TMDb lookup cache."""
+    matches = {}
+    for row in rows:
+        query = tmdb_service.normalize_title(row["tortitle"])
+        if query and query not in matches:
+            results = tmdb_service.search_tmdb(query, media_type="multi")
+            matches[query] = results[0] if results else None
+        tmdb_result = matches.get(query)
+        if not tmdb_result:
+            continue
+        released = tmdb_result.get("release_date") or tmdb_result.get("first_air_date") or ""
+        row["tmdbtitle"] = tmdb_result.get("title") or tmdb_result.get("name")
+        row["tmdbcat"] = tmdb_result.get("media_type")
+        row["tmdbid"] = tryint(tmdb_result.get("id"))
+        row["tmdbyear"] = tryint(released[:4])
+        row["tmdbposter"] = tmdb_result.get("poster_path")
+        row["tmdboverview"] = tmdb_result.get("overview")
+
+
+def search_site(site: str, cookie: str, search_term: str) -> list:
+    """Search one site and store its results in TorrentCache with one bulk insert.
+
+    Raises SiteNotConfigured when the site config file has no search entry
+    for it, SiteSearchError when the site does not answer.
+    """
+    cursite = site_configs.get(site)
+    if not cursite or "baseurl" not in cursite or "searchurl" not in cursite:
+        raise SiteNotConfigured(f"search not configured for {site} in {site_configs.path}")
+    url = search_url(cursite, search_term)
+    try:
+        r = site_get(url, cookie, site=site)
+        r.raise_for_status()
+    except Exception as e:
+        raise SiteSearchError(f"search failed on {site}: {e}")
+
+    rows = parse_search_page(r.content, site, cursite, search_term)
+    fill_tmdb_info(rows)
+    logger.info(f"PT search {site}: {search_term}, {len(rows)} result(s)")
+    if rows:
+        db = SessionLocal()
+        try:
+            db.bulk_insert_mappings(models.TorrentCache, rows)
+            db.commit()
+        finally:
+            db.close()
+    return rows
+
 
 def search_pt_site(db: Session, search_term: str, site_name: str):
+    """Search a single PT site and save the results to TorrentCache.
+
+    Raises SiteNotFound when the site is not in pt_site or has no cookie,
+    otherwise as search_site.
     """
-    Simulates searching a PT site and saves dummy results to TorrentCache.
-    In a real implementation, this would involve web scraping and parsing.
+    sites = load_search_sites(db, [site_name])
+    if not sites:
+        raise SiteNotFound(f"PT site {site_name} not found or has no cookie")
+    site, cookie = sites[0]
+    return search_site(site, cookie, search_term)
+
+
+async def _search_site_timed(site: str, cookie: str, search_term: str, timeout: float) -> dict:
+    started = time.perf_counter()
+    result = {"site": site, "status": "ok", "count": 0, "results": []}
+    try:
+        rows = await asyncio.wait_for(
+            asyncio.to_thread(search_site, site, cookie, search_term), timeout
+        )
+        result["count"] = len(rows)
+        result["results"] = rows
+    except asyncio.TimeoutError:
+        logger.warning(f"PT search: {site} timed out after {timeout}s")
+        result["status"] = "timeout"
+    except Exception as e:
+        logger.error(f"PT search: {site} failed: {e}")
+        result["status"] = "error"
+        result["error"] = str(e)
+    result["elapsed_ms"] = round((time.perf_counter() - started) * 1000, 1)
+    return result
+
+
+async def search_all_sites(search_term: str, site_names: list = None):
+    """Search every configured PT site at once, yielding each site's result as it finishes.
+
+    A slow site only delays its own entry; after PT_SEARCH_SITE_TIMEOUT it is
+    reported as "timeout" (its worker thread may still finish and cache the rows).
     """
-    logger.info(f"Simulating search for '{search_term}' on site '{site_name}'")
-
-    # Simulate some search results
-    dummy_results = [
-        {
-            "site": site_name,
-            "searchword": search_term,
-            "tortitle": f"Dummy Torrent 1 for {search_term} on {site_name}",
-            "infolink": "http://example.com/dummy1",
-            "downlink": "http://example.com/dummy1.torrent",
-            "torsizestr": "1.5 GB",
-            "torsizeint": 1610612736,
-            "seednum": 10,
-            "downnum": 5,
-            "tordate": datetime.now(),
-        },
-        {
-            "site": site_name,
-            "searchword": search_term,
-            "tortitle": f"Dummy Torrent 2 for {search_term} on {site_name}",
-            "infolink": "http://example.com/dummy2",
-            "downlink": "http://example.com/dummy2.torrent",
-            "torsizestr": "700 MB",
-            "torsizeint": 734003200,
-            "seednum": 20,
-            "downnum": 10,
-            "tordate": datetime.now(),
-        },
+    db = SessionLocal()
+    try:
+        sites = await asyncio.to_thread(load_search_sites, db, site_names)
+    finally:
+        db.close()
+    logger.info(f"PT search '{search_term}' on {len(sites)} site(s)")
+    tasks = [
+        asyncio.create_task(
+            _search_site_timed(site, cookie, search_term, settings.PT_SEARCH_SITE_TIMEOUT)
+        )
+        for site, cookie in sites
     ]
-
-    for result_data in dummy_results:
-        db_torrent_cache = models.TorrentCache(**result_data)
-        db.add(db_torrent_cache)
-    db.commit()
-    logger.info(f"Saved {len(dummy_results)} dummy search results to cache.")
-    return dummy_results
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            yield await next_done
+    finally:
+        for task in tasks:
+            task.cancel()
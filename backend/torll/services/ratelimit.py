@@ -0,0 +1,140 @@
+import threading
+import time
+from urllib.parse import urlparse
+
+from loguru import logger
+
+from torll.core.config import settings
+
+
+def site_key(site: str = None, url: str = None) -> str:
+    """Bucket key: the PtSite name when known, otherwise the URL host."""
+    if site:
+        return site.strip().lower()
+    return urlparse(url or "").netloc.lower()
+
+
+class TokenBucket:
+    """Token bucket where callers reserve a token and then wait outside the lock.
+
+    Tokens may go negative, so concurrent callers queue up in arrival order
+    and share one budget.
+    """
+
+    __slots__ = ("rate", "burst", "tokens", "stamp", "requests", "waited", "max_wait", "waiting")
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.stamp = time.monotonic()
+        self.requests = 0
+        self.waited = 0.0
+        self.max_wait = 0.0
+        self.waiting = 0
+
+    def configure(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = min(self.tokens, float(burst))
+
+    def reserve(self) -> float:
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.stamp) * self.rate)
+        self.stamp = now
+        self.tokens -= 1
+        wait = -self.tokens / self.rate if self.tokens < 0 else 0.0
+        self.requests += 1
+        self.waited += wait
+        self.max_wait = max(self.max_wait, wait)
+        return wait
+
+    def stats(self) -> dict:
+        return {
+            "rate": self.rate,
+            "burst": self.burst,
+            "requests": self.requests,
+            "waiting": self.waiting,
+            "avg_wait_ms": round(self.waited / self.requests * 1000, 1) if self.requests else 0.0,
+            "max_wait_ms": round(self.max_wait * 1000, 1),
+        }
+
+
+class SiteRateLimiter:
+    """Per-site request budget shared by every outbound tracker request.
+
+    Rate (requests/second) and burst come from PtSite.rate_limit and
+    PtSite.rate_burst, falling back to settings; they are re-read from the
+    database every SITE_RATE_RELOAD seconds.
+    """
+
+    def __init__(self):
+        self._buckets = {}
+        self._limits = {}
+        self._loaded_at = None
+        self._lock = threading.Lock()
+
+    def load(self, db):
+        from torll.models import models
+        limits = {}
+        for site, rate, burst in db.query(
+            models.PtSite.site, models.PtSite.rate_limit, models.PtSite.rate_burst
+        ):
+            if site:
+                limits[site_key(site)] = (rate, burst)
+        with self._lock:
+            self._limits = limits
+            self._loaded_at = time.monotonic()
+            for key, bucket in self._buckets.items():
+                bucket.configure(*self._limit_for(key))
+
+    def _maybe_reload(self):
+        if self._loaded_at is not None and time.monotonic() - self._loaded_at < settings.SITE_RATE_RELOAD:
+            return
+        from torll.db.database import SessionLocal
+        db = SessionLocal()
+        try:
+            self.load(db)
+        except Exception as e:
+            # 读不到配置时按默认值限速, 稍后再试
+            logger.warning(f"Load site rate limits failed: {e}")
+            self._loaded_at = time.monotonic()
+        finally:
+            db.close()
+
+    def _limit_for(self, key: str):
+        rate, burst = self._limits.get(key, (None, None))
+        return (rate or settings.SITE_RATE_DEFAULT, burst or settings.SITE_BURST_DEFAULT)
+
+    def _reserve(self, key: str) -> tuple:
+        self._maybe_reload()
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = TokenBucket(*self._limit_for(key))
+                self._buckets[key] = bucket
+            wait = bucket.reserve()
+            if wait > 0:
+                bucket.waiting += 1
+            return bucket, wait
+
+    def _done(self, bucket: TokenBucket):
+        with self._lock:
+            bucket.waiting -= 1
+
+    def acquire(self, site: str = None, url: str = None) -> float:
+        """Block until the site's budget allows one more request; returns the wait in seconds."""
+        bucket, wait = self._reserve(site_key(site, url))
+        if wait > 0:
+            try:
+                time.sleep(wait)
+            finally:
+                self._done(bucket)
+        return wait
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {key: bucket.stats() for key, bucket in self._buckets.items()}
+
+
+rate_limiter = SiteRateLimiter()
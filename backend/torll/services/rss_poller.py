@@ -0,0 +1,95 @@
+import asyncio
+from collections import defaultdict
+
+from sqlalchemy.orm import Session
+from loguru import logger
+
+from torll.db.database import SessionLocal
+from torll.models import models
+from torll.schemas import rss_schemas
+from torll.services.rss_service import RssFeed
+from torll.core.config import settings
+
+
+def load_enabled_feeds(db: Session):
+    rows = db.query(models.RssFeedConfig).filter(models.RssFeedConfig.enable == True).all()
+    return [RssFeed(rss_schemas.RssFeedConfig.model_validate(row)) for row in rows]
+
+
+def load_feed(db: Session, name: str):
+    row = db.query(models.RssFeedConfig).filter(models.RssFeedConfig.name == name).first()
+    return RssFeed(rss_schemas.RssFeedConfig.model_validate(row)) if row else None
+
+
+class RssPoller:
+    """Fetch RSS feeds concurrently and hand them to a single DB writer.
+
+    Fetching (network + XML parse) runs in worker threads, bounded by a global
+    limit and a per-site limit. Entry parsing and DB writes are serialized.
+    """
+
+    def __init__(self, concurrency: int, per_site: int):
+        self.concurrency = concurrency
+        self.per_site = per_site
+        self._global = asyncio.Semaphore(concurrency)
+        self._sites = defaultdict(lambda: asyncio.Semaphore(per_site))
+        self._writer = asyncio.Lock()
+
+    async def fetch(self, feed: RssFeed):
+        # 先占站点名额再占全局名额, 避免排队中的站点白占全局名额
+        async with self._sites[feed.site]:
+            async with self._global:
+                logger.info(f"RSS {feed.name} {feed.site} - Fetching RSS feed")
+                return await asyncio.to_thread(feed.fetch_rss)
+
+    async def write(self, feed: RssFeed, parsed, progress=None) -> dict:
+        async with self._writer:
+            return await asyncio.to_thread(self._ingest, feed, parsed, progress)
+
+    def _ingest(self, feed: RssFeed, parsed, progress=None) -> dict:
+        db = SessionLocal()
+        try:
+            return feed.ingest_feed(db, parsed, progress=progress)
+        finally:
+            db.close()
+
+    async def poll_feed(self, feed: RssFeed, progress=None) -> dict:
+        try:
+            parsed = await self.fetch(feed)
+            return await self.write(feed, parsed, progress)
+        except Exception as e:
+            logger.error(f"RSS {feed.name} {feed.site} - poll failed: {e}")
+            return {"name": feed.name, "site": feed.site, "status": "error", "error": str(e)}
+
+    async def poll_all(self, progress=None) -> list:
+        """Poll every enabled RssFeedConfig; `progress(done, total)` counts finished feeds."""
+        db = SessionLocal()
+        try:
+            feeds = await asyncio.to_thread(load_enabled_feeds, db)
+        finally:
+            db.close()
+        logger.info(f"Polling {len(feeds)} RSS feeds")
+        finished = 0
+
+        async def poll_one(feed):
+            nonlocal finished
+            result = await self.poll_feed(feed)
+            finished += 1
+            if progress:
+                progress(finished, len(feeds))
+            return result
+
+        if progress:
+            progress(0, len(feeds))
+        return await asyncio.gather(*(poll_one(feed) for feed in feeds))
+
+
+_poller = None
+
+
+def get_poller() -> RssPoller:
+    """Process-wide poller, created inside the running event loop."""
+    global _poller
+    if _poller is None:
+        _poller = RssPoller(settings.RSS_POLL_CONCURRENCY, settings.RSS_POLL_PER_SITE)
+    return _poller
@@ -0,0 +1,212 @@
+import re
+import time
+from collections import Counter, defaultdict
+from datetime import datetime, timedelta
+
+from sqlalchemy.orm import Session
+
+from torll.models import models
+from torll.services import rssfilter, watchlist
+
+# 每批从 rss_history 读取的行数
+REPLAY_BATCH = 5000
+REPLAY_SAMPLES = 20
+
+# 取值种类少的字段: 正则按不同取值各跑一次
+VALUE_FIELDS = {
+    key: field for key, field, _, _ in rssfilter.REGEX_CHECKS if field in ("rsstags", "rsscatstr")
+}
+SIZE_BOUNDS = {"SIZE_MIN": "size_gb_min", "SIZE_MAX": "size_gb_max"}
+
+RE_ONE = re.compile("1")
+
+
+def iter_history_batches(db: Session, since: datetime, rssname: str = None):
+    """Yield rss_history rows (only the columns filters look at) in batches."""
+    query = db.query(
+        models.RSSHistory.title,
+        models.RSSHistory.subtitle,
+        models.RSSHistory.size,
+        models.RSSHistory.rsstags,
+    ).filter(models.RSSHistory.added_on >= since)
+    if rssname:
+        query = query.filter(models.RSSHistory.rssname == rssname)
+    batch = []
+    for row in query.execution_options(yield_per=REPLAY_BATCH):
+        batch.append(row)
+        if len(batch) >= REPLAY_BATCH:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _mask(indexes, n):
+    """Bit mask (bit i = row i) of the given row indexes."""
+    digits = bytearray(b"0" * n)
+    for i in indexes:
+        digits[i] = 0x31
+    digits.reverse()
+    return int(digits, 2) if n else 0
+
+
+def _indexes(mask):
+    """Row indexes of the set bits, ascending."""
+    return [m.start() for m in RE_ONE.finditer(bin(mask)[:1:-1])]
+
+
+class HistoryBatch:
+    """One batch of rss_history rows evaluated column-wise, as bit masks over its rows.
+
+    Size bounds are one comparison per row for each distinct bound, tag and
+    category regexes run once per distinct value; both are shared by every
+    filter using the same bound or pattern. Other checks (title/subtitle
+    regexes, NO_HR, watchlist) run only on the rows still alive for the
+    filter; a gated regex only on those its FilterGate scan did not rule out.
+    """
+
+    def __init__(self, rows):
+        self.rows = rows
+        self.n = len(rows)
+        self.full = (1 << self.n) - 1
+        self._sizes = None
+        self._values = {}
+        self._cache = {}
+        self._gates = {}
+
+    def _size_mask(self, reason, bound):
+        if self._sizes is None:
+            self._sizes = [rssfilter._size_gb(row) for row in self.rows]
+        if reason == "SIZE_MIN":
+            return _mask((i for i, s in enumerate(self._sizes) if s >= bound), self.n)
+        return _mask((i for i, s in enumerate(self._sizes) if s <= bound), self.n)
+
+    def _value_mask(self, field, check):
+        values = self._values.get(field)
+        if values is None:
+            groups = defaultdict(list)
+            for i, row in enumerate(self.rows):
+                groups[rssfilter._field(row, field)].append(i)
+            # 每个取值: (代表行, 行掩码)
+            values = self._values[field] = [(self.rows[idx[0]], _mask(idx, self.n)) for idx in groups.values()]
+        mask = 0
+        for row, rows_mask in values:
+            if check(row):
+                mask |= rows_mask
+        return mask
+
+    def _gate_mask(self, gate, alive):
+        """Rows of `alive` where the gate's scan found some member's regex; each row is scanned once."""
+        scanned, hit = self._gates.get(gate.key, (0, 0))
+        todo = alive & ~scanned
+        if todo:
+            rows = self.rows
+            hit |= _mask(
+                (i for i in _indexes(todo) if gate.pattern.search(rssfilter._field(rows[i], gate.field))), self.n
+            )
+            self._gates[gate.key] = (scanned | todo, hit)
+        return hit & alive
+
+    def passing(self, cf, reason, check, key, alive, gate=None):
+        """Mask of the `alive` rows that pass one check of `cf`."""
+        if reason in SIZE_BOUNDS:
+            cache_key = (reason, cf.rule[SIZE_BOUNDS[reason]])
+        elif key in VALUE_FIELDS:
+            cache_key = (key, cf.rule[key])
+        else:
+            if gate is not None:
+                alive = self._gate_mask(gate, alive)
+            rows = self.rows
+            return _mask((i for i in _indexes(alive) if check(rows[i])), self.n)
+        mask = self._cache.get(cache_key)
+        if mask is None:
+            if reason in SIZE_BOUNDS:
+                mask = self._size_mask(reason, cache_key[1])
+            else:
+                mask = self._value_mask(VALUE_FIELDS[key], check)
+            self._cache[cache_key] = mask
+        return mask & alive
+
+
+def replay_batches(program: rssfilter.FilterProgram, batches) -> dict:
+    """Evaluate a compiled filter list over row batches, filter by filter.
+
+    Returns the counters of replay_filters: the final reasons (as
+    FilterProgram.apply gives them, the last filter's reason for rows no
+    filter accepts), accepts per filter, and per filter the reasons it
+    rejected the rows that reached it (those no earlier filter accepted).
+    """
+    total = 0
+    reasons = Counter()
+    per_filter = Counter()
+    rejected_by_filter = defaultdict(Counter)
+    samples = []
+    last = len(program.filters) - 1
+    for rows in batches:
+        batch = HistoryBatch(rows)
+        total += batch.n
+        alive = batch.full
+        accepted = []
+        for fi, cf in enumerate(program.filters):
+            if not alive:
+                break
+            remaining = alive
+            plan = program.plans[fi]
+            for j, (reason, check, key) in enumerate(cf.checks):
+                passed = batch.passing(cf, reason, check, key, remaining, plan[j][2] if plan else None)
+                failed = remaining & ~passed
+                if failed:
+                    count = failed.bit_count()
+                    rejected_by_filter[fi][reason] += count
+                    if fi == last:
+                        reasons[reason] += count
+                remaining = passed
+                if not remaining:
+                    break
+            if remaining:
+                per_filter[fi] += remaining.bit_count()
+                accepted.append((fi, remaining))
+                alive &= ~remaining
+        if not program.filters:
+            accepted.append((None, alive))
+            per_filter[None] += batch.n
+        reasons["DL"] += sum(mask.bit_count() for _, mask in accepted)
+
+        if len(samples) < REPLAY_SAMPLES and accepted:
+            hits = sorted((i, fi) for fi, mask in accepted for i in _indexes(mask)[:REPLAY_SAMPLES])
+            for i, fi in hits[:REPLAY_SAMPLES - len(samples)]:
+                samples.append({"title": rows[i].title, "subtitle": rows[i].subtitle, "filter": fi})
+    if not reasons["DL"]:
+        reasons.pop("DL", None)
+    return {
+        "total": total,
+        "reasons": reasons,
+        "accepted_by_filter": per_filter,
+        "rejected_by_filter": rejected_by_filter,
+        "samples": samples,
+    }
+
+
+def replay_filters(db: Session, filters: list, days: int, rssname: str = None) -> dict:
+    """Dry-run a filter list against the last `days` of rss_history.
+
+    Raises rssfilter.FilterCompileError for invalid rules, ValueError for a bad `days`.
+    """
+    if isinstance(days, bool) or not isinstance(days, int) or days < 1:
+        raise ValueError(f"days 应为正整数: {days!r}")
+    started = time.perf_counter()
+    program = rssfilter.compile_filters(filters, watchlist.get_index(db))
+
+    since = datetime.now() - timedelta(days=days)
+    result = replay_batches(program, iter_history_batches(db, since, rssname))
+    accepted = result["reasons"].get("DL", 0)
+    return {
+        "total": result["total"],
+        "accepted": accepted,
+        "rejected": result["total"] - accepted,
+        "reasons": dict(result["reasons"]),
+        "accepted_by_filter": {str(k): v for k, v in result["accepted_by_filter"].items()},
+        "rejected_by_filter": {str(k): dict(v) for k, v in result["rejected_by_filter"].items()},
+        "samples": result["samples"],
+        "elapsed_ms": round((time.perf_counter() - started) * 1000, 1),
+    }
@@ -1,13 +1,16 @@
-import re
 from datetime import datetime, timezone
 import feedparser
 from sqlalchemy.orm import Session
-from sqlalchemy import exists, and_
+from sqlalchemy import exists, and_, or_
+from sqlalchemy.exc import SQLAlchemyError
 
 from torll.models import models
 from torll.schemas import rss_schemas
-from torll.services import tmdb_service
+from torll.services import tmdb_service, seen_cache, watchlist
+from torll.services.rsstitle import parse_rss_title
+from torll.services.ratelimit import rate_limiter
 from torll.core.config import settings
+from torll.core.utils import tryint
 
 from loguru import logger
 from dateutil import parser
@@ -19,12 +22,6 @@ def nomalizeSitename(name: str) -> str:
     # Simplified for now
     return name.lower().replace(" ", "")
 
-def tryint(value) -> int:
-    try:
-        return int(value)
-    except (ValueError, TypeError):
-        return 0
-
 import math # Added for HumanBytes
 
 class HumanBytes:
@@ -41,12 +38,18 @@ class HumanBytes:
 
 # --- End Placeholder/Simplified functions ---
 
-def save_to_site_torrent(db: Session, rss_history_item: models.RSSHistory, tor_detail_item: models.TorDetail):
-    """Saves or updates a SiteTorrent entry based on RSSHistory and TorDetail."""
-    # Check if a SiteTorrent with the same infolink already exists
-    existing_site_torrent = db.query(models.SiteTorrent).filter(
-        models.SiteTorrent.infolink == rss_history_item.info_link
-    ).first()
+def save_to_site_torrent(db: Session, rss_history_item: models.RSSHistory, tor_detail_item: models.TorDetail,
+                         existing_site_torrent: models.SiteTorrent = None, commit: bool = True):
+    """Saves or updates a SiteTorrent entry based on RSSHistory and TorDetail.
+
+    Batched callers pass the pre-loaded ``existing_site_torrent`` and ``commit=False``
+    so the upsert joins the caller's transaction.
+    """
+    if existing_site_torrent is None and commit:
+        # Check if a SiteTorrent with the same infolink already exists
+        existing_site_torrent = db.query(models.SiteTorrent).filter(
+            models.SiteTorrent.infolink == rss_history_item.info_link
+        ).first()
 
     if existing_site_torrent:
         # Update existing entry
@@ -102,7 +105,23 @@ def save_to_site_torrent(db: Session, rss_history_item: models.RSSHistory, tor_d
     site_torrent.dlcount = site_torrent.dlcount if site_torrent.dlcount is not None else 0
     site_torrent.torsizestr = HumanBytes.format(site_torrent.torsizeint) if site_torrent.torsizeint is not None else ""
 
-    db.commit()
+    if commit:
+        db.commit()
+    return site_torrent
+
+
+def load_site_torrents_by_infolink(db: Session, infolinks) -> dict:
+    """Fetch the SiteTorrent rows for a batch of infolinks in one query."""
+    infolinks = [x for x in set(infolinks) if x]
+    if not infolinks:
+        return {}
+    rows = db.query(models.SiteTorrent).filter(models.SiteTorrent.infolink.in_(infolinks)).all()
+    return {row.infolink: row for row in rows}
+
+
+# SQLite 单条语句的参数个数有上限
+RSSHISTORY_QUERY_CHUNK = 500
+
 
 class RssFeed:
     def __init__(self, taskconfig: rss_schemas.RssFeedConfigBase):
@@ -113,12 +132,14 @@ class RssFeed:
         self.filters = taskconfig.filters
         self.site = nomalizeSitename(taskconfig.site)
         self.qbCategory = taskconfig.qbCategory
-        self.cookie = taskconfig.cookie # This will need proper handling later
+        self.cookie = getattr(taskconfig, "cookie", None) # This will need proper handling later
         self.getDetail = taskconfig.getDetail
         self.optpick = taskconfig.optpick
         self.tag = taskconfig.tag
         self.action = taskconfig.action
         self.interval = taskconfig.interval
+        self.etag = getattr(taskconfig, "etag", None)
+        self.modified = getattr(taskconfig, "modified", None)
         # self.siteConfigJson = siteconfig.getSiteConfig(self.site) # External dependency
 
     # def loadSiteCookie(self):
@@ -126,9 +147,10 @@ class RssFeed:
     #     pass
 
     def fetch_rss(self):
-        """Fetch and parse the RSS feed."""
+        """Fetch and parse the RSS feed, as a conditional GET when validators are known."""
         try:
-            r = feedparser.parse(self.rssUrl)
+            rate_limiter.acquire(site=self.site, url=self.rssUrl)
+            r = feedparser.parse(self.rssUrl, etag=self.etag, modified=self.modified)
             return r
         except Exception as e:
             logger.error(f"Error fetching RSS feed from {self.rssUrl}: {e}")
@@ -151,92 +173,236 @@ class RssFeed:
             logger.error(f"An error occurred checking RSS history: {e}")
             return False
 
+    def existing_in_rsshistory(self, db: Session, pairs) -> set:
+        """Return the (title, subtitle) pairs of a poll that already exist in the RSS history.
+
+        One indexed query per chunk of titles instead of one EXISTS query per entry.
+        """
+        pairs = set(pairs)
+        titles = list({title for title, _ in pairs if title})
+        # 无标题的条目按 ("", info_link) 查重, 见 dedupe_key()
+        links = list({link for title, link in pairs if not title and link})
+        found = set()
+        try:
+            for i in range(0, len(titles), RSSHISTORY_QUERY_CHUNK):
+                rows = db.query(models.RSSHistory.title, models.RSSHistory.subtitle).filter(
+                    models.RSSHistory.title.in_(titles[i:i + RSSHISTORY_QUERY_CHUNK])
+                ).distinct().all()
+                found.update((row.title, row.subtitle) for row in rows)
+            for i in range(0, len(links), RSSHISTORY_QUERY_CHUNK):
+                rows = db.query(models.RSSHistory.info_link).filter(
+                    models.RSSHistory.info_link.in_(links[i:i + RSSHISTORY_QUERY_CHUNK]),
+                    or_(models.RSSHistory.title == "", models.RSSHistory.title.is_(None)),
+                ).distinct().all()
+                found.update(("", row.info_link) for row in rows)
+        except Exception as e:
+            logger.error(f"An error occurred checking RSS history: {e}")
+        return pairs & found
+
+    @staticmethod
+    def dedupe_key(rssentry, rssinfo) -> tuple:
+        """(title, subtitle) as rss_history is deduplicated on; untitled entries use ("", link)."""
+        if rssinfo.title:
+            return (rssinfo.title, rssinfo.subtitle)
+        return ("", rssentry.get("link") or rssentry.get("id") or "")
+
+    def not_modified(self, feed) -> bool:
+        return feed.get("status") == 304
+
+    def save_validators(self, db: Session, feed):
+        """Remember ETag / Last-Modified for the next poll, in their own commit.
+
+        Called once save_batch has stored the entries: validators saved for
+        entries that were not would make the next poll skip them as 304.
+        """
+        etag, modified = feed.get("etag"), feed.get("modified")
+        if (etag, modified) == (self.etag, self.modified):
+            return
+        try:
+            db.query(models.RssFeedConfig).filter(models.RssFeedConfig.name == self.name).update(
+                {"etag": etag, "modified": modified}, synchronize_session=False
+            )
+            db.commit()
+        except SQLAlchemyError as e:
+            db.rollback()
+            logger.warning(f"RSS {self.name} - failed to save ETag / Last-Modified: {e}")
+            return
+        self.etag, self.modified = etag, modified
+
     def miss_fields(self, entry):
         fields = ["id", "title", "link", "links"]
         mislist = [z for z in fields if not hasattr(entry, z)]
         return len(mislist) > 0
 
-    def process_rss_feeds(self, db: Session):
+    def build_history_item(self, rssentry, rssinfo) -> models.RSSHistory:
+        """Create a new `RSSHistory` object with the parsed information."""
+        dbrssitem = models.RSSHistory(
+            rssname=self.name,
+            site=self.site,
+            title=rssinfo.title,
+            subtitle=rssinfo.subtitle,
+            info_link=rssentry.link,
+            download_link=rssinfo.download_link,
+            size=rssinfo.size,
+            rsstags=rssinfo.rsstagstr,
+            # rsscatstr=rssinfo.cat, # This field is not in models.RSSHistory
+            pubdate=rssinfo.published,
+        )
+        dbrssitem.accept = models.AcceptStatus.PENDING.value # Use enum value
+        dbrssitem.reason = '待处理'
+        return dbrssitem
+
+    def lookup_tor_detail(self, rssinfo, watchlist_index=None) -> models.TorDetail:
+        """Use TMDb service to get TorDetail"""
+        detail = models.TorDetail() # Initialize with empty TorDetail
+        # 在关注列表中且已知 TMDb id 的, 不再查 TMDb
+        hits = watchlist_index.match(rssinfo.title, rssinfo.subtitle) if watchlist_index else []
+        if hits and hits[0].tmdbid:
+            detail.media_title = hits[0].title
+            detail.tmdbid = hits[0].tmdbid
+            detail.tmdbtype = hits[0].tmdbcat
+            detail.imdbstr = hits[0].imdbid
+            return detail
+        query = tmdb_service.normalize_title(rssinfo.title)
+        if query:
+            tmdb_results = tmdb_service.search_tmdb(query, media_type="multi")
+            if tmdb_results:
+                tmdb_result = tmdb_results[0]
+                detail.media_title = tmdb_result.get('title') or tmdb_result.get('name')
+                detail.tmdbid = str(tmdb_result.get('id'))
+                detail.tmdbtype = tmdb_result.get('media_type')
+                detail.pubdate = tmdb_result.get('release_date') or tmdb_result.get('first_air_date')
+                # Populate other fields as needed from tmdb_result
+        return detail
+
+    def write_items(self, db: Session, items):
+        """Add RSSHistory items, their TorDetail and SiteTorrent upserts without committing."""
+        db.add_all(items)
+        # flush assigns ids and the added_on defaults used by SiteTorrent
+        db.flush()
+        existing = load_site_torrents_by_infolink(db, [x.info_link for x in items])
+        for dbrssitem in items:
+            # Placeholder for rssfilter and feedaction
+            # For now, we will just assume the item is accepted and save it to SiteTorrent
+            dbrssitem.accept = models.AcceptStatus.ACCEPTED.value
+            existing[dbrssitem.info_link] = save_to_site_torrent(
+                db, dbrssitem, dbrssitem.tor_detail,
+                existing_site_torrent=existing.get(dbrssitem.info_link), commit=False
+            )
+        db.flush()
+
+    def save_batch(self, db: Session, items) -> list:
+        """Write one poll in a single transaction, falling back to per-item savepoints on error."""
+        if not items:
+            db.commit()
+            return []
+        try:
+            self.write_items(db, items)
+            db.commit()
+            return items
+        except SQLAlchemyError as e:
+            db.rollback()
+            logger.warning(f"RSS {self.name} - batch save failed, retrying item by item: {e}")
+
+        saved = []
+        for dbrssitem in items:
+            try:
+                with db.begin_nested():
+                    self.write_items(db, [dbrssitem])
+                saved.append(dbrssitem)
+            except SQLAlchemyError as e:
+                logger.error(f"RSS {self.name} - failed to save {dbrssitem.title}: {e}")
+        db.commit()
+        return saved
+
+    def process_rss_feeds(self, db: Session, progress=None) -> dict:
         # 取得 RSS 条目
         logger.info(f"RSS {self.name} {self.site} - Fetching RSS feed")
         feed = self.fetch_rss()
+        return self.ingest_feed(db, feed, progress=progress)
+
+    def ingest_feed(self, db: Session, feed, progress=None) -> dict:
+        """Parse and store an already fetched feed; returns a summary of the poll.
+
+        `progress(done, total)` is called as new entries are looked up.
+        """
+        summary = {"name": self.name, "site": self.site, "status": "ok", "total": 0, "accepted": 0}
         if not feed:
             logger.error("RSS URL configuration error or fetch failed.")
-            return
+            summary["status"] = "error"
+            return summary
+        if self.not_modified(feed):
+            logger.info(f"RSS {self.name} {self.site} - Not modified, skipping.")
+            summary["status"] = "not_modified"
+            return summary
         rssFeedSum = len(feed.entries)
         logger.info(f"取得 RSS 条目： {rssFeedSum}")
-        rssAccept = 0
 
         # Set TMDb API key
         tmdb_service.tmdb.API_KEY = settings.TMDB_API_KEY
 
-        # 遍历 RSS 条目
+        # 解析 RSS 条目, 缺关键字段的跳过
+        parsed = []
         for i, rssentry in enumerate(feed.entries):
-            # 缺关键字段，跳过
             if self.miss_fields(rssentry):
                 logger.warning("Missing fields in RSS item, skipping.")
                 continue
-
-            # 解析 RSS 条目
             rssinfo = RssEntryInfo(rssentry)
-            # 跳过 title, subtitle 有重复的
-            if self.exists_in_rsshistory(db, rssinfo.title, rssinfo.subtitle):
+            parsed.append((i, rssentry, rssinfo, self.dedupe_key(rssentry, rssinfo)))
+
+        # 跳过 title, subtitle 有重复的: 先查内存中的已见条目, 剩下的一次查询
+        cache = seen_cache.get_seen_cache(db, self.name)
+        seen = {key for _, _, _, key in parsed if cache.contains(*key)}
+        seen |= self.existing_in_rsshistory(db, [key for _, _, _, key in parsed if key not in seen])
+        for title, subtitle in seen:
+            cache.add(title, subtitle)
+
+        # 遍历新条目, 收集后一次写入
+        watchlist_index = watchlist.get_index(db)
+        pending = {}
+        for n, (i, rssentry, rssinfo, key) in enumerate(parsed):
+            if progress:
+                progress(n, len(parsed))
+            if key in seen:
                 logger.info(f"Duplicate RSS entry found: {rssinfo.title} - {rssinfo.subtitle}, skipping.")
                 continue
+            seen.add(key)
 
-            # Create a new `RSSHistory` object with the parsed information.
-            dbrssitem = models.RSSHistory(
-                rssname=self.name,
-                site=self.site,
-                title=rssinfo.title,
-                subtitle=rssinfo.subtitle,
-                info_link=rssentry.link,
-                download_link=rssinfo.download_link,
-                size=rssinfo.size,
-                rsstags=rssinfo.rsstagstr,
-                # rsscatstr=rssinfo.cat, # This field is not in models.RSSHistory
-                pubdate=rssinfo.published,
-            )
-            dbrssitem.accept = models.AcceptStatus.PENDING.value # Use enum value
-            dbrssitem.reason = '待处理'
-
-            # Use TMDb service to get TorDetail
-            detail = models.TorDetail() # Initialize with empty TorDetail
-            if rssinfo.title:
-                tmdb_result = tmdb_service.search_tmdb(rssinfo.title, media_type="multi")
-                if tmdb_result:
-                    detail.media_title = tmdb_result.get('title') or tmdb_result.get('name')
-                    detail.tmdbid = str(tmdb_result.get('id'))
-                    detail.tmdbtype = tmdb_result.get('media_type')
-                    detail.pubdate = tmdb_result.get('release_date') or tmdb_result.get('first_air_date')
-                    # Populate other fields as needed from tmdb_result
-            dbrssitem.tor_detail = detail
-
-            db.add(dbrssitem)
-            db.commit()
-            db.refresh(dbrssitem)
+            dbrssitem = self.build_history_item(rssentry, rssinfo)
+            dbrssitem.tor_detail = self.lookup_tor_detail(rssinfo, watchlist_index)
+            pending[dbrssitem] = key
 
             logger.info(
                 f"   {self.name}, {i}   {dbrssitem.title}, {HumanBytes.format(rssinfo.size)}"
             )
-            
-            # Placeholder for rssfilter and feedaction
-            # For now, we will just assume the item is accepted and save it to SiteTorrent
-            dbrssitem.accept = models.AcceptStatus.ACCEPTED.value
-            save_to_site_torrent(db, dbrssitem, detail)
-            db.commit()
 
+        # 提交后对象属性已过期, 用收集时的 key 更新缓存
+        saved = self.save_batch(db, list(pending))
+        for dbrssitem in saved:
+            cache.add(*pending[dbrssitem])
+        # 条目写入后再记 ETag, 写入失败时下次仍会完整抓取
+        self.save_validators(db, feed)
+        rssAccept = len(saved)
         logger.info(
             f"RSS {self.name} {self.site} - Total: {rssFeedSum}, Accepted: {rssAccept}"
         )
+        if progress:
+            progress(len(parsed), len(parsed))
+        summary.update(total=rssFeedSum, accepted=rssAccept)
+        return summary
 
 
 class RssEntryInfo:
+    __slots__ = ("cat", "title", "subtitle", "rsstagstr", "tags", "sizestr", "size",
+                 "extitle", "download_link", "published")
+
     def __init__(self, rssentry):
         self.cat = ""
         self.title = ""
         self.subtitle = ""
         self.rsstagstr = ""
+        self.tags = ()
+        self.sizestr = ""
         self.size = 0
         self.extitle = ""
         self.download_link = ""
@@ -265,32 +431,9 @@ class RssEntryInfo:
         self.download_link = entry.links[1]["href"]
 
     def parseRssTitle(self, rsstitle):
-        self.cat, self.title, self.subtitle, self.tags = "", "", "", []
-        match = re.search(r"^(\[[^\]]+\])?([^\[]+)(\[(.*)\]$)?", rsstitle.strip())
-        if match:
-            if match[1]:
-                self.cat = match[1][1:-1]
-            if match[2]:
-                self.title = match[2].strip()
-            if match[3]:
-                self.subtitle = match[3].strip()
-                m2 = re.search(
-                    r"(\[((\d*\.\d+|\d+\.\d+|\d+)(\s*?)(bytes|kb|mb|gb|tb|b|k|m|g|t))\].*$",
-                    self.subtitle,
-                    re.I,
-                )
-                if m2:
-                    # self.size = m2.group(2)  # size useless, cut directly
-                    self.subtitle = self.subtitle[: m2.start(1)] + self.subtitle[m2.end(1) :]
-                
-                if m4 := re.search(r" \[((?:[^\\\\[\\]]|\\\\[^\\\\[\\]]*\\\\])*)\]", self.subtitle, re.I):
-                    subtitle_left = self.subtitle[: m4.start(1) - 1] + self.subtitle[m4.end(1) + 1 :]
-                    self.subtitle = m4[1].strip()
-
-                m3 = re.search(r" \[([^[\\\\]]*?)\|([^[\\\\]]*?)(?:\\|([^[\\\\]]*?))*?\]\s*$", subtitle_left, re.I)
-                if m3:
-                    self.tags = [x.strip() for x in m3[1].split("|")]
-                    self.rsstagstr = ",".join(self.tags)
+        r = parse_rss_title(rsstitle)
+        self.cat, self.title, self.subtitle = r.cat, r.title, r.subtitle
+        self.sizestr, self.tags, self.rsstagstr = r.sizestr, r.tags, r.rsstagstr
 
     # The original parseRssSubtitle modifies self.extitle based on self.subtitle
     # This logic needs to be carefully reviewed and potentially moved or adapted.
@@ -1,5 +1,4 @@
 
-import time
 from loguru import logger
 from myconfig import CONFIG
 
@@ -8,9 +7,10 @@ from qbfunc import QbitClient
 from utils import genhash, nomalizeSitename
 from rssfilter import RssFilter
 from dlhelper import checkAutoCategory, QbitConfigFactory, addTorrent, checkMediaDbDupe
-from siteparser import fillDbitemWithTMDbParser, fillDetailWithSiteDetailPage
+from siteparser import fillDbitemWithTMDbParser, fillDetailsWithSiteDetailPages, DETAIL_STATIC_FIELDS
 from humanbytes import HumanBytes
-from rssoptickmgr import OptimalPickManager
+from rssoptickmgr import get_optimal_pick_manager, record_best_download
+from torll.services.ratelimit import rate_limiter
 
 
 class ActionFactory:
@@ -33,6 +33,12 @@ class RssActions:
         pass
     def check(self, dbrssitem, detail, rssfilter):
         pass
+    def screen(self, items, rssfilter):
+        """批量预检 [(dbrssitem, detail), ...], 返回通过的 [(dbrssitem, detail, 匹配状态), ...]"""
+        return [(dbrssitem, detail, None) for dbrssitem, detail in items]
+    def checkScreened(self, dbrssitem, detail, rssfilter):
+        """对 screen 通过的条目逐条做剩余检查"""
+        return self.check(dbrssitem, detail, rssfilter)
     def action(self, dbrssitem, detail, rssfilter):
         pass
 
@@ -62,52 +68,72 @@ class RssDownloadAction(RssActions):
 
     def check(self, dbrssitem, detail, rssfilter):
         """检查 RSS 条目是否符合下载条件"""
-        reason = rssfilter.applyFilters(dbrssitem)
-        # 首先检查rssentry 中能提取的信息： title, subtitle, size, tag, cat, hr 
-        if reason == "DL":
-            if self.rssfeed.getDetail:
-                # 取 detail 页面信息
-                detail = fillDetailWithSiteDetailPage(
-                    detail, self.rssfeed.site, dbrssitem.info_link, self.rssfeed.cookie
+        if not self.screen([(dbrssitem, detail)], rssfilter):
+            return False
+        return self.checkScreened(dbrssitem, detail, rssfilter)
+
+    def screen(self, items, rssfilter):
+        """先用 rssentry 中能提取的信息过滤, 再并发取通过条目的 detail 页面"""
+        # 首先检查rssentry 中能提取的信息： title, subtitle, size, tag, cat, hr
+        candidates = []
+        for dbrssitem, detail in items:
+            reason = rssfilter.applyFilters(dbrssitem)
+            if reason == "DL":
+                candidates.append((dbrssitem, detail, rssfilter.getMatchState()))
+            else:
+                dbrssitem.update_status(AcceptStatus.REJECTED, reason)
+        if not candidates or not self.rssfeed.getDetail:
+            return candidates
+
+        # 取 detail 页面信息; 只要求 filter 用到的字段新鲜, 没有 rate_min 时评分也可用缓存
+        details = fillDetailsWithSiteDetailPages(
+            [(detail, dbrssitem.info_link) for dbrssitem, detail, _ in candidates],
+            self.rssfeed.site,
+            self.rssfeed.cookie,
+            DETAIL_STATIC_FIELDS + rssfilter.detailFields(),
+        )
+        screened = []
+        for (dbrssitem, _, state), detail in zip(candidates, details):
+            if not detail:
+                reason = "取站点页面出错"
+                dbrssitem.update_status(AcceptStatus.REJECTED, reason)
+                logger.error(f"fillDetailsWithSiteDetailPages() error: {dbrssitem.info_link}")
+                continue
+            screened.append((dbrssitem, detail, state))
+        return screened
+
+    def checkScreened(self, dbrssitem, detail, rssfilter):
+        """detail 检查, 查重, 择优; 依赖之前已下载的条目, 须逐条进行"""
+        if self.rssfeed.getDetail:
+            # 检查 detail 中的信息，当前有：rate_min
+            reason = rssfilter.applyDetailFilter(detail)
+            if reason != "DL":
+                logger.info(
+                    f"Detail 检查未过： {self.rssfeed.name}, {dbrssitem.title}, imdb={detail.imdbval}, douban={detail.doubanval}"
                 )
-                if not detail:
-                    reason = "取站点页面出错"
-                    dbrssitem.update_status(AcceptStatus.REJECTED, reason)
-                    logger.error(f"fillDetailWithSiteDetailPage() error")
-                    return False
-
-                # 检查 detail 中的信息，当前有：rate_min
-                reason = rssfilter.applyDetailFilter(detail)
-                if reason != "DL":
-                    logger.info(
-                        f"Detail 检查未过： {self.rssfeed.name}, {dbrssitem.title}, imdb={detail.imdbval}, douban={detail.doubanval}"
-                    )
-                    dbrssitem.update_status(AcceptStatus.REJECTED, reason)
-                    db.session.commit()
-                    return False
-            # 查重
-            dupe, code = checkMediaDbDupe(
-                dbrssitem.title, detail, infolink=dbrssitem.info_link
-            )
-            if dupe:
-                dbrssitem.update_status(AcceptStatus.DUPE, code)
+                dbrssitem.update_status(AcceptStatus.REJECTED, reason)
                 db.session.commit()
                 return False
-            # 然后检查是否需要择优，需要择优的根据算法决定是否下载
-            if self.rssfeed.optpick:
-                op = OptimalPickManager(config_path=self.rssfeed.optpick)
-                if not op.should_download(dbrssitem):
-                    logger.info(
-                        f"   {self.rssfeed.name}, OPT PICK - reject: {dbrssitem.title} "
-                    )
-                    dbrssitem.update_status(AcceptStatus.OPTPICK, "择优淘汰")
-                    db.session.commit()
-                    return False
-            
-            return True
-        else:
-            dbrssitem.update_status(AcceptStatus.REJECTED, reason)
+        # 查重
+        dupe, code = checkMediaDbDupe(
+            dbrssitem.title, detail, infolink=dbrssitem.info_link
+        )
+        if dupe:
+            dbrssitem.update_status(AcceptStatus.DUPE, code)
+            db.session.commit()
             return False
+        # 然后检查是否需要择优，需要择优的根据算法决定是否下载
+        if self.rssfeed.optpick:
+            op = get_optimal_pick_manager(self.rssfeed.optpick)
+            if not op.should_download(dbrssitem):
+                logger.info(
+                    f"   {self.rssfeed.name}, OPT PICK - reject: {dbrssitem.title} "
+                )
+                dbrssitem.update_status(AcceptStatus.OPTPICK, "择优淘汰")
+                db.session.commit()
+                return False
+
+        return True
 
     def action(self, dbrssitem, detail, rssfilter):
         self.download(dbrssitem, detail, rssfilter)
@@ -139,6 +165,13 @@ class RssDownloadAction(RssActions):
             qbitname=self.qbconfig.qbitname,
         )
         db.session.add(t)
+        db.session.flush()
+        # 与下载记录同一事务更新 best_download
+        record_best_download(
+            t,
+            detail,
+            get_optimal_pick_manager(self.rssfeed.optpick) if self.rssfeed.optpick else None,
+        )
         db.session.commit()
 
         # Check if the configured Qbittorrent client has enough free space to download the torrent.
@@ -151,6 +184,8 @@ class RssDownloadAction(RssActions):
             )
             return False
         # Add the torrent to the client.
+        # qBittorrent 会向站点取种子文件, 与其它站点请求共用限速
+        rate_limiter.acquire(site=dbrssitem.site, url=dbrssitem.download_link)
         r = addTorrent(
             downitem=t,
             checkspace=False,
@@ -159,7 +194,6 @@ class RssDownloadAction(RssActions):
             qbitname=self.qbconfig.qbitname,
         )
         self.size_storage_space -= dbrssitem.size
-        time.sleep(1)
 
         if r == 201:
             dbrssitem.update_status(AcceptStatus.ACCEPTED, 'DL')
@@ -1,51 +1,297 @@
 import re
-from utils import nomalizeSitename, tryint, genhash
+import json
+import threading
+from collections import OrderedDict
+from torll.core.utils import tryint
 from loguru import logger
 
-class RssFilter:
+
+class FilterCompileError(ValueError):
+    """A filter rule that can not be compiled (bad regex, bad size bound ...)."""
+
+
+# filter 中可用的 key, 其余 key 只告警
+FILTER_KEYS = {
+    "title_regex", "title_not_regex", "subtitle_regex", "subtitle_not_regex", "no_hr",
+    "size_gb_min", "size_gb_max", "rsstags_regex", "rsstags_not_regex",
+    "rsscat_regex", "rsscat_not_regex", "rate_min", "tag", "qbitname", "watchlist",
+}
+
+RE_NO_HR = re.compile(r"h\d$")
+
+# applyDetailFilter 中各条件读取的详情页字段; 目前没有按做种数筛选的条件
+DETAIL_FILTER_FIELDS = {
+    "rate_min": ("imdbval", "doubanval"),
+}
+
+# (key, 取值字段, 匹配时通过, 失败 reason), 按开销从低到高排列: 先比大小, 再跑正则
+REGEX_CHECKS = (
+    ("rsscat_regex", "rsscatstr", True, "RSS_CAT_REGEX"),
+    ("rsscat_not_regex", "rsscatstr", False, "RSS_CAT_NOT_REGEX"),
+    ("rsstags_regex", "rsstags", True, "RSS_TAG_REGEX"),
+    ("rsstags_not_regex", "rsstags", False, "RSS_TAG_NOT_REGEX"),
+    ("title_regex", "title", True, "TITLE_REGEX"),
+    ("title_not_regex", "title", False, "TITLE_NOT_REGEX"),
+    ("subtitle_regex", "subtitle", True, "SUBTITLE_REGEX"),
+    ("subtitle_not_regex", "subtitle", False, "SUBTITLE_NOT_REGEX"),
+)
+
+
+def _field(dbrssitem, name):
+    return getattr(dbrssitem, name, None) or ""
+
+
+def _size_gb(dbrssitem):
+    return tryint(dbrssitem.size) / 10**9
+
+
+def _bound(rule, key):
+    value = rule[key]
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        raise FilterCompileError(f"{key} 应为数字: {value!r}")
+    return value
+
+
+def _regex_check(pattern, field, want):
+    def check(dbrssitem):
+        return bool(pattern.search(_field(dbrssitem, field))) == want
+    return check
+
+
+class CompiledFilter:
+    """One filter rule compiled into an ordered tuple of (reason, check, key) entries.
+
+    key is the rule key of a regex check (None for the others), so a result
+    already known from a combined scan (FilterGate) can stand in for the check.
+    """
+
+    __slots__ = ("rule", "checks", "tag", "qbitname")
+
+    def __init__(self, rule, checks):
+        self.rule = rule
+        self.checks = checks
+        self.tag = rule.get("tag", "")
+        self.qbitname = rule.get("qbitname", "")
+
+    def match(self, dbrssitem):
+        """条件满足返回 DL，不满足返回 reason"""
+        for reason, check, _ in self.checks:
+            if not check(dbrssitem):
+                return reason
+        return "DL"
+
+
+def compile_filter(rule, watchlist_index=None) -> CompiledFilter:
+    """watchlist_index: the watchlist.get_index(db) to match "watchlist" rules against."""
+    if not isinstance(rule, dict):
+        raise FilterCompileError(f"filter 应为 dict: {rule!r}")
+    unknown = set(rule) - FILTER_KEYS
+    if unknown:
+        logger.warning(f"filter 中有未知的 key: {sorted(unknown)}")
+
+    checks = []
+    if "size_gb_min" in rule:
+        size_min = _bound(rule, "size_gb_min")
+        checks.append(("SIZE_MIN", lambda item: _size_gb(item) >= size_min, None))
+    if "size_gb_max" in rule:
+        size_max = _bound(rule, "size_gb_max")
+        checks.append(("SIZE_MAX", lambda item: _size_gb(item) <= size_max, None))
+    if "rate_min" in rule:
+        _bound(rule, "rate_min")
+    if "no_hr" in rule:
+        checks.append(("NO_HR", lambda item: not RE_NO_HR.search(_field(item, "subtitle")), None))
+    if rule.get("watchlist"):
+        # 只接受关注列表中的片子, 索引由调用方按当前 DB 加载后传入
+        if watchlist_index is None:
+            raise FilterCompileError("watchlist 规则需要关注列表索引")
+        checks.append(("WATCHLIST", lambda item: bool(
+            watchlist_index.match(_field(item, "title"), _field(item, "subtitle"))
+        ), None))
+    for key, field, want, reason in REGEX_CHECKS:
+        if key not in rule:
+            continue
+        try:
+            pattern = re.compile(rule[key], re.I)
+        except (re.error, TypeError) as e:
+            raise FilterCompileError(f"{key} 正则错误 {rule[key]!r}: {e}")
+        checks.append((reason, _regex_check(pattern, field, want), key))
+    return CompiledFilter(rule, tuple(checks))
+
+
+# 含命名分组, 编号反向引用, 条件分组或全局内联 flag 的正则, 拼接后语义会变, 不参与合并
+RE_NOT_COMBINABLE = re.compile(r"\\\d|\(\?P[<=]|\(\?\(|\(\?[aiLmsux]+\)")
+# 合并扫描的字段: 正向匹配的正则
+GATE_FIELDS = (("title", "title_regex"), ("subtitle", "subtitle_regex"))
+
+
+class FilterGate:
+    """A field's positive regexes merged into one pattern, with one named group per filter.
+
+    The scan runs a plain alternation of the regexes (no groups, so re can
+    still skip ahead on the branches' first characters); a miss rules out
+    every member. On a hit, the named-group alternation matched at the same
+    position tells which filter's regex it was (lastgroup). A member not
+    reported may still match elsewhere in the text, so it is checked on its own.
+    """
+
+    __slots__ = ("field", "key", "pattern", "named", "names", "members", "missed")
+
+    def __init__(self, field, key, members):
+        self.field = field
+        self.key = key
+        self.pattern = re.compile("|".join(f"(?:{p})" for _, p in members), re.I)
+        self.named = re.compile("|".join(f"(?P<f{i}>{p})" for i, p in members), re.I)
+        self.names = {f"f{i}": i for i, _ in members}
+        self.members = frozenset(i for i, _ in members)
+        self.missed = {i: False for i in self.members}
+
+    def hits(self, text):
+        """{filter index: 是否命中}, 未列出的 filter 结果未知"""
+        m = self.pattern.search(text)
+        if m is None:
+            return self.missed
+        named = self.named.match(text, m.start())
+        return {self.names[named.lastgroup]: True} if named else {}
+
+
+def _build_gates(filters):
+    gates = []
+    for field, key in GATE_FIELDS:
+        members = [
+            (i, cf.rule[key]) for i, cf in enumerate(filters)
+            if key in cf.rule and not RE_NOT_COMBINABLE.search(cf.rule[key])
+        ]
+        if len(members) < 2:
+            continue
+        try:
+            gates.append(FilterGate(field, key, members))
+        except re.error as e:
+            logger.debug(f"{key} 无法合并, 逐条匹配: {e}")
+    return tuple(gates)
+
+
+class FilterProgram:
+    """Immutable compiled form of a feed's filter list."""
+
+    __slots__ = ("filters", "gates", "plans")
+
     def __init__(self, filters):
         self.filters = filters
+        self.gates = _build_gates(filters)
+        # 每个 filter 的检查, 正则检查在合并扫描中时带上 gate; 没有 gate 的为 None, 直接用 cf.match
+        plans = []
+        for i, cf in enumerate(filters):
+            gates = {gate.key: gate for gate in self.gates if i in gate.members}
+            plans.append(
+                tuple((reason, check, gates.get(key)) for reason, check, key in cf.checks)
+                if gates else None
+            )
+        self.plans = tuple(plans)
+
+    def _match(self, i, dbrssitem, scanned, ruled_out):
+        """cf.match, with gated regex checks answered by one lazy scan per field and item."""
+        for reason, check, gate in self.plans[i]:
+            if gate is None:
+                passed = check(dbrssitem)
+            else:
+                hits = scanned.get(gate.key)
+                if hits is None:
+                    hits = scanned[gate.key] = gate.hits(_field(dbrssitem, gate.field))
+                    if hits is gate.missed:
+                        ruled_out |= gate.members
+                passed = hits.get(i)
+                if passed is None:
+                    passed = check(dbrssitem)
+            if not passed:
+                return reason
+        return "DL"
+
+    def apply(self, dbrssitem):
+        """返回 (reason, 匹配的 CompiledFilter); 全部不满足时 reason 为最后一个 filter 的"""
+        scanned = {}
+        ruled_out = set()
+        last = len(self.filters) - 1
+        reason = "DL"
+        for i, cf in enumerate(self.filters):
+            if self.plans[i] is None:
+                reason = cf.match(dbrssitem)
+            elif i in ruled_out and i != last:
+                # 合并扫描已排除, 不再匹配; 最后一个仍按检查顺序算出 reason
+                continue
+            else:
+                reason = self._match(i, dbrssitem, scanned, ruled_out)
+            if reason == "DL":
+                return reason, cf
+        return reason, None
+
+
+# (filters json, 关注列表版本) -> FilterProgram, 最近使用的在后
+PROGRAM_CACHE_SIZE = 256
+_programs = OrderedDict()
+_programs_lock = threading.Lock()
+
+
+def _index_key(watchlist_index):
+    """Cache key of a watchlist index: its table version, not the index object.
+
+    Indexes built outside watchlist.get_index have no version; they are keyed
+    by id, which stays unique while a cached program still refers to them.
+    """
+    if watchlist_index is None:
+        return None
+    if watchlist_index.version is not None:
+        return ("version", watchlist_index.version)
+    return ("id", id(watchlist_index))
+
+
+def _compile_filters_json(filters_json, watchlist_index):
+    key = (filters_json, _index_key(watchlist_index))
+    with _programs_lock:
+        program = _programs.get(key)
+        if program is not None:
+            _programs.move_to_end(key)
+            return program
+    rules = json.loads(filters_json)
+    program = FilterProgram(tuple(compile_filter(rule, watchlist_index) for rule in rules))
+    with _programs_lock:
+        if key[1] is not None and key[1][0] == "version":
+            # 关注列表已更新: 旧版本的编译结果不会再用到
+            for old in [k for k in _programs if k[1] is not None and k[1][0] == "version" and k[1] != key[1]]:
+                del _programs[old]
+        _programs[key] = program
+        while len(_programs) > PROGRAM_CACHE_SIZE:
+            _programs.popitem(last=False)
+    return program
+
+
+def compile_filters(filters, watchlist_index=None) -> FilterProgram:
+    """Compile a filter list once per distinct config and watchlist version.
+
+    Raises FilterCompileError, also for "watchlist" rules without an index.
+    """
+    if not isinstance(filters, list):
+        raise FilterCompileError(f"filters 应为 list: {filters!r}")
+    try:
+        filters_json = json.dumps(filters, sort_keys=True, ensure_ascii=False)
+    except (TypeError, ValueError) as e:
+        raise FilterCompileError(f"filters 无法序列化: {e}")
+    # 没有 watchlist 规则时索引不参与缓存 key, 关注列表变动不会让编译结果失效
+    if not any(isinstance(rule, dict) and rule.get("watchlist") for rule in filters):
+        watchlist_index = None
+    return _compile_filters_json(filters_json, watchlist_index)
+
+
+class RssFilter:
+    def __init__(self, filters, watchlist_index=None):
+        self.filters = filters
+        self.watchlist_index = watchlist_index
+        self.program = compile_filters(filters, watchlist_index)
         self.match_filter = None
         self.tag = ""
 
     def matchFilter(self, filter, dbrssitem):
         """filter中条件满足返回 DL，不满足返回 reason"""
-        if "title_regex" in filter:
-            if not re.search(filter["title_regex"], dbrssitem.title, re.I):
-                return "TITLE_REGEX"
-        if "title_not_regex" in filter:
-            if re.search(filter["title_not_regex"], dbrssitem.title, re.I):
-                return "TITLE_NOT_REGEX"
-        if "subtitle_regex" in filter:
-            if not re.search(filter["subtitle_regex"], dbrssitem.subtitle, re.I):
-                return "SUBTITLE_REGEX"
-        if "subtitle_not_regex" in filter:
-            if re.search(filter["subtitle_not_regex"], dbrssitem.subtitle, re.I):
-                return "SUBTITLE_NOT_REGEX"
-        if "no_hr" in filter:
-            if re.search(r"h\d$", dbrssitem.subtitle):
-                return "NO_HR"
-        if "size_gb_min" in filter:
-            size_gb = tryint(dbrssitem.size) / 10**9
-            if size_gb < filter["size_gb_min"]:
-                return "SIZE_MIN"
-        if "size_gb_max" in filter:
-            size_gb = tryint(dbrssitem.size) / 10**9
-            if size_gb > filter["size_gb_max"]:
-                return "SIZE_MAX"
-        if "rsstags_regex" in filter:
-            if not re.search(filter["rsstags_regex"], dbrssitem.rsstags, re.I):
-                return "RSS_TAG_REGEX"
-        if "rsstags_not_regex" in filter:
-            if re.search(filter["rsstags_not_regex"], dbrssitem.rsstags, re.I):
-                return "RSS_TAG_NOT_REGEX"
-        if "rsscat_regex" in filter:
-            if not re.search(filter["rsscat_regex"], dbrssitem.rsscatstr, re.I):
-                return "RSS_CAT_REGEX"
-        if "rsscat_not_regex" in filter:
-            if re.search(filter["rsscat_not_regex"], dbrssitem.rsscatstr, re.I):
-                return "RSS_CAT_NOT_REGEX"
-        return "DL"
+        return compile_filters([filter], self.watchlist_index).filters[0].match(dbrssitem)
 
 
     def getFilterTag(self, filter):
@@ -66,26 +312,34 @@ class RssFilter:
         return qbitname
 
     def applyFilters(self, dbrssitem):
-        reason = "DL"
-        for filter in self.filters:
-            try:
-                reason = self.matchFilter(filter, dbrssitem)
-                if reason == "DL":
-                    self.match_filter = filter
-                    self.tag = self.getFilterTag(filter)
-                    return reason
-                elif reason == "":
-                    logger.debug(f"{self.name} {dbrssitem.title}")
-                    return "(empty)"
-            except:
-                logger.error(f"filter 规则错误")
-                return "规则写错"
-        # 全部 filter条件都不满足
+        self.match_filter = None
+        self.tag = ""
+        reason, cf = self.program.apply(dbrssitem)
+        if cf:
+            self.match_filter = cf.rule
+            self.tag = cf.tag
+        # 全部 filter条件都不满足时, 返回最后一个 filter 的 reason
         return reason
 
+    def getMatchState(self):
+        """匹配状态 (命中的 filter, tag), 分阶段处理时按条目保存"""
+        return (self.match_filter, self.tag)
+
+    def setMatchState(self, state):
+        self.match_filter, self.tag = state or (None, "")
+
+    def detailFields(self):
+        """详情页上 applyDetailFilter 会读的字段, 取详情页时只需这些字段 (及不会过时的字段) 新鲜"""
+        fields = {}
+        for rule in self.filters:
+            for key, names in DETAIL_FILTER_FIELDS.items():
+                if isinstance(rule, dict) and key in rule:
+                    fields.update(dict.fromkeys(names))
+        return tuple(fields)
+
     def applyDetailFilter(self, detail):
         if not self.match_filter:
-            logger.error(f"匹配 filter 为空")
+            logger.error("匹配 filter 为空")
             return "匹配 filter 错误"
         reason = "DL"
         if "rate_min" in self.match_filter:
@@ -9,14 +9,14 @@ from utils import nomalizeSitename, tryint, genhash
 from qbfunc import QbitClient
 from humanbytes import HumanBytes
 from optpick import TorrentParser, TorrentInfo, OptPickConfig
-from models import db, RSSHistory, AcceptStatus, TorDownload, TorDetail
+from models import db, RSSHistory, AcceptStatus, TorDownload, TorDetail, SiteTorrent
 from dlhelper import (
     fillDetailWithNameParser,
     getSiteCookie
 )
 from dlhelper import checkMediaDbDupe, checkAutoCategory, addTorrent
-from siteparser import fillDetailWithSiteDetailPage
-from rssfilter import RssFilter
+from rssfilter import RssFilter, FilterCompileError
+from torll.services import watchlist
 from rssactions import ActionFactory
 
 from flask import current_app
@@ -129,20 +129,30 @@ class RssFeed:
         # if self.optpick:
         #     optpick = OptimalPickManager(config_path=self.optpick)
 
-        # 遍历 RSS 条目
-        for i, rssentry in enumerate(feed.entries):
-            # 缺关键字段，跳过
-            if self.missFields(rssentry):
-                logger.warning("miss field in rssitem, skip")
-                continue
-
-            # 解析 RSS 条目
-            rssinfo = RssEntryInfo(rssentry)
-            # 跳过 title, subtitle 有重复的
-            if self.existsInRssHistory(rssinfo.title, rssinfo.subtitle):
-                continue
+        # 入库, 过滤, 下载在同一个 app context (同一个 session) 中进行,
+        # 否则前一阶段的对象在 context 结束后脱离 session, 之后访问属性会出错, 状态修改也不会保存
+        with current_app.app_context():
+            # 准备 filter, 规则在编译时检查, 写错的不再逐条报 "规则写错"
+            try:
+                rssfilter = RssFilter(self.filters, watchlist.get_index(db.session))
+            except FilterCompileError as e:
+                logger.error(f"RSS {self.name} filter 规则错误: {e}")
+                return
+
+            # 遍历 RSS 条目, 新条目先入库
+            items = []
+            for i, rssentry in enumerate(feed.entries):
+                # 缺关键字段，跳过
+                if self.missFields(rssentry):
+                    logger.warning("miss field in rssitem, skip")
+                    continue
+
+                # 解析 RSS 条目
+                rssinfo = RssEntryInfo(rssentry)
+                # 跳过 title, subtitle 有重复的
+                if self.existsInRssHistory(rssinfo.title, rssinfo.subtitle):
+                    continue
 
-            with current_app.app_context():
                 # Create a new `RSSHistory` object with the parsed information.
                 dbrssitem = RSSHistory(
                     rssname=self.name,
@@ -162,14 +172,21 @@ class RssFeed:
                     detail.extitle = rssinfo.extitle  # 如果title 中能解析出片名
                 dbrssitem.tor_detail = detail
                 db.session.add(dbrssitem)
-                db.session.commit()
 
                 logger.info(
                     f"   {self.name}, {i}   {dbrssitem.title}, {HumanBytes.format(rssinfo.size)}"
                 )
-                
-                rssfilter = RssFilter(self.filters)
-                if feedaction.check(dbrssitem, detail, rssfilter):
+                items.append((dbrssitem, detail))
+            db.session.commit()
+
+            # 过滤, 通过的条目并发取 detail 页面
+            screened = feedaction.screen(items, rssfilter)
+            db.session.commit()
+
+            # 查重/择优/下载 逐条进行
+            for dbrssitem, detail, state in screened:
+                rssfilter.setMatchState(state)
+                if feedaction.checkScreened(dbrssitem, detail, rssfilter):
                     feedaction.action(dbrssitem, detail, rssfilter)
                     rssAccept += 1
                     if dbrssitem.accept == AcceptStatus.ACCEPTED:
@@ -180,68 +197,70 @@ class RssFeed:
         )
 
 def save_to_site_torrent(rss_history_item: RSSHistory, tor_detail_item: TorDetail):
-    """Saves or updates a SiteTorrent entry based on RSSHistory and TorDetail."""
-    with current_app.app_context():
-        # Check if a SiteTorrent with the same infolink already exists
-        existing_site_torrent = db.session.query(SiteTorrent).filter(
-            SiteTorrent.infolink == rss_history_item.info_link
-        ).first()
-
-        if existing_site_torrent:
-            # Update existing entry
-            site_torrent = existing_site_torrent
-            logger.info(f"Updating existing SiteTorrent: {site_torrent.tortitle}")
-        else:
-            # Create new entry
-            site_torrent = SiteTorrent()
-            logger.info(f"Creating new SiteTorrent: {rss_history_item.title}")
-            db.session.add(site_torrent)
-
-        # Populate fields from RSSHistory
-        site_torrent.addedon = rss_history_item.added_on
-        site_torrent.site = rss_history_item.site
-        site_torrent.tortitle = rss_history_item.title
-        site_torrent.infolink = rss_history_item.info_link
-        site_torrent.subtitle = rss_history_item.subtitle
-        site_torrent.downlink = rss_history_item.download_link
-        site_torrent.torsizeint = rss_history_item.size
-        site_torrent.tordate = rss_history_item.pubdate
-
-        # Populate fields from TorDetail
-        if tor_detail_item:
-            site_torrent.tmdbtitle = tor_detail_item.media_title
-            site_torrent.tmdbcat = tor_detail_item.tmdbtype
-            site_torrent.tmdbid = tryint(tor_detail_item.tmdbid)
-            site_torrent.tmdbyear = tor_detail_item.year_int
-            site_torrent.imdbstr = tor_detail_item.imdbstr
-            site_torrent.imdbval = tor_detail_item.imdbval
-            site_torrent.doubanid = tor_detail_item.doubanid
-            site_torrent.doubanval = tor_detail_item.doubanval
-            site_torrent.videocodec = tor_detail_item.videocodec
-            site_torrent.audiocodec = tor_detail_item.audiocodec
-            site_torrent.mediasource = tor_detail_item.mediasource
-            site_torrent.resolution = tor_detail_item.resolution
-            # Note: tmdbposter, genrestr, tmdboverview are not directly in TorDetail
-            # and would require further TMDb lookup or parsing if needed.
-
-        # Populate tag fields from RSSHistory.rsstags (if available and parsed)
-        # This assumes rsstags is a comma-separated string of tags
-        if rss_history_item.rsstags:
-            tags = [tag.strip().lower() for tag in rss_history_item.rsstags.split(',')]
-            site_torrent.taggy = "gy" in tags
-            site_torrent.tagzz = "zz" in tags
-            site_torrent.tagfree = "free" in tags
-            site_torrent.tag2xfree = "2xfree" in tags
-            site_torrent.tag50off = "50%" in tags or "50off" in tags
-            # Add more tag mappings as needed
-
-        # Default values for seednum, downnum, dlcount, torsizestr if not available
-        site_torrent.seednum = site_torrent.seednum if site_torrent.seednum is not None else -1
-        site_torrent.downnum = site_torrent.downnum if site_torrent.downnum is not None else -1
-        site_torrent.dlcount = site_torrent.dlcount if site_torrent.dlcount is not None else 0
-        site_torrent.torsizestr = HumanBytes.format(site_torrent.torsizeint) if site_torrent.torsizeint is not None else ""
-
-        db.session.commit()
+    """Saves or updates a SiteTorrent entry based on RSSHistory and TorDetail.
+
+    Runs in the caller's app context, so the items stay in the caller's session.
+    """
+    # Check if a SiteTorrent with the same infolink already exists
+    existing_site_torrent = db.session.query(SiteTorrent).filter(
+        SiteTorrent.infolink == rss_history_item.info_link
+    ).first()
+
+    if existing_site_torrent:
+        # Update existing entry
+        site_torrent = existing_site_torrent
+        logger.info(f"Updating existing SiteTorrent: {site_torrent.tortitle}")
+    else:
+        # Create new entry
+        site_torrent = SiteTorrent()
+        logger.info(f"Creating new SiteTorrent: {rss_history_item.title}")
+        db.session.add(site_torrent)
+
+    # Populate fields from RSSHistory
+    site_torrent.addedon = rss_history_item.added_on
+    site_torrent.site = rss_history_item.site
+    site_torrent.tortitle = rss_history_item.title
+    site_torrent.infolink = rss_history_item.info_link
+    site_torrent.subtitle = rss_history_item.subtitle
+    site_torrent.downlink = rss_history_item.download_link
+    site_torrent.torsizeint = rss_history_item.size
+    site_torrent.tordate = rss_history_item.pubdate
+
+    # Populate fields from TorDetail
+    if tor_detail_item:
+        site_torrent.tmdbtitle = tor_detail_item.media_title
+        site_torrent.tmdbcat = tor_detail_item.tmdbtype
+        site_torrent.tmdbid = tryint(tor_detail_item.tmdbid)
+        site_torrent.tmdbyear = tor_detail_item.year_int
+        site_torrent.imdbstr = tor_detail_item.imdbstr
+        site_torrent.imdbval = tor_detail_item.imdbval
+        site_torrent.doubanid = tor_detail_item.doubanid
+        site_torrent.doubanval = tor_detail_item.doubanval
+        site_torrent.videocodec = tor_detail_item.videocodec
+        site_torrent.audiocodec = tor_detail_item.audiocodec
+        site_torrent.mediasource = tor_detail_item.mediasource
+        site_torrent.resolution = tor_detail_item.resolution
+        # Note: tmdbposter, genrestr, tmdboverview are not directly in TorDetail
+        # and would require further TMDb lookup or parsing if needed.
+
+    # Populate tag fields from RSSHistory.rsstags (if available and parsed)
+    # This assumes rsstags is a comma-separated string of tags
+    if rss_history_item.rsstags:
+        tags = [tag.strip().lower() for tag in rss_history_item.rsstags.split(',')]
+        site_torrent.taggy = "gy" in tags
+        site_torrent.tagzz = "zz" in tags
+        site_torrent.tagfree = "free" in tags
+        site_torrent.tag2xfree = "2xfree" in tags
+        site_torrent.tag50off = "50%" in tags or "50off" in tags
+        # Add more tag mappings as needed
+
+    # Default values for seednum, downnum, dlcount, torsizestr if not available
+    site_torrent.seednum = site_torrent.seednum if site_torrent.seednum is not None else -1
+    site_torrent.downnum = site_torrent.downnum if site_torrent.downnum is not None else -1
+    site_torrent.dlcount = site_torrent.dlcount if site_torrent.dlcount is not None else 0
+    site_torrent.torsizestr = HumanBytes.format(site_torrent.torsizeint) if site_torrent.torsizeint is not None else ""
+
+    db.session.commit()
 
 
 
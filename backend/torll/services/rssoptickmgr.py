@@ -1,17 +1,22 @@
 from optpick import TorrentParser, TorrentInfo, OptPickConfig
-from models import db, RSSHistory, TorDownload, TorDetail
+from models import db, RSSHistory, TorDownload, TorDetail, BestDownload
 from typing import Optional
+import os
 import re
+import threading
 from flask import current_app
 from loguru import logger
 
 
+DEFAULT_OPTPICK_CONFIG = "optconfig.json"
+
+
 class OptimalPickManager:
     """RSS 择优下载管理器"""
 
-    def __init__(self, config_path: str = "optconfig.json"):
+    def __init__(self, config_path: str = DEFAULT_OPTPICK_CONFIG):
         if not config_path:
-            config_path = "optconfig.json"
+            config_path = DEFAULT_OPTPICK_CONFIG
         self.config = OptPickConfig(config_path)
 
         # 编译所有规则的正则表达式
@@ -30,21 +35,11 @@ class OptimalPickManager:
 
     def getSameSeriesSeasonResolution(
         self, torrent_info: TorrentInfo
-    ) -> Optional[TorDownload]:
-        return (
-            db.session.query(TorDownload)
-            .join(TorDetail, TorDetail.id == TorDownload.tor_detail_id)
-            .filter(
-                (TorDetail.media_title == torrent_info.media_title)
-                & (TorDetail.season == torrent_info.season)
-                & (TorDetail.resolution == torrent_info.resolution)
-            )
-            .order_by(TorDownload.id.desc())
-            .first()
+    ) -> Optional[BestDownload]:
+        """已下载的同剧集/季/分辨率的最优版本, 按 best_download 主键查找"""
+        return lookup_best_download(
+            torrent_info.media_title, torrent_info.season, torrent_info.resolution
         )
-        # query = db.session.query(
-        # TorDownload).join(
-        #     TorDetail, TorDetail.id==TorDownload.tor_detail_id).all()
 
     def compareOptimalByGroup(self, groupNew, groupInDb):
         return self.config.get_group_score(groupNew) >= self.config.get_group_score(
@@ -83,5 +78,80 @@ class OptimalPickManager:
 
             # 比较版本优先级
             return self.compareOptimalByGroup(
-                torrent_info.group, existing_record.tor_detail.group
+                torrent_info.group, existing_record.group
             )
+
+
+def _best_key(media_title, season, resolution):
+    return (media_title, season or "", resolution or "")
+
+
+def lookup_best_download(media_title, season, resolution) -> Optional[BestDownload]:
+    if not media_title:
+        return None
+    return db.session.get(BestDownload, _best_key(media_title, season, resolution))
+
+
+def record_best_download(
+    download: TorDownload,
+    detail: TorDetail,
+    manager: Optional[OptimalPickManager] = None,
+) -> Optional[BestDownload]:
+    """Update best_download for a new download in the caller's transaction.
+
+    The row is replaced when the new group scores at least as high as the
+    recorded one; without an optpick config the latest download wins, as
+    the old ORDER BY id DESC lookup did.
+    """
+    if not detail or not detail.media_title:
+        return None
+    score = manager.config.get_group_score(detail.group) if manager else None
+    best = lookup_best_download(detail.media_title, detail.season, detail.resolution)
+    if best is None:
+        media_title, season, resolution = _best_key(
+            detail.media_title, detail.season, detail.resolution
+        )
+        best = BestDownload(media_title=media_title, season=season, resolution=resolution)
+        db.session.add(best)
+    elif score is not None and best.group_score is not None and score < best.group_score:
+        return best
+    best.tmdbid = detail.tmdbid
+    best.group = detail.group
+    best.group_score = score
+    best.tor_download_id = download.id
+    return best
+
+
+# 进程内共享的择优配置: 按 (路径, mtime, size) 缓存, 文件变化时重新加载
+_managers = {}
+_managers_lock = threading.Lock()
+
+
+def _config_stamp(path: str):
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return (st.st_mtime_ns, st.st_size)
+
+
+def get_optimal_pick_manager(config_path: str = DEFAULT_OPTPICK_CONFIG) -> OptimalPickManager:
+    """Return the shared OptimalPickManager for a config file.
+
+    The JSON is parsed and the rule regexes compiled once per file version;
+    the manager is rebuilt when the file's mtime or size changes.
+    """
+    path = os.path.abspath(config_path or DEFAULT_OPTPICK_CONFIG)
+    stamp = _config_stamp(path)
+    cached = _managers.get(path)
+    if cached and cached[0] == stamp:
+        return cached[1]
+    with _managers_lock:
+        cached = _managers.get(path)
+        if cached and cached[0] == stamp:
+            return cached[1]
+        if cached:
+            logger.info(f"optpick config changed, reloading: {path}")
+        manager = OptimalPickManager(config_path=path)
+        _managers[path] = (stamp, manager)
+        return manager
@@ -0,0 +1,56 @@
+import re
+
+# NexusPHP RSS 标题: [分类] 种子名 [副标题] [大小] [标签1|标签2]
+RE_RSS_TITLE = re.compile(r"^(?:\[([^\]]+)\])?([^\[]+)(.*)$", re.S)
+# 顶层方括号块, 允许一层嵌套
+RE_BRACKET_BLOCK = re.compile(r"\[((?:[^\[\]]|\[[^\[\]]*\])*)\]")
+RE_SIZE = re.compile(r"^\s*(\d*\.\d+|\d+\.\d*|\d+)\s*(bytes|kb|mb|gb|tb|b|k|m|g|t)\s*$", re.I)
+RE_NESTED_SIZE = re.compile(r"\[\s*(?:\d*\.\d+|\d+\.\d*|\d+)\s*(?:bytes|kb|mb|gb|tb|b|k|m|g|t)\s*\]", re.I)
+
+
+class RssTitle:
+    """Fields parsed from one RSS item title."""
+
+    __slots__ = ("cat", "title", "subtitle", "sizestr", "tags")
+
+    def __init__(self, cat="", title="", subtitle="", sizestr="", tags=()):
+        self.cat = cat
+        self.title = title
+        self.subtitle = subtitle
+        self.sizestr = sizestr
+        self.tags = tags
+
+    @property
+    def rsstagstr(self) -> str:
+        return ",".join(self.tags)
+
+    def __repr__(self):
+        return f"RssTitle({self.cat!r}, {self.title!r}, {self.subtitle!r}, {self.sizestr!r}, {self.tags!r})"
+
+
+def parse_rss_title(rsstitle: str) -> RssTitle:
+    """Split a NexusPHP RSS title in one scan over its bracket blocks.
+
+    The first block that is not a size is the subtitle. A size block is kept as
+    `sizestr`. If the last remaining block holds a `|` list, it is the tag list.
+    """
+    match = RE_RSS_TITLE.match(rsstitle.strip())
+    if not match:
+        return RssTitle()
+    cat = match[1] or ""
+    title = match[2].strip()
+    subtitle, sizestr, last = None, "", None
+    for block in RE_BRACKET_BLOCK.finditer(match[3]):
+        content = block[1]
+        if not sizestr and RE_SIZE.match(content):
+            sizestr = content.strip()
+        elif subtitle is None:
+            subtitle = content
+        else:
+            last = content
+    tags = ()
+    if last and "|" in last:
+        tags = tuple(x.strip() for x in last.split("|"))
+    if subtitle and "[" in subtitle:
+        subtitle = RE_NESTED_SIZE.sub("", subtitle)
+    return RssTitle(cat, title, (subtitle or "").strip(), sizestr, tags)
@@ -0,0 +1,166 @@
+import asyncio
+import heapq
+import itertools
+import random
+
+from sqlalchemy.orm import Session
+from loguru import logger
+
+from torll.db.database import SessionLocal
+from torll.models import models
+from torll.services import rss_poller, site_update
+from torll.core.config import settings
+
+
+# 任务间隔下限, 防止 interval 配置为 0 时空转
+MIN_INTERVAL = 60
+
+
+class ScheduledJob:
+    def __init__(self, key, interval: int, payload):
+        self.key = key
+        self.interval = max(interval or 0, MIN_INTERVAL)
+        self.payload = payload
+        self.failures = 0
+
+    def next_delay(self, jitter: float, max_backoff: int) -> float:
+        """Interval with +-jitter, stretched exponentially while the job keeps failing."""
+        delay = self.interval * (2 ** self.failures) if self.failures else self.interval
+        delay = min(delay, max(max_backoff, self.interval))
+        return delay * random.uniform(1 - jitter, 1 + jitter)
+
+
+def load_jobs(db: Session) -> dict:
+    """Enabled RSS feeds, auto-updating PT sites and their pending back-fills.
+
+    Keyed by ("rss", name) / ("site", site) / ("backfill", site).
+    """
+    jobs = {}
+    for row in db.query(models.RssFeedConfig).filter(models.RssFeedConfig.enable == True).all():
+        jobs[("rss", row.name)] = (row.interval, row.name)
+    for row in db.query(models.PtSite).filter(models.PtSite.auto_update == True).all():
+        jobs[("site", row.site)] = (row.update_interval, row.site)
+        if row.backfill_page is not None:
+            jobs[("backfill", row.site)] = (settings.SITE_BACKFILL_INTERVAL, row.site)
+    return jobs
+
+
+class FeedScheduler:
+    """In-process scheduler for RSS feeds, PT site updates and back-fills.
+
+    Keeps a min-heap of next-due times. A job is pushed back onto the heap only
+    once its run has finished, so runs of the same feed never overlap, and
+    failing jobs back off exponentially.
+    """
+
+    def __init__(self, jitter: float, max_backoff: int, reload_interval: int):
+        self.jitter = jitter
+        self.max_backoff = max_backoff
+        self.reload_interval = reload_interval
+        self._heap = []
+        self._seq = itertools.count()
+        self._jobs = {}
+        self._running = {}
+        self._task = None
+
+    def _push(self, job: ScheduledJob, delay: float):
+        loop = asyncio.get_running_loop()
+        heapq.heappush(self._heap, (loop.time() + delay, next(self._seq), job))
+
+    async def reload(self):
+        db = SessionLocal()
+        try:
+            configured = await asyncio.to_thread(load_jobs, db)
+        finally:
+            db.close()
+
+        for key in set(self._jobs) - set(configured):
+            logger.info(f"Scheduler: remove {key}")
+            del self._jobs[key]
+        for key, (interval, payload) in configured.items():
+            job = self._jobs.get(key)
+            if job is None:
+                job = ScheduledJob(key, interval, payload)
+                self._jobs[key] = job
+                # 首次执行时间在一个周期内随机分布, 各订阅不会同时触发
+                self._push(job, random.uniform(0, job.interval))
+                logger.info(f"Scheduler: add {key}, interval {job.interval}s")
+            else:
+                # 新的间隔从下一次调度开始生效
+                job.interval = max(interval or 0, MIN_INTERVAL)
+                job.payload = payload
+
+    async def _execute(self, job: ScheduledJob) -> bool:
+        kind, name = job.key
+        if kind in ("site", "backfill"):
+            run = site_update.backfill_site if kind == "backfill" else site_update.update_site
+            count = await asyncio.to_thread(run, name)
+            return count >= 0
+        db = SessionLocal()
+        try:
+            feed = await asyncio.to_thread(rss_poller.load_feed, db, name)
+        finally:
+            db.close()
+        if feed is None:
+            return True
+        summary = await rss_poller.get_poller().poll_feed(feed)
+        return summary.get("status") != "error"
+
+    async def _run_job(self, job: ScheduledJob):
+        try:
+            ok = await self._execute(job)
+        except Exception as e:
+            logger.error(f"Scheduler: {job.key} failed: {e}")
+            ok = False
+        finally:
+            self._running.pop(job.key, None)
+        job.failures = 0 if ok else job.failures + 1
+        if not ok:
+            logger.warning(f"Scheduler: {job.key} failed {job.failures} time(s), backing off")
+        if self._jobs.get(job.key) is job:
+            self._push(job, job.next_delay(self.jitter, self.max_backoff))
+
+    async def _loop(self):
+        loop = asyncio.get_running_loop()
+        next_reload = 0
+        while True:
+            now = loop.time()
+            if now >= next_reload:
+                try:
+                    await self.reload()
+                except Exception as e:
+                    logger.error(f"Scheduler: reload failed: {e}")
+                next_reload = now + self.reload_interval
+
+            while self._heap and self._heap[0][0] <= loop.time():
+                _, _, job = heapq.heappop(self._heap)
+                if self._jobs.get(job.key) is not job:
+                    continue
+                self._running[job.key] = asyncio.create_task(self._run_job(job))
+
+            wait = next_reload - loop.time()
+            if self._heap:
+                wait = min(wait, self._heap[0][0] - loop.time())
+            await asyncio.sleep(max(wait, 0.1))
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._loop())
+            logger.info("Scheduler started")
+
+    async def stop(self):
+        tasks = list(self._running.values())
+        if self._task:
+            self._task.cancel()
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*([self._task] if self._task else []), *tasks, return_exceptions=True)
+        self._task = None
+        logger.info("Scheduler stopped")
+
+
+scheduler = FeedScheduler(
+    jitter=settings.SCHEDULER_JITTER,
+    max_backoff=settings.SCHEDULER_MAX_BACKOFF,
+    reload_interval=settings.SCHEDULER_RELOAD_INTERVAL,
+)
@@ -0,0 +1,98 @@
+import hashlib
+import threading
+from collections import OrderedDict
+
+from sqlalchemy.orm import Session
+from loguru import logger
+
+from torll.models import models
+from torll.core.config import settings
+
+
+def entry_key(title: str, subtitle: str) -> bytes:
+    """Short hash of (title, subtitle), the same pair rss_history is deduplicated on."""
+    h = hashlib.blake2b(digest_size=12)
+    h.update((title or "").encode("utf-8"))
+    h.update(b"\0")
+    h.update((subtitle or "").encode("utf-8"))
+    return h.digest()
+
+
+class SeenCache:
+    """Bounded LRU of entries already stored in rss_history for one feed."""
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self.warmed = False
+        self._keys = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._keys)
+
+    def contains(self, title: str, subtitle: str) -> bool:
+        key = entry_key(title, subtitle)
+        with self._lock:
+            if key in self._keys:
+                self._keys.move_to_end(key)
+                self.hits += 1
+                return True
+            self.misses += 1
+            return False
+
+    def add(self, title: str, subtitle: str):
+        key = entry_key(title, subtitle)
+        with self._lock:
+            self._keys[key] = None
+            self._keys.move_to_end(key)
+            while len(self._keys) > self.maxsize:
+                self._keys.popitem(last=False)
+
+    def warm(self, db: Session, rssname: str):
+        """Load the newest rss_history rows of this feed, oldest first so the newest stay hot."""
+        rows = db.query(
+            models.RSSHistory.title, models.RSSHistory.subtitle, models.RSSHistory.info_link
+        ).filter(
+            models.RSSHistory.rssname == rssname
+        ).order_by(models.RSSHistory.id.desc()).limit(self.maxsize).all()
+        for row in reversed(rows):
+            # 无标题的条目按链接记录, 与 RssFeed.dedupe_key 一致
+            if row.title:
+                self.add(row.title, row.subtitle)
+            else:
+                self.add("", row.info_link)
+        self.warmed = True
+        logger.info(f"RSS {rssname} - seen cache warmed with {len(rows)} entries")
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "size": len(self._keys),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 4) if total else 0.0,
+        }
+
+
+_caches = {}
+_caches_lock = threading.Lock()
+
+
+def get_seen_cache(db: Session, rssname: str) -> SeenCache:
+    """Per-feed cache, warmed from rss_history on first use."""
+    with _caches_lock:
+        cache = _caches.get(rssname)
+        if cache is None:
+            cache = SeenCache(settings.RSS_SEEN_CACHE_SIZE)
+            _caches[rssname] = cache
+    if not cache.warmed:
+        cache.warm(db, rssname)
+    return cache
+
+
+def get_seen_cache_stats() -> dict:
+    with _caches_lock:
+        return {name: cache.stats() for name, cache in _caches.items()}
@@ -0,0 +1,54 @@
+import json
+import os
+import threading
+
+from loguru import logger
+
+from torll.core.config import settings, BASE_DIR
+
+
+class SiteConfigStore:
+    """PT site XPath configs, read from a JSON file keyed by site name.
+
+    {"nexusphp": {...}, "audiences": {"baseurl": ..., "searchurl": ..., "torlist": ...}}
+
+    The "nexusphp" entry holds the defaults for keys a site does not set.
+    The file is re-read when its mtime or size changes.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._stamp = None
+        self._sites = {}
+        self._lock = threading.Lock()
+
+    def _config_stamp(self):
+        try:
+            st = os.stat(self.path)
+        except OSError:
+            return None
+        return (st.st_mtime_ns, st.st_size)
+
+    def _load(self):
+        stamp = self._config_stamp()
+        if stamp == self._stamp:
+            return self._sites
+        with self._lock:
+            if stamp == self._stamp:
+                return self._sites
+            sites = {}
+            if stamp is not None:
+                try:
+                    with open(self.path, encoding="utf-8") as f:
+                        sites = {k.lower(): v for k, v in json.load(f).items()}
+                    logger.info(f"Site configs loaded: {len(sites)} from {self.path}")
+                except (OSError, ValueError, AttributeError) as e:
+                    logger.error(f"Site config {self.path} not loaded: {e}")
+            self._sites, self._stamp = sites, stamp
+            return sites
+
+    def get(self, sitename: str):
+        return self._load().get((sitename or "").lower())
+
+
+site_configs = SiteConfigStore(settings.SITE_CONFIG_FILE or os.path.join(BASE_DIR, "siteconfig.json"))
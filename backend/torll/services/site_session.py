@@ -0,0 +1,89 @@
+import threading
+from http.cookies import SimpleCookie
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from torll.core.config import settings
+from torll.services.ratelimit import rate_limiter
+
+DEFAULT_HEADERS = {
+    "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,image/apng,*/*;q=0.8,application/signed-exchange;v=b3;q=0.9",
+    "User-Agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/109.0.0.0 Safari/537.36 Edg/109.0.1518.78",
+    "Content-Type": "text/html; charset=UTF-8",
+}
+
+
+def parse_cookie(cookie_str: str) -> dict:
+    cookie = SimpleCookie()
+    cookie.load(cookie_str or "")
+    return {k: v.value for k, v in cookie.items()}
+
+
+def _new_session() -> requests.Session:
+    session = requests.Session()
+    retry = Retry(
+        total=settings.SITE_HTTP_RETRIES,
+        backoff_factor=settings.SITE_HTTP_BACKOFF,
+        status_forcelist=(429, 500, 502, 503, 504),
+        allowed_methods=frozenset(["GET", "HEAD"]),
+        respect_retry_after_header=True,
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(
+        pool_connections=1,
+        pool_maxsize=settings.SITE_HTTP_POOL_SIZE,
+        pool_block=True,
+        max_retries=retry,
+    )
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    session.headers.update(DEFAULT_HEADERS)
+    return session
+
+
+class SiteSessionPool:
+    """One keep-alive requests.Session per tracker host.
+
+    The cookie string is parsed into the session's jar once, and again only
+    when the configured cookie for that host changes.
+    """
+
+    def __init__(self):
+        self._sessions = {}  # host -> (cookie_str, session)
+        self._lock = threading.Lock()
+
+    def get(self, url: str, cookie_str: str) -> requests.Session:
+        host = urlparse(url).netloc.lower()
+        entry = self._sessions.get(host)
+        if entry and entry[0] == cookie_str:
+            return entry[1]
+        with self._lock:
+            entry = self._sessions.get(host)
+            if entry is None:
+                session = _new_session()
+            elif entry[0] != cookie_str:
+                session = entry[1]
+                session.cookies.clear()
+            else:
+                return entry[1]
+            session.cookies.update(parse_cookie(cookie_str))
+            self._sessions[host] = (cookie_str, session)
+            return session
+
+    def close(self):
+        with self._lock:
+            for _, session in self._sessions.values():
+                session.close()
+            self._sessions.clear()
+
+
+site_sessions = SiteSessionPool()
+
+
+def site_get(url: str, cookie_str: str, site: str = None, **kwargs) -> requests.Response:
+    rate_limiter.acquire(site=site, url=url)
+    kwargs.setdefault("timeout", settings.SITE_HTTP_TIMEOUT)
+    return site_sessions.get(url, cookie_str).get(url, **kwargs)
@@ -0,0 +1,181 @@
+from types import SimpleNamespace
+from urllib.parse import parse_qsl, urlencode, urljoin, urlsplit, urlunsplit
+
+import lxml.html
+from sqlalchemy.orm import Session
+from loguru import logger
+
+from torll.db.database import SessionLocal
+from torll.models import models
+from torll.core.config import settings
+from torll.services import highwater, site_xpath
+from torll.services.pt_search_service import fill_tmdb_info
+from torll.services.site_config import site_configs
+from torll.services.site_session import site_get
+
+
+# 批量查询已存在 infolink 时每次 IN (...) 的数量
+SITE_TORRENT_QUERY_CHUNK = 500
+
+UPDATE_STATUS_IDLE = 0
+UPDATE_STATUS_BUSY = 1
+
+
+def listing_page_url(siteurl: str, page: int, cursite: dict) -> str:
+    """URL of listing page `page` (0 is the first page, NexusPHP style ?page=N)."""
+    if not page:
+        return siteurl
+    pageparam = cursite.get("pageparam", "page")
+    parts = urlsplit(siteurl)
+    query = [(k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True) if k != pageparam]
+    query.append((pageparam, str(page)))
+    return urlunsplit(parts._replace(query=urlencode(query)))
+
+
+def parse_listing_page(doc, site: str, cursite: dict) -> list:
+    """Listing page -> SiteTorrent column namespaces, oldest first, one per infolink."""
+    plan = site_xpath.getXPathPlan(site, cursite, site_configs.get("nexusphp"))
+    htmltree = lxml.html.fromstring(doc, parser=lxml.html.HTMLParser(recover=True, encoding="utf-8"))
+    items = {}
+    for row in reversed(plan.get(htmltree, "torlist")):
+        infolink = plan.get(row, "infolink")
+        if not infolink:
+            continue
+        infolink = urljoin(cursite["baseurl"], infolink)
+        if infolink in items:
+            continue
+        item = SimpleNamespace(site=site, infolink=infolink)
+        site_xpath.fillDbitemWithXPathValues(item, plan.extract(row))
+        item.downlink = urljoin(cursite["baseurl"], item.downlink)
+        items[infolink] = item
+    return list(items.values())
+
+
+def fetch_listing_page(site: str, cookie: str, cursite: dict, page: int):
+    """Rows of one listing page, oldest first; None when the page could not be fetched."""
+    url = listing_page_url(cursite["baseurl"] + cursite["newtorrent"], page, cursite)
+    logger.info(f"Loading new torrents: {site} - {url}")
+    try:
+        r = site_get(url, cookie, site=site)
+        r.raise_for_status()
+    except Exception as e:
+        logger.warning(f"Fail to fetch {url}: {e}")
+        return None
+    return parse_listing_page(r.content, site, cursite)
+
+
+def drop_known(db: Session, site: str, items: list) -> list:
+    """Items whose infolink is not stored yet, with one query per chunk."""
+    links = [x.infolink for x in items]
+    known = set()
+    for i in range(0, len(links), SITE_TORRENT_QUERY_CHUNK):
+        chunk = links[i : i + SITE_TORRENT_QUERY_CHUNK]
+        known.update(
+            link
+            for (link,) in db.query(models.SiteTorrent.infolink).filter(
+                models.SiteTorrent.site == site, models.SiteTorrent.infolink.in_(chunk)
+            )
+        )
+    return [x for x in items if x.infolink not in known]
+
+
+def store_site_torrents(db: Session, site: str, items: list) -> int:
+    """Drop known rows, add TMDb info, bulk insert; does not commit. Returns the count stored."""
+    rows = [vars(x) for x in drop_known(db, site, items)]
+    fill_tmdb_info(rows)
+    for row in rows:
+        logger.info(f"{row['tortitle']}, {row['tordate']}")
+    db.bulk_insert_mappings(models.SiteTorrent, rows)
+    return len(rows)
+
+
+def update_site(site: str) -> int:
+    """Scrape new torrents of an auto-updating PtSite; the torll side of siteparser.getSiteTorrent.
+
+    Listing pages are walked from the newest until a page's bottom row is at
+    or below the site's high-water mark, at most SITE_SCRAPE_MAX_PAGES pages
+    (one page on the first scrape). A walk that never reaches the mark leaves
+    the range down to the old mark for backfill.
+    Returns the count stored, -1 when the site is not configured, -3 when no page was fetched.
+    """
+    cursite = site_configs.get(site)
+    if not cursite or "newtorrent" not in cursite:
+        logger.info(f"site {site} not configured")
+        return -1
+    db = SessionLocal()
+    try:
+        dbsite = db.query(models.PtSite).filter(models.PtSite.site == site).first()
+        if dbsite is None:
+            logger.info(f"site {site} not in pt_site")
+            return -1
+        cookie = dbsite.cookie
+        mark = highwater.HighWaterMark(dbsite.last_torrent_id, dbsite.last_torrent_date)
+        maxpages = settings.SITE_SCRAPE_MAX_PAGES if any(x is not None for x in mark) else 1
+        dbsite.updateing = UPDATE_STATUS_BUSY
+        db.commit()
+        try:
+            items, walked, reached = highwater.walk_listing(
+                lambda page: fetch_listing_page(site, cookie, cursite, page), mark, maxpages
+            )
+            if not walked:
+                dbsite.lastNewStatus = -3
+                return -3  # page not fetched
+            newmark = highwater.raised(mark, items)
+            count = store_site_torrents(db, site, items)
+            dbsite.last_torrent_id, dbsite.last_torrent_date = newmark
+            if not reached:
+                # 旧高水位到本次最后一页之间的种子未抓, 记下区间由补全抓取
+                pending = None
+                if dbsite.backfill_page is not None:
+                    pending = highwater.HighWaterMark(dbsite.backfill_torrent_id, dbsite.backfill_torrent_date)
+                dbsite.backfill_torrent_id, dbsite.backfill_torrent_date = highwater.backfill_bound(mark, pending)
+                dbsite.backfill_page = walked
+                logger.info(f"站新 {site}: 未到达上次位置, 从第 {walked} 页开始补全")
+            dbsite.newTorCount, dbsite.lastNewStatus = count, 0
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            dbsite.updateing = UPDATE_STATUS_IDLE
+            db.commit()
+    finally:
+        db.close()
+    logger.info(f"站新完成 {site} : {count}")
+    return count
+
+
+def backfill_site(site: str) -> int:
+    """Scrape one older listing page of a site, continuing from PtSite.backfill_page.
+
+    Only rows above the gap's lower bound (backfill_torrent_id/date) are
+    stored. Stops (backfill_page back to None) once a page's bottom row
+    reaches the bound, at an empty page or after SITE_BACKFILL_MAX_PAGES pages.
+    Returns the count stored, -1 when the site is not configured, -3 when the page was not fetched.
+    """
+    cursite = site_configs.get(site)
+    if not cursite or "newtorrent" not in cursite:
+        logger.info(f"site {site} not configured")
+        return -1
+    db = SessionLocal()
+    try:
+        dbsite = db.query(models.PtSite).filter(models.PtSite.site == site).first()
+        if dbsite is None or dbsite.backfill_page is None:
+            return 0
+        page = dbsite.backfill_page
+        rows = fetch_listing_page(site, dbsite.cookie, cursite, page)
+        if rows is None:
+            return -3
+        bound = highwater.HighWaterMark(dbsite.backfill_torrent_id, dbsite.backfill_torrent_date)
+        items, closed = highwater.backfill_rows(rows, bound)
+        count = store_site_torrents(db, site, items)
+        if closed or page + 1 >= settings.SITE_BACKFILL_MAX_PAGES:
+            dbsite.backfill_page = None
+            dbsite.backfill_torrent_id, dbsite.backfill_torrent_date = None, None
+            logger.info(f"补全完成 {site}: 第 {page} 页")
+        else:
+            dbsite.backfill_page = page + 1
+        db.commit()
+    finally:
+        db.close()
+    logger.info(f"补全 {site} 第 {page} 页: {count}")
+    return count
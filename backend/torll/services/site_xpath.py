@@ -0,0 +1,213 @@
+import hashlib
+import json
+import re
+from datetime import datetime
+
+import lxml.etree
+from loguru import logger
+
+from torll.core.utils import tryint, tryFloat
+
+# xpath method
+# 站点配置中 {"path": ..., "method": ...} 项的后处理
+XPATH_METHODS = {
+    "re_imdb": re.compile(r"title/(tt\d+)", re.I),
+    "re_douban": re.compile(r"subject/(\d+)", re.I),
+    "ssd_imdb": re.compile(r"search=(\d+)&search_area=4", re.I),
+    "ssd_douban": re.compile(r"search=(\d+)&search_area=5", re.I),
+    "ttg_seednum": re.compile(r"(\d+)\s*/\s*\d+", re.I),
+    "ttg_downum": re.compile(r"\d+\s*/\s*(\d+)", re.I),
+}
+
+# 列表页每行取的字段
+ROW_FIELDS = (
+    "tortitle",
+    "downlink",
+    "subtitle",
+    "tagzz",
+    "taggy",
+    "tagfree",
+    "tag2xfree",
+    "doubanval",
+    "imdbval",
+    "imdbstr",
+    "doubanid",
+    "seednum",
+    "downnum",
+    "torsize",
+    "tordate",
+)
+
+
+def _emptyGetter(row):
+    return ""
+
+
+def _methodGetter(xpath, pattern):
+    def get(row):
+        elestring = xpath(row)
+        if not elestring or pattern is None:
+            return ""
+        m = pattern.search(elestring)
+        return m[1] if m else ""
+
+    return get
+
+
+class SiteXPathPlan:
+    """A site config compiled into lxml XPath objects plus post-processing.
+
+    Keys the site does not configure fall back to the nexusphp config, the
+    same as xpathGetElement always did; each key is compiled on first use.
+    """
+
+    def __init__(self, siteJson, fallback=None):
+        self.siteJson = siteJson
+        self.fallback = fallback
+        self._getters = {}
+
+    def _compile(self, key):
+        siteJson = self.siteJson
+        if key not in siteJson:
+            # 如果site中没有配置 key 项，在 nexusphp 配置中找
+            siteJson = self.fallback
+            if not siteJson or key not in siteJson:
+                return _emptyGetter
+        eleJson = siteJson[key]
+        if not isinstance(eleJson, str):
+            xpath = lxml.etree.XPath(eleJson["path"])
+            method = eleJson.get("method")
+            return _methodGetter(xpath, XPATH_METHODS.get(method) if method else None)
+        if not eleJson.strip():
+            return _emptyGetter
+        return lxml.etree.XPath(eleJson)
+
+    def getter(self, key):
+        getter = self._getters.get(key)
+        if getter is None:
+            getter = self._compile(key)
+            self._getters[key] = getter
+        return getter
+
+    def get(self, row, key):
+        return self.getter(key)(row)
+
+    def extract(self, row, keys=ROW_FIELDS):
+        return {key: self.getter(key)(row) for key in keys}
+
+
+# 每个站点一份编译好的 plan, 与配置内容的 hash 一起保存; 配置内容变化时重新编译
+_xpathPlans = {}
+
+
+def siteConfigDigest(siteJson):
+    return hashlib.sha1(json.dumps(siteJson, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+
+def getXPathPlan(sitename, siteJson, fallback=None):
+    """Compiled plan for a site's config; get it once per page, the lookup hashes the config."""
+    digest = siteConfigDigest([siteJson, fallback])
+    cached = _xpathPlans.get(sitename)
+    if cached is not None and cached[0] == digest:
+        return cached[1]
+    plan = SiteXPathPlan(siteJson, fallback)
+    _xpathPlans[sitename] = (digest, plan)
+    return plan
+
+
+def parseMediaSource(tortitle):
+    if re.search(r"remux", tortitle, re.I):
+        return "remux"
+    if re.search(r"(web-?dl|web-?rip|hdtv|\bweb\b)", tortitle, re.I):
+        return "webdl"
+    if re.search(r"(encode|x265|x264)", tortitle, re.I):
+        return "encode"
+    if re.search(r"\b(blu-?ray|uhd|bdmv|BDRip)\b", tortitle, re.I):
+        return "bluray"
+    if re.search(r"\b(dvdr|dvdrip|NTSC|DVD|DVDISO)\b", tortitle, re.I):
+        return "dvd"
+    if re.search(r"(AVC.*DTS|MPEG.*AVC)", tortitle, re.I):
+        return "bluray"
+    # logger.info('unknow type: '+tortitle)
+    return "other"
+
+
+def subsubtitle(title, subtitle):
+    title = re.sub(r" +", " ", title).strip()
+    subtitle = re.sub(r" +", " ", subtitle).strip()
+    if len(title) > len(subtitle):
+        # if title.startswith(subtitle):
+        #     return title.replace(subtitle, ''), subtitle
+        # else:
+        #     return title, subtitle
+        return title, subtitle
+    elif title == subtitle:
+        s = re.sub(r"^[ -~‘’×]+", "", subtitle).strip()
+        if len(title) - len(s) > 3:
+            return title.replace(s, ""), s
+        else:
+            return title, subtitle
+    else:
+        return title, subtitle.replace(title, "")
+
+
+def striptitle(titlestr):
+    s = re.sub(r"\[?限时禁转\]?", "", titlestr)
+    s = re.sub(r"\[\W*\]$", "", s)
+    return s
+
+
+def striptag(titlestr):
+    s = titlestr.replace("\n", "").strip()
+    # s = re.sub(r'\[?(国语|中字|官方|禁转|原创)\]?', '', s)
+    s = re.sub(r"剩余时间.*?\d分钟", "", s)
+    s = re.sub(r"\[?Checked by \w+\]?", "", s)
+    s = re.sub(r"\[\W*\]$", "", s)  # frds
+    return s
+
+
+RE_SIZE = re.compile(r"([\d.,]+)\s*([KMGTP]?)i?B", re.I)
+
+
+def parseSizeStr(sizestr):
+    """'1.5 GB' / '700 MiB' -> bytes (binary units, as PT sites count them); 0 when unparsable."""
+    m = RE_SIZE.search(sizestr or "")
+    if not m:
+        return 0
+    value = tryFloat(m[1].replace(",", ""))
+    return int(value * 1024 ** "BKMGTP".index(m[2].upper() or "B"))
+
+
+def fillDbitemWithXPathValues(dbitem, values):
+    """Set the listing-row fields of a SiteTorrent / TorrentCache item from plan.extract(row)."""
+    title = values["tortitle"]
+    dbitem.mediasource = parseMediaSource(title)
+    dbitem.downlink = values["downlink"]
+    if not dbitem.downlink and dbitem.infolink:
+        dbitem.downlink = dbitem.infolink.replace("details.php", "download.php")
+    subtitle = str(values["subtitle"])
+    if subtitle:
+        title, subtitle = subsubtitle(title, subtitle)
+        dbitem.subtitle = striptag(subtitle)
+    dbitem.tortitle = striptitle(title)
+
+    dbitem.tagzz = True if values["tagzz"] else False
+    dbitem.taggy = True if values["taggy"] else False
+    dbitem.tagfree = True if values["tagfree"] else False
+    dbitem.tag2xfree = True if values["tag2xfree"] else False
+    dbitem.doubanval = tryFloat(values["doubanval"])
+    dbitem.imdbval = tryFloat(values["imdbval"])
+    dbitem.imdbstr = values["imdbstr"]
+    if dbitem.imdbstr and not dbitem.imdbstr.startswith("tt"):
+        dbitem.imdbstr = "tt" + dbitem.imdbstr.zfill(7)
+    dbitem.doubanid = values["doubanid"]
+    dbitem.seednum = tryint(values["seednum"])
+    dbitem.downnum = tryint(values["downnum"])
+    dbitem.torsizestr = str(values["torsize"]).strip()
+    dbitem.torsizeint = parseSizeStr(dbitem.torsizestr)
+    tordatestr = values["tordate"]
+    try:
+        dbitem.tordate = datetime.strptime(tordatestr, "%Y-%m-%d %H:%M:%S")
+    except:
+        logger.warning(f"日期解析出错：{tordatestr}, {dbitem.infolink}")
+        dbitem.tordate = datetime.now()
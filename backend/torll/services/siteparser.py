@@ -1,17 +1,20 @@
 import lxml.html
 import re
+import json
+import hashlib
+import time
+from contextlib import contextmanager
+from types import SimpleNamespace
 import siteconfig
-import myconfig
-import os, sys
-
-sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "torcp2"))
-from torcp.tmdbparser import TMDbNameParser
-from datetime import datetime
-from urllib.parse import urlparse
-import requests as pyrequests
-from http.cookies import SimpleCookie
+from urllib.parse import urlparse, urlsplit, urlunsplit, parse_qsl, urlencode
+from concurrent.futures import ThreadPoolExecutor
+from torll.services.site_session import site_get
+from torll.core.config import settings
+from torll.services.detail_cache import detail_cache, field_ttl
+from torll.services.name_parser import name_parser
+from torll.services import highwater, site_xpath
+from torll.services.site_xpath import fillDbitemWithXPathValues
 from loguru import logger
-from humanbytes import parseSizeStr
 from models import db, TorrentCache, PtSite, SiteTorrent
 from utils import tryint, tryFloat, nomalizeSitename, getfulllink, removePasskeyUrl
 
@@ -57,57 +60,6 @@ def genreid2str(idlist):
     return genrestr
 
 
-def parseMediaSource(tortitle):
-    if re.search(r"remux", tortitle, re.I):
-        return "remux"
-    if re.search(r"(web-?dl|web-?rip|hdtv|\bweb\b)", tortitle, re.I):
-        return "webdl"
-    if re.search(r"(encode|x265|x264)", tortitle, re.I):
-        return "encode"
-    if re.search(r"\b(blu-?ray|uhd|bdmv|BDRip)\b", tortitle, re.I):
-        return "bluray"
-    if re.search(r"\b(dvdr|dvdrip|NTSC|DVD|DVDISO)\b", tortitle, re.I):
-        return "dvd"
-    if re.search(r"(AVC.*DTS|MPEG.*AVC)", tortitle, re.I):
-        return "bluray"
-    # logger.info('unknow type: '+tortitle)
-    return "other"
-
-
-def subsubtitle(title, subtitle):
-    title = re.sub(r" +", " ", title).strip()
-    subtitle = re.sub(r" +", " ", subtitle).strip()
-    if len(title) > len(subtitle):
-        # if title.startswith(subtitle):
-        #     return title.replace(subtitle, ''), subtitle
-        # else:
-        #     return title, subtitle
-        return title, subtitle
-    elif title == subtitle:
-        s = re.sub(r"^[ -~‘’×]+", "", subtitle).strip()
-        if len(title) - len(s) > 3:
-            return title.replace(s, ""), s
-        else:
-            return title, subtitle
-    else:
-        return title, subtitle.replace(title, "")
-
-
-def striptitle(titlestr):
-    s = re.sub(r"\[?限时禁转\]?", "", titlestr)
-    s = re.sub(r"\[\W*\]$", "", s)
-    return s
-
-
-def striptag(titlestr):
-    s = titlestr.replace("\n", "").strip()
-    # s = re.sub(r'\[?(国语|中字|官方|禁转|原创)\]?', '', s)
-    s = re.sub(r"剩余时间.*?\d分钟", "", s)
-    s = re.sub(r"\[?Checked by \w+\]?", "", s)
-    s = re.sub(r"\[\W*\]$", "", s)  # frds
-    return s
-
-
 def sitecat2tmdbcat(sitecat):
     m = re.search(r"TV|Series", sitecat)
     return "tv" if m else "movie"
@@ -135,25 +87,17 @@ def strip_scheme_domain(url):
     return parsed.geturl().replace(scheme_domain, "", 1)
 
 
-def requestSitePage(pageUrl, pageCookie):
+def requestSitePage(pageUrl, pageCookie, sitename=None, headers=None):
     logger.info(f"请求页面: {pageUrl}")
-    cookie = SimpleCookie()
-    cookie.load(pageCookie)
-    cookies = {k: v.value for k, v in cookie.items()}
-    headers = {
-        "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,image/apng,*/*;q=0.8,application/signed-exchange;v=b3;q=0.9",
-        "User-Agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/109.0.0.0 Safari/537.36 Edg/109.0.1518.78",
-        "Content-Type": "text/html; charset=UTF-8",
-    }
-
     try:
-        r = pyrequests.get(pageUrl, headers=headers, cookies=cookies, timeout=15)
+        # 每站点共用一个 keep-alive 会话, cookie 只解析一次
+        r = site_get(pageUrl, pageCookie, site=sitename, headers=headers)
         # print(r.encoding, r.apparent_encoding)
         # utf-8 Windows-1254
         # 'ISO-8859-1' utf-8
         r.encoding = "utf-8"
         # r.encoding = r.apparent_encoding
-    except:
+    except Exception:
         logger.warning(f"请求页面失败: {pageUrl}")
         return None
     return r
@@ -169,17 +113,149 @@ def cutExtitle(subtitle):
     return subtitle
 
 
-def fillDetailWithSiteDetailPage(detail, sitename, detailLink, cookie):
+def fillDetailWithSiteDetailPage(detail, sitename, detailLink, cookie, fields=None):
     if cookie:
-        r = requestSitePage(detailLink, cookie)
-        if r:
-            doc = r.text
-            tordetail = parseDetailInfo(detail, sitename, doc)
-            return tordetail
+        info = fetchDetailPageInfo(
+            DetailPageInfo(detail), sitename, detailLink, cookie, fields or DETAIL_STATIC_FIELDS
+        )
+        if info:
+            return info.applyTo(detail)
         logger.error(f"取站点页面出错：{detailLink}")
     return None
 
 
+# parseDetailInfo 读写的 TorDetail 字段; 并发解析时在副本上解析, 再写回 ORM 对象
+DETAIL_PAGE_FIELDS = (
+    "imdbstr",
+    "doubanid",
+    "subtitle",
+    "seednum",
+    "downnum",
+    "sizestr",
+    "area",
+    "extitle",
+    "title_translation",
+    "year_int",
+    "epnum",
+    "pubdate",
+    "imdbval",
+    "doubanval",
+)
+
+
+# 不会过时的字段; 调用方再加上自己要用的评分 / 做种数, 缓存只按这些字段的有效期判断是否新鲜
+DETAIL_STATIC_FIELDS = tuple(f for f in DETAIL_PAGE_FIELDS if field_ttl(f) is None)
+
+
+class DetailPageInfo:
+    """Detached copy of the TorDetail fields a detail page fills in."""
+
+    __slots__ = DETAIL_PAGE_FIELDS
+
+    def __init__(self, detail):
+        for field in DETAIL_PAGE_FIELDS:
+            setattr(self, field, getattr(detail, field, None))
+
+    def applyTo(self, detail):
+        for field in DETAIL_PAGE_FIELDS:
+            setattr(detail, field, getattr(self, field))
+        return detail
+
+
+# 解析逻辑变化时改这个版本号, 缓存中的页面会重新解析
+DETAIL_PARSER_REV = "1"
+
+
+def detailParserVersion(sitename):
+    """Parser version for a site: changes when parseDetailInfo or the site config does."""
+    cursite = siteconfig.getSiteConfig(sitename)
+    h = hashlib.sha1(DETAIL_PARSER_REV.encode())
+    h.update(json.dumps(cursite, sort_keys=True, default=str).encode("utf-8"))
+    return h.hexdigest()
+
+
+def parseCachedDetailPage(info, sitename, detailLink, html, version):
+    info = parseDetailInfo(info, sitename, html)
+    detail_cache.save_parsed(
+        detailLink, {f: getattr(info, f) for f in DETAIL_PAGE_FIELDS}, version
+    )
+    return info
+
+
+def fetchDetailPageInfo(info, sitename, detailLink, cookie, fields=DETAIL_PAGE_FIELDS):
+    """Fill `info` from the detail page, going through the detail page cache.
+
+    Cached fields are used while the page is fresh enough for every field in
+    `fields`, so pass only the fields the caller reads: asking for seednum
+    makes the page expire after DETAIL_CACHE_TTL_VOLATILE. A cached page
+    parsed by an older parser version is re-parsed
+    from the stored HTML; otherwise the page is revalidated with its
+    ETag / Last-Modified.
+    """
+    version = detailParserVersion(sitename)
+    page = detail_cache.lookup(detailLink)
+    if page and detail_cache.is_fresh(page, fields):
+        if page.parsed is not None and page.parser_version == version:
+            for field, value in page.parsed.items():
+                if field in DETAIL_PAGE_FIELDS:
+                    setattr(info, field, value)
+            return info
+        html = detail_cache.load_html(page.content_hash) if page.content_hash else None
+        if html is not None:
+            return parseCachedDetailPage(info, sitename, detailLink, html, version)
+
+    html = None
+    r = requestSitePage(detailLink, cookie, sitename, headers=detail_cache.validators(page))
+    if r is not None and r.status_code == 304 and page:
+        html = detail_cache.load_html(page.content_hash) if page.content_hash else None
+        if html is not None:
+            detail_cache.touch(detailLink)
+        else:
+            # 缓存文件丢失, 重新完整获取
+            r = requestSitePage(detailLink, cookie, sitename)
+    if html is None:
+        if not r or r.status_code == 304:
+            logger.error(f"取站点页面出错：{detailLink}")
+            return None
+        html = r.text
+        detail_cache.store(
+            detailLink, sitename, html,
+            r.headers.get("ETag"), r.headers.get("Last-Modified"),
+        )
+    return parseCachedDetailPage(info, sitename, detailLink, html, version)
+
+
+def fillDetailsWithSiteDetailPages(items, sitename, cookie, fields=None):
+    """Fetch and parse detail pages for [(detail, detailLink), ...] concurrently.
+
+    `fields`: the detail fields the caller needs fresh (default: only the
+    static ones), see fetchDetailPageInfo. Returns the details in the same
+    order, None where the page could not be fetched. Requests still go
+    through the per-site session pool and rate limiter; the ORM objects are
+    only touched on the calling thread.
+    """
+    if not items:
+        return []
+    if not cookie:
+        return [None] * len(items)
+    infos = [DetailPageInfo(detail) for detail, _ in items]
+    workers = min(len(items), settings.SITE_DETAIL_WORKERS)
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = [
+            pool.submit(fetchDetailPageInfo, info, sitename, link, cookie, fields or DETAIL_STATIC_FIELDS)
+            for info, (_, link) in zip(infos, items)
+        ]
+        results = []
+        for (detail, link), future in zip(items, futures):
+            try:
+                info = future.result()
+            except Exception as e:
+                logger.error(f"解析站点页面出错：{link}, {e}")
+                info = None
+            results.append(info.applyTo(detail) if info else None)
+    return results
+
+
 def parseDetailInfo(tordetail, sitename, doc):
     if m := re.search(r"www\.imdb\.com\/title\/(tt\d+)", doc, flags=re.A):
         tordetail.imdbstr = m[1]
@@ -193,15 +269,16 @@ def parseDetailInfo(tordetail, sitename, doc):
         # ele = xpathGetElement(htmltree, cursite, 'detailTitle')
         # tordetail.media_title = ele if ele else ''
 
-        ele = xpathGetElement(htmltree, cursite, "detailSubtitle")
+        plan = getXPathPlan(sitename, cursite)
+        ele = plan.get(htmltree, "detailSubtitle")
         tordetail.subtitle = ele[0] if ele else ""
 
-        slnum = xpathGetElement(htmltree, cursite, "detailSeeders")
+        slnum = plan.get(htmltree, "detailSeeders")
         if m := re.search(r"(\d+)个做种者[^\d]+(\d+)个下载者", slnum):
             tordetail.seednum = m[1]
             tordetail.downnum = m[2]
 
-        basicinfo = xpathGetElement(htmltree, cursite, "detailBasicInfo")
+        basicinfo = plan.get(htmltree, "detailBasicInfo")
         # basicinfo = ''.join(basicinfolist)
         if m := re.search(r"\b大小[^\d]+([\d\.]+\s*[KMGT]B)", basicinfo):
             tordetail.sizestr = m[1]
@@ -257,50 +334,25 @@ def parseDetailInfo(tordetail, sitename, doc):
     return tordetail
 
 
-# xpath method
-def xpathGetElement(row, siteJson, key):
-    if not siteJson:
-        return ""
-    if key not in siteJson:
-        # 如果site中没有配置 key 项，在 nexusphp 配置中找
-        siteJson = siteconfig.getSiteConfig("nexusphp")
-        if key not in siteJson:
-            return ""
-    eleJson = siteJson[key]
-    if not isinstance(eleJson, str):
-        elestring = row.xpath(eleJson["path"])
-        if elestring and "method" in eleJson:
-            if eleJson["method"] == "re_imdb":
-                m = re.search(r"title/(tt\d+)", elestring, re.I)
-                return m[1] if m else ""
-            elif eleJson["method"] == "re_douban":
-                m = re.search(r"subject/(\d+)", elestring, re.I)
-                return m[1] if m else ""
-            elif eleJson["method"] == "ssd_imdb":
-                m = re.search(r"search=(\d+)&search_area=4", elestring, re.I)
-                return m[1] if m else ""
-            elif eleJson["method"] == "ssd_douban":
-                m = re.search(r"search=(\d+)&search_area=5", elestring, re.I)
-                return m[1] if m else ""
-            elif eleJson["method"] == "ttg_seednum":
-                m = re.search(r"(\d+)\s*/\s*\d+", elestring, re.I)
-                return m[1] if m else ""
-            elif eleJson["method"] == "ttg_downum":
-                m = re.search(r"\d+\s*/\s*(\d+)", elestring, re.I)
-                return m[1] if m else ""
+def getXPathPlan(sitename, siteJson):
+    """Compiled plan for a site's config, with the nexusphp config as fallback."""
+    return site_xpath.getXPathPlan(sitename, siteJson, siteconfig.getSiteConfig("nexusphp"))
+
 
+def xpathGetElement(row, siteJson, key, sitename=""):
+    if not siteJson:
         return ""
-    else:
-        if not eleJson.strip():
-            return ""
-        return row.xpath(eleJson)
+    return getXPathPlan(sitename, siteJson).get(row, key)
 
 
 def matchIMDbid(str):
     return True if re.match(r"tt\d+", str.strip(), re.I) else False
 
 
-def xpathSearchPtSites(sitehost, siteCookie, seachWord):
+def searchSiteTorrents(sitehost, siteCookie, seachWord):
+    """Search one site; returns TorrentCache column dicts, or -1 when the site
+    is not configured or the page could not be fetched. Nothing is written.
+    """
     sitehost = nomalizeSitename(sitehost)
     cursite = siteconfig.getSiteConfig(sitehost)
     if not cursite:
@@ -312,35 +364,39 @@ def xpathSearchPtSites(sitehost, siteCookie, seachWord):
     else:
         pturl = cursite["baseurl"] + cursite["searchurl"] + seachWord
 
-    r = requestSitePage(pturl, siteCookie)
+    r = requestSitePage(pturl, siteCookie, sitehost)
     if not r:
         logger.error(f"搜索，站点页面访问出错 {pturl} ")
         return -1  # page not fetched
     doc = r.content
     parser = lxml.html.HTMLParser(recover=True, encoding="utf-8")
     htmltree = lxml.html.fromstring(doc, parser=parser)
-    torlist = htmltree.xpath(cursite["torlist"])
-    count = 0
+    plan = getXPathPlan(sitehost, cursite)
+    torlist = plan.get(htmltree, "torlist")
+    items = []
     for row in reversed(torlist):
         # title = xpathGetElement(row, cursite, "tortitle")
-        infolink = xpathGetElement(row, cursite, "infolink")
+        infolink = plan.get(row, "infolink")
         if not infolink:
             continue
 
-        infolink = getfulllink(sitehost, infolink)
+        item = SimpleNamespace(
+            site=sitehost, infolink=getfulllink(sitehost, infolink), searchword=seachWord
+        )
+        fillDbitemWithXPathParser(item, row, cursite, plan.extract(row))
+        items.append(item)
+    fillDbitemsWithTMDbParser(items)
+    logger.info(f"搜索 {sitehost}: {seachWord}, 得 {len(items)} 个结果")
+    return [vars(x) for x in items]
 
-        dbitem = TorrentCache()
-        dbitem.site = sitehost
-        dbitem.infolink = infolink
-        fillDbitemWithXPathParser(dbitem, row, cursite)
-        fillDbitemWithTMDbParser(dbitem)
-        dbitem.searchword = seachWord
 
-        count += 1
-        db.session.add(dbitem)
-        db.session.commit()
-    logger.info(f"搜索 {sitehost}: {seachWord}, 得 {count} 个结果")
-    return count
+def xpathSearchPtSites(sitehost, siteCookie, seachWord):
+    rows = searchSiteTorrents(sitehost, siteCookie, seachWord)
+    if rows == -1:
+        return -1
+    db.session.add_all([TorrentCache(**row) for row in rows])
+    db.session.commit()
+    return len(rows)
 
 
 def parseInfoPageIMDbval(doc):
@@ -373,14 +429,7 @@ def parseInfoPageIMDbval(doc):
     return imdbval, doubanval
 
 
-def fillDbitemWithTMDbParser(dbitem):
-    p = TMDbNameParser(myconfig.CONFIG.torcpdb_url, myconfig.CONFIG.torcpdb_apikey)
-    p.parse(
-        torname=dbitem.tortitle,
-        useTMDb=True,
-        hasIMDbId=dbitem.imdbstr,
-        infolink=getfulllink(dbitem.site, dbitem.infolink),
-    )
+def applyNameParseResult(dbitem, p):
     dbitem.genrestr = genreid2str(p.genre_ids)
     dbitem.tmdbtitle, dbitem.tmdbcat, dbitem.tmdbid, dbitem.tmdbposter = (
         p.title,
@@ -398,42 +447,24 @@ def fillDbitemWithTMDbParser(dbitem):
     dbitem.imdbval = p.imdbval
 
 
-def fillDbitemWithXPathParser(dbitem, row, cursite):
-    title = xpathGetElement(row, cursite, "tortitle")
-    dbitem.mediasource = parseMediaSource(title)
-    # dbitem.infolink = xpathGetElement(row, cursite, "infolink")
-    # dbitem.infolink = getfulllink(dbitem.site, dbitem.infolink)
-    dbitem.downlink = xpathGetElement(row, cursite, "downlink")
-    if not dbitem.downlink and dbitem.infolink:
-        dbitem.downlink = dbitem.infolink.replace("details.php", "download.php")
-    subtitle = str(xpathGetElement(row, cursite, "subtitle"))
-    if subtitle:
-        title, subtitle = subsubtitle(title, subtitle)
-        dbitem.subtitle = striptag(subtitle)
-    dbitem.tortitle = striptitle(title)
-
-    dbitem.tagzz = True if xpathGetElement(row, cursite, "tagzz") else False
-    dbitem.taggy = True if xpathGetElement(row, cursite, "taggy") else False
-    dbitem.tagfree = True if xpathGetElement(row, cursite, "tagfree") else False
-    dbitem.tag2xfree = True if xpathGetElement(row, cursite, "tag2xfree") else False
-    dbitem.doubanval = tryFloat(xpathGetElement(row, cursite, "doubanval"))
-    dbitem.imdbval = tryFloat(xpathGetElement(row, cursite, "imdbval"))
-    dbitem.imdbstr = xpathGetElement(row, cursite, "imdbstr")
-    if dbitem.imdbstr and not dbitem.imdbstr.startswith("tt"):
-        dbitem.imdbstr = "tt" + dbitem.imdbstr.zfill(7)
-    dbitem.doubanid = xpathGetElement(row, cursite, "doubanid")
-    dbitem.seednum = tryint(xpathGetElement(row, cursite, "seednum"))
-    dbitem.downnum = tryint(xpathGetElement(row, cursite, "downnum"))
-    dbitem.torsizestr = str(xpathGetElement(row, cursite, "torsize")).strip()
-    dbitem.torsizeint = parseSizeStr(dbitem.torsizestr)
-    tordatestr = xpathGetElement(row, cursite, "tordate")
-    try:
-        dbitem.tordate = datetime.strptime(tordatestr, "%Y-%m-%d %H:%M:%S")
-    except:
-        logger.warning(f"日期解析出错：{tordatestr}, {dbitem.infolink}")
-        dbitem.tordate = datetime.now()
+def fillDbitemWithTMDbParser(dbitem):
+    p = name_parser.parse(
+        dbitem.tortitle,
+        dbitem.imdbstr,
+        getfulllink(dbitem.site, dbitem.infolink),
+    )
+    applyNameParseResult(dbitem, p)
+
+
+def fillDbitemWithXPathParser(dbitem, row, cursite, values=None):
+    if values is None:
+        values = getXPathPlan(dbitem.site, cursite).extract(row)
+    fillDbitemWithXPathValues(dbitem, values)
 
 
+# 批量查询已存在 infolink 时每次 IN (...) 的数量
+SITE_TORRENT_QUERY_CHUNK = 500
+
 UPDATE_STATUS_IDLE = 0
 UPDATE_STATUS_BUSY = 1
 
@@ -451,7 +482,108 @@ def siteUpdateEnd(sitename: str):
     db.session.commit()
 
 
+class StageTimings:
+    """Wall time per named stage of a scrape, for the log line at the end."""
+
+    def __init__(self):
+        self.stages = {}
+
+    @contextmanager
+    def stage(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stages[name] = self.stages.get(name, 0.0) + time.perf_counter() - start
+
+    def __str__(self):
+        return ", ".join(f"{k} {v * 1000:.0f}ms" for k, v in self.stages.items())
+
+
+def parseSiteTorrentRows(doc, sitename, cursite):
+    """Stage 1: listing page -> unsaved SiteTorrent items, oldest first, one per infolink."""
+    plan = getXPathPlan(sitename, cursite)
+    parser = lxml.html.HTMLParser(recover=True, encoding="utf-8")
+    htmltree = lxml.html.fromstring(doc, parser=parser)
+    torlist = plan.get(htmltree, "torlist")
+    logger.info(f"站新 种子列表: {len(torlist)}")
+    items = {}
+    for row in reversed(torlist):
+        infolink = plan.get(row, "infolink")
+        if not infolink:
+            continue
+        infolink = getfulllink(sitename, infolink)
+        if infolink in items:
+            continue
+        dbitem = SiteTorrent()
+        dbitem.site = sitename
+        dbitem.infolink = infolink
+        fillDbitemWithXPathParser(dbitem, row, cursite, plan.extract(row))
+        items[infolink] = dbitem
+    return list(items.values())
+
+
+def filterKnownSiteTorrents(sitename, items):
+    """Stage 2: drop items whose infolink is already stored, with one query per chunk."""
+    links = [x.infolink for x in items]
+    known = set()
+    for i in range(0, len(links), SITE_TORRENT_QUERY_CHUNK):
+        chunk = links[i : i + SITE_TORRENT_QUERY_CHUNK]
+        known.update(
+            link
+            for (link,) in db.session.query(SiteTorrent.infolink).filter(
+                SiteTorrent.site == sitename, SiteTorrent.infolink.in_(chunk)
+            )
+        )
+    return [x for x in items if x.infolink not in known]
+
+
+def fillDbitemsWithTMDbParser(items):
+    """Stage 3: TMDb lookups for not yet saved items, in one batch.
+
+    Failed lookups leave the item without TMDb data.
+    """
+    results = name_parser.parse_many(
+        [(x.tortitle, x.imdbstr, getfulllink(x.site, x.infolink)) for x in items]
+    )
+    for dbitem, p in zip(items, results):
+        if p is not None:
+            applyNameParseResult(dbitem, p)
+
+
+def siteListingPageUrl(siteurl, page, cursite):
+    """URL of listing page `page` (0 is the first page, NexusPHP style ?page=N)."""
+    if not page:
+        return siteurl
+    pageparam = cursite.get("pageparam", "page")
+    parts = urlsplit(siteurl)
+    query = [(k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True) if k != pageparam]
+    query.append((pageparam, str(page)))
+    return urlunsplit(parts._replace(query=urlencode(query)))
+
+
+def storeSiteTorrents(sitename, items, timings):
+    """Stages 2-4: drop known rows, resolve TMDb, bulk insert. Returns the count stored."""
+    with timings.stage("dedupe"):
+        items = filterKnownSiteTorrents(sitename, items)
+    with timings.stage("tmdb"):
+        fillDbitemsWithTMDbParser(items)
+    with timings.stage("insert"):
+        for dbitem in items:
+            logger.info(f"{dbitem.tortitle}, {dbitem.tordate}")
+        db.session.add_all(items)
+        db.session.commit()
+    return len(items)
+
+
 def getSiteTorrent(sitename, sitecookie, siteurl=None):
+    """Scrape new torrents of a site.
+
+    Listing pages are walked from the newest until a page's bottom row is at
+    or below the site's high-water mark, at most SITE_SCRAPE_MAX_PAGES pages.
+    The first scrape of a site and a walk that never reaches the mark
+    (e.g. after downtime) leave the older pages to backfillSiteTorrent.
+    """
     sitename = nomalizeSitename(sitename)
     cursite = siteconfig.getSiteConfig(sitename)
     if not cursite:
@@ -463,47 +595,85 @@ def getSiteTorrent(sitename, sitecookie, siteurl=None):
             siteurl = cursite["baseurl"] + cursite["newtorrent"]
     if not siteurl.startswith("http"):
         siteurl = cursite["baseurl"] + siteurl
+    dbsite = PtSite.query.filter(PtSite.site == sitename).first()
+    if not dbsite:
+        logger.info(f"site {sitename} not in pt_site")
+        return -1
     logger.info(f"站新 {sitename}: {siteurl}")
     siteUpdateBegin(sitename)
-    # if not siteurl:
-    #     logger.warning("no newtorlink configured.")
-    #     return -2
-    logger.info(f"Loading new torrents: {sitename} - {siteurl}")
-    r = requestSitePage(siteurl, sitecookie)
-    if not r:
-        logger.warning("Fail to fetch: " + siteurl)
-        return -3  # page not fetched
-    doc = r.content
-    parser = lxml.html.HTMLParser(recover=True, encoding="utf-8")
-    htmltree = lxml.html.fromstring(doc, parser=parser)
-    torlist = htmltree.xpath(cursite["torlist"])
-    count = 0
-    logger.info(f"站新 种子列表: {len(torlist)}")
-    for row in reversed(torlist):
-        # title = xpathGetElement(row, cursite, "tortitle")
-        infolink = xpathGetElement(row, cursite, "infolink")
-        if not infolink:
-            continue
+    hasHighWater = dbsite.last_torrent_id is not None or dbsite.last_torrent_date is not None
+    maxpages = settings.SITE_SCRAPE_MAX_PAGES if hasHighWater else 1
+    mark = highwater.HighWaterMark(dbsite.last_torrent_id, dbsite.last_torrent_date)
+    timings = StageTimings()
+
+    def loadPage(page):
+        pageurl = siteListingPageUrl(siteurl, page, cursite)
+        logger.info(f"Loading new torrents: {sitename} - {pageurl}")
+        with timings.stage("fetch"):
+            r = requestSitePage(pageurl, sitecookie, sitename)
+        if not r:
+            logger.warning("Fail to fetch: " + pageurl)
+            return None
+        with timings.stage("parse"):
+            return parseSiteTorrentRows(r.content, sitename, cursite)
 
-        infolink = getfulllink(sitename, infolink)
-        exists = db.session.query(
-            SiteTorrent.query.filter(db.and_(
-                        SiteTorrent.infolink == infolink, SiteTorrent.site == sitename
-                    )).exists()).scalar()
+    try:
+        items, walked, reached = highwater.walk_listing(loadPage, mark, maxpages)
+        if not walked:
+            return -3  # page not fetched
+        # 新的高水位在入库前算好, 提交后再读这些行的属性会逐行 SELECT
+        newmark = highwater.raised(mark, items)
+        count = storeSiteTorrents(sitename, items, timings)
+        dbsite.last_torrent_id, dbsite.last_torrent_date = newmark
+        if not reached:
+            # 旧高水位到本次最后一页之间的种子未抓, 记下区间由补全抓取;
+            # 已有未补完的区间时保留更早的下界, 从本次最后一页往后重新补
+            pending = None
+            if dbsite.backfill_page is not None:
+                pending = highwater.HighWaterMark(dbsite.backfill_torrent_id, dbsite.backfill_torrent_date)
+            dbsite.backfill_torrent_id, dbsite.backfill_torrent_date = highwater.backfill_bound(mark, pending)
+            dbsite.backfill_page = walked
+            logger.info(f"站新 {sitename}: 未到达上次位置, 从第 {walked} 页开始补全")
+        db.session.commit()
+    finally:
+        siteUpdateEnd(sitename)
+    logger.info(f"站新完成 {sitename} : {count}, {timings}")
+    return count
 
-        if exists:
-            continue
 
-        dbitem = SiteTorrent()
-        dbitem.site = sitename
-        dbitem.infolink = infolink
-        fillDbitemWithXPathParser(dbitem, row, cursite)
-        logger.info(f"{dbitem.tortitle}, {dbitem.tordate}")
-        fillDbitemWithTMDbParser(dbitem)
+def backfillSiteTorrent(sitename, sitecookie):
+    """Scrape one older listing page of a site, continuing from PtSite.backfill_page.
 
-        count += 1
-        db.session.add(dbitem)
-        db.session.commit()
-    siteUpdateEnd(sitename)
-    logger.info(f"站新完成 {sitename} : {count} ")
+    Only rows above the gap's lower bound (backfill_torrent_id/date) are
+    stored. Stops (backfill_page back to None) once a page's bottom row
+    reaches the bound, at an empty page or after SITE_BACKFILL_MAX_PAGES pages.
+    """
+    sitename = nomalizeSitename(sitename)
+    cursite = siteconfig.getSiteConfig(sitename)
+    dbsite = PtSite.query.filter(PtSite.site == sitename).first()
+    if not cursite or not dbsite or dbsite.backfill_page is None:
+        return 0
+    if "newtorrent" not in cursite:
+        return -1
+    page = dbsite.backfill_page
+    pageurl = siteListingPageUrl(cursite["baseurl"] + cursite["newtorrent"], page, cursite)
+    timings = StageTimings()
+    with timings.stage("fetch"):
+        r = requestSitePage(pageurl, sitecookie, sitename)
+    if not r:
+        logger.warning("Fail to fetch: " + pageurl)
+        return -3
+    with timings.stage("parse"):
+        rows = parseSiteTorrentRows(r.content, sitename, cursite)
+    bound = highwater.HighWaterMark(dbsite.backfill_torrent_id, dbsite.backfill_torrent_date)
+    items, closed = highwater.backfill_rows(rows, bound)
+    count = storeSiteTorrents(sitename, items, timings)
+    if closed or page + 1 >= settings.SITE_BACKFILL_MAX_PAGES:
+        dbsite.backfill_page = None
+        dbsite.backfill_torrent_id, dbsite.backfill_torrent_date = None, None
+        logger.info(f"补全完成 {sitename}: 第 {page} 页")
+    else:
+        dbsite.backfill_page = page + 1
+    db.session.commit()
+    logger.info(f"补全 {sitename} 第 {page} 页: {count}, {timings}")
     return count
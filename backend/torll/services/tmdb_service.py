@@ -1,28 +1,190 @@
+import json
+import re
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from datetime import datetime, timedelta
+
 import tmdbsimple as tmdb
+from sqlalchemy.exc import SQLAlchemyError
 from loguru import logger
 
+from torll.db.database import SessionLocal
+from torll.models import models
+from torll.core.config import settings
+
 # Assume API key is configured elsewhere, e.g., in a config file or environment variable
 # tmdb.API_KEY = "YOUR_TMDB_API_KEY"
 
+
+def normalize_query(query: str) -> str:
+    return re.sub(r"\s+", " ", query or "").strip().lower()
+
+
+# 发布名中片名之后的部分: 季集, 分辨率, 来源, 编码, 音频等
+RE_TITLE_STOP = re.compile(
+    r"^(S\d{1,3}(E\d{1,4})*|E[Pp]?\d{1,4}|Season|Complete|\d{3,4}[pi]|4K|UHD|"
+    r"WEB|WEB-?DL|WEB-?Rip|Blu-?Ray|BDRip|BDMV|HDTV|REMUX|DVD\w*|"
+    r"[xh]\.?26[45]|HEVC|AVC|AV1|VC-?1|AAC\w*|DDP?\w*|E?AC-?3|TrueHD\w*|Atmos|DTS\w*|FLAC|"
+    r"10bit|HDR\w*|DV|DoVi|iNTERNAL|REPACK|PROPER|LIMITED)$",
+    re.I,
+)
+RE_YEAR = re.compile(r"^(19|20)\d{2}$")
+RE_TITLE_SPLIT = re.compile(r"[\s._\[\]()]+")
+
+
+def normalize_title(title: str) -> str:
+    """Canonical TMDb lookup key for a release name.
+
+    `Show.S01E05.1080p.GroupA` and `Show.S01E05.2160p.GroupB` both become `show`.
+    A year ends the title only when release tokens follow it, so
+    `Blade.Runner.2049.2017.1080p` keeps `2049`.
+    """
+    tokens = [x for x in RE_TITLE_SPLIT.split(title or "") if x]
+    for i, token in enumerate(tokens):
+        if i == 0:
+            continue
+        if RE_TITLE_STOP.match(token):
+            tokens = tokens[:i]
+            break
+        if RE_YEAR.match(token):
+            rest = tokens[i + 1:]
+            if not rest or RE_TITLE_STOP.match(rest[0]):
+                tokens = tokens[:i]
+                break
+    return normalize_query(" ".join(tokens))
+
+
+class TmdbLookupCache:
+    """Lookup cache: an in-memory LRU in front of the tmdb_cache table.
+
+    Hits are kept for TMDB_CACHE_TTL, empty results ("no match") for the shorter
+    TMDB_CACHE_MISS_TTL.
+    """
+
+    def __init__(self, maxsize: int, ttl: int, miss_ttl: int):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.miss_ttl = miss_ttl
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """Return the cached result list, or None when not cached / expired."""
+        now = time.time()
+        with self._lock:
+            item = self._memory.get(key)
+            if item is not None:
+                expires, results = item
+                if expires > now:
+                    self._memory.move_to_end(key)
+                    return results
+                del self._memory[key]
+
+        db = SessionLocal()
+        try:
+            row = db.query(models.TmdbCache).filter(
+                models.TmdbCache.query_key == key[0], models.TmdbCache.media_type == key[1]
+            ).first()
+            if row is None or row.expires_at <= datetime.now():
+                return None
+            results = json.loads(row.result or "[]")
+            self._remember(key, row.expires_at.timestamp(), results)
+            return results
+        except SQLAlchemyError as e:
+            logger.warning(f"TMDb cache read failed for {key}: {e}")
+            return None
+        finally:
+            db.close()
+
+    def put(self, key, results):
+        ttl = self.ttl if results else self.miss_ttl
+        expires_at = datetime.now() + timedelta(seconds=ttl)
+        self._remember(key, expires_at.timestamp(), results)
+
+        db = SessionLocal()
+        try:
+            row = db.query(models.TmdbCache).filter(
+                models.TmdbCache.query_key == key[0], models.TmdbCache.media_type == key[1]
+            ).first()
+            if row is None:
+                row = models.TmdbCache(query_key=key[0], media_type=key[1])
+                db.add(row)
+            row.result = json.dumps(results, ensure_ascii=False)
+            row.expires_at = expires_at
+            db.commit()
+        except SQLAlchemyError as e:
+            db.rollback()
+            logger.warning(f"TMDb cache write failed for {key}: {e}")
+        finally:
+            db.close()
+
+    def _remember(self, key, expires: float, results):
+        with self._lock:
+            self._memory[key] = (expires, results)
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.maxsize:
+                self._memory.popitem(last=False)
+
+
+lookup_cache = TmdbLookupCache(
+    maxsize=settings.TMDB_CACHE_MEMORY_SIZE,
+    ttl=settings.TMDB_CACHE_TTL,
+    miss_ttl=settings.TMDB_CACHE_MISS_TTL,
+)
+
+
+def _search_tmdb_remote(query: str, media_type: str):
+    search = tmdb.Search()
+    response = search.multi(query=query)
+
+    filtered_results = []
+    for result in response['results']:
+        if media_type == "multi" or result.get('media_type') == media_type:
+            filtered_results.append(result)
+    return filtered_results
+
+
+# 进行中的查询, 相同 key 的并发查询合并为一次请求
+_inflight = {}
+_inflight_lock = threading.Lock()
+
+
 def search_tmdb(query: str, media_type: str = "multi"):
     """
     Searches TMDb for a given query and media type.
     media_type can be "movie", "tv", "person", "collection", "company", "keyword", "multi".
-    Returns a list of results.
+    Returns a list of results. Results are served from the lookup cache when possible,
+    and concurrent lookups of the same query share one request.
     """
+    if not tmdb.API_KEY:
+        logger.warning("TMDb API key is not set. Skipping TMDb search.")
+        return []
+
+    key = (normalize_query(query)[:255], media_type)
+    cached = lookup_cache.get(key)
+    if cached is not None:
+        return cached
+
+    with _inflight_lock:
+        future = _inflight.get(key)
+        owner = future is None
+        if owner:
+            future = Future()
+            _inflight[key] = future
+    if not owner:
+        return future.result()
+
     try:
-        if not tmdb.API_KEY:
-            logger.warning("TMDb API key is not set. Skipping TMDb search.")
-            return []
-
-        search = tmdb.Search()
-        response = search.multi(query=query)
-        
-        filtered_results = []
-        for result in response['results']:
-            if media_type == "multi" or result.get('media_type') == media_type:
-                filtered_results.append(result)
-        return filtered_results
+        results = _search_tmdb_remote(query, media_type)
+        lookup_cache.put(key, results)
     except Exception as e:
+        # 出错不缓存, 下次重试
         logger.error(f"Error searching TMDb for '{query}': {e}")
-        return []
\ No newline at end of file
+        results = []
+    finally:
+        with _inflight_lock:
+            del _inflight[key]
+    future.set_result(results)
+    return results
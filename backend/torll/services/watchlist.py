@@ -0,0 +1,114 @@
+import re
+import threading
+from collections import deque, namedtuple
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+from loguru import logger
+
+from torll.models import models
+
+WatchlistMatch = namedtuple("WatchlistMatch", ["id", "title", "tmdbid", "tmdbcat", "imdbid"])
+
+RE_NAME_SEP = re.compile(r"[\W_]+")
+
+
+def normalize_name(name: str) -> str:
+    """Lowercase, with punctuation and dots collapsed to single spaces."""
+    return RE_NAME_SEP.sub(" ", (name or "").lower()).strip()
+
+
+def _is_word_char(c: str) -> bool:
+    return c.isascii() and c.isalnum()
+
+
+class WatchlistIndex:
+    """Aho–Corasick automaton over the normalized watchlist titles.
+
+    Matching costs O(len(text)) regardless of how many titles are tracked.
+    Latin names only match on word boundaries (the text and those names are
+    padded with spaces); CJK names match as plain substrings.
+    """
+
+    def __init__(self, items, version=None):
+        # get_index 的表版本 (行数, 最大 updated_at); 编译好的 filter 按它缓存
+        self.version = version
+        self.size = 0
+        self._goto = [{}]
+        self._fail = [0]
+        self._out = [()]
+        for item, name in items:
+            self._add(self._pad(name), item)
+            self.size += 1
+        self._build()
+
+    @staticmethod
+    def _pad(name: str) -> str:
+        if name and _is_word_char(name[0]):
+            name = " " + name
+        if name and _is_word_char(name[-1]):
+            name = name + " "
+        return name
+
+    def _add(self, key: str, item):
+        node = 0
+        for c in key:
+            nxt = self._goto[node].get(c)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[node][c] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append(())
+            node = nxt
+        self._out[node] = self._out[node] + (item,)
+
+    def _build(self):
+        # 根的子节点失败指针指向根, 其余按 BFS 顺序计算
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for c, nxt in self._goto[node].items():
+                queue.append(nxt)
+                f = self._fail[node]
+                while f and c not in self._goto[f]:
+                    f = self._fail[f]
+                if node:
+                    self._fail[nxt] = self._goto[f].get(c, 0)
+                self._out[nxt] = self._out[nxt] + self._out[self._fail[nxt]]
+
+    def match(self, *texts) -> list:
+        """Watchlist items whose title occurs in any of the texts, longest name first."""
+        found = {}
+        for text in texts:
+            node = 0
+            for c in " " + normalize_name(text) + " ":
+                while node and c not in self._goto[node]:
+                    node = self._fail[node]
+                node = self._goto[node].get(c, 0)
+                for item in self._out[node]:
+                    found[item.id] = item
+        return sorted(found.values(), key=lambda x: -len(x.title))
+
+
+_index = WatchlistIndex([])
+_version = None
+_lock = threading.Lock()
+
+
+def get_index(db: Session) -> WatchlistIndex:
+    """Index of enabled watchlist items, rebuilt when the table has changed."""
+    global _index, _version
+    version = tuple(db.query(func.count(models.Watchlist.id), func.max(models.Watchlist.updated_at)).one())
+    with _lock:
+        if version != _version:
+            rows = db.query(models.Watchlist).filter(models.Watchlist.enable == True).all()
+            items = [
+                (WatchlistMatch(row.id, row.title, row.tmdbid, row.tmdbcat, row.imdbid),
+                 row.norm_title or normalize_name(row.title))
+                for row in rows
+            ]
+            _index = WatchlistIndex([(item, name) for item, name in items if name], version)
+            _version = version
+            logger.info(f"Watchlist index rebuilt: {_index.size} titles")
+        return _index
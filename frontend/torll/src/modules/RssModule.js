@@ -74,16 +74,34 @@ function RssModule() {
     setSelectedFeed(feed);
     setArticles([]);
     showNotification(`Processing ${feed.name}...`, 'info');
+    const loadHistory = () => {
+      fetch(`/rss/history/${feed.name}`)
+        .then(response => response.json())
+        .then(data => {
+          setArticles(data);
+          setView('articles'); // Switch view after fetching
+        })
+        .catch(error => showNotification('Error fetching articles', 'error'));
+    };
+    // Processing runs as a background job; poll its status until it finishes
+    const waitForJob = (jobId) => {
+      fetch(`/jobs/${jobId}`)
+        .then(response => response.json())
+        .then(job => {
+          if (job.status === 'pending' || job.status === 'running') {
+            setTimeout(() => waitForJob(jobId), 1000);
+          } else {
+            if (job.status === 'failed') {
+              showNotification(`Error processing feed: ${job.error}`, 'error');
+            }
+            loadHistory();
+          }
+        })
+        .catch(error => showNotification('Error processing feed', 'error'));
+    };
     fetch(`/rss/process/${feed.name}`, { method: 'POST' })
-      .then(() => {
-        fetch(`/rss/history/${feed.name}`)
-          .then(response => response.json())
-          .then(data => {
-            setArticles(data);
-            setView('articles'); // Switch view after fetching
-          })
-          .catch(error => showNotification('Error fetching articles', 'error'));
-      })
+      .then(response => response.json())
+      .then(data => waitForJob(data.job_id))
       .catch(error => showNotification('Error processing feed', 'error'));
   };
 
@@ -18,7 +18,6 @@ import KeyboardArrowUpIcon from '@mui/icons-material/KeyboardArrowUp';
 
 function SearchModule() {
   const [searchTerm, setSearchTerm] = useState('');
-  const [siteName, setSiteName] = useState('default_site'); // Placeholder
   const [searchResults, setSearchResults] = useState([]);
   
   const [sorting, setSorting] = useState([]);
@@ -48,21 +47,44 @@ function SearchModule() {
     fetchSearchResults();
   }, [globalFilter]);
 
-  const handleSearch = () => {
-    fetch('/search/pt', {
-      method: 'POST',
-      headers: { 'Content-Type': 'application/json' },
-      body: JSON.stringify({ search_term: searchTerm, site_name: siteName }),
-    })
-      .then(response => response.json())
-      .then(data => {
-        showNotification('Search initiated', 'info');
-        setTimeout(fetchSearchResults, 2000); // Re-fetch after a delay
-      })
-      .catch(error => {
-        console.error('Error initiating search:', error);
-        showNotification('Error initiating search', 'error');
+  const handleSearch = async () => {
+    // 所有站点同时搜索, 每个站点返回一行 NDJSON, 先返回的先显示
+    try {
+      const response = await fetch('/search/pt/stream', {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json' },
+        body: JSON.stringify({ search_term: searchTerm }),
       });
+      if (!response.ok) {
+        throw new Error(`HTTP ${response.status}`);
+      }
+      setSearchResults([]);
+      const reader = response.body.getReader();
+      const decoder = new TextDecoder();
+      let buffer = '';
+      const handleLine = (line) => {
+        if (!line.trim()) return;
+        const siteResult = JSON.parse(line);
+        if (siteResult.status === 'ok') {
+          setSearchResults(prev => [...prev, ...siteResult.results]);
+        } else {
+          showNotification(`Search ${siteResult.site}: ${siteResult.status}`, 'warning');
+        }
+      };
+      while (true) {
+        const { done, value } = await reader.read();
+        if (done) break;
+        buffer += decoder.decode(value, { stream: true });
+        const lines = buffer.split('\n');
+        buffer = lines.pop();
+        lines.forEach(handleLine);
+      }
+      handleLine(buffer);
+      showNotification('Search finished', 'info');
+    } catch (error) {
+      console.error('Error searching PT sites:', error);
+      showNotification('Error searching PT sites', 'error');
+    }
   };
 
   const columns = useMemo(() => [